@@ -1,33 +1,358 @@
 # Importation des modules nécessaires
 # Framework Flask pour créer l'API
-from flask import Flask 
-from py2neo import Graph
+from flask import Flask, g, request, current_app, jsonify
+from werkzeug.local import LocalProxy
 # Importer dotenv pour charger les variables d'environnement depuis .env
 from dotenv import load_dotenv
 # Pour accéder aux variables d'environnement système
+import functools
 import os
+import time
+from app.db import CountingGraph, round_trips
+from app.cache import entity_cache
+from app.friendships import friend_graph
+from app.search import search_index
+from app.trending import trending
+from app.like_buffer import like_buffer
+from app.jobs import jobs
+from app.conditional import collection_versions, compress_response
+from app.changelog import changelog
+from app.admission import admission_control, Overloaded, ROUTE_CLASSES
+from app.profile import profile_loader, PROFILE_TASKS
+from app.pagination import requested_stream
+from app.repository import create_repository, InstrumentedRepository
+from app.metrics import http_requests, http_request_duration, http_request_round_trips
 
 # Chargement des variables d'environnement depuis le fichier .env
 load_dotenv()
 
-# Création de l'application Flask
-app = Flask(__name__)
+# Repository de l'application courante, utilisé par les modèles et les routes pour accéder au graphe
+# (résolu dans le contexte d'application, voir create_app)
+repo = LocalProxy(lambda: current_app.extensions["repository"])
 
-# Configuration Neo4j
-app.config["NEO4J_URI"] = os.getenv("NEO4J_URI", "bolt://localhost:7687")
-app.config["NEO4J_AUTH"] = (
-    os.getenv("NEO4J_USER", "neo4j"),
-    os.getenv("NEO4J_PASSWORD", "password")
-)
 
-# Connexion à la base de données Neo4j
-# Graph est l'objet qui permettre d'exécuter les requêtes Cypher
-graph = Graph(app.config["NEO4J_URI"], auth=app.config["NEO4J_AUTH"])
+def load_config(app):
+    """Lit la configuration de l'application depuis les variables d'environnement"""
+    # Backend de stockage: "neo4j" ou "memory" (graphe en mémoire, sans base, pour tests et mesures)
+    app.config["GRAPH_BACKEND"] = os.getenv("GRAPH_BACKEND", "neo4j").lower()
 
-# Import des routes
-from app.routes import users, posts, comments
+    # Configuration Neo4j
+    app.config["NEO4J_URI"] = os.getenv("NEO4J_URI", "bolt://localhost:7687")
+    app.config["NEO4J_AUTH"] = (
+        os.getenv("NEO4J_USER", "neo4j"),
+        os.getenv("NEO4J_PASSWORD", "password")
+    )
+    # Pool de connexions de chaque processus: nombre maximal de connexions simultanées
+    # et durée de vie (secondes) d'une connexion avant son remplacement
+    app.config["NEO4J_MAX_CONNECTIONS"] = int(os.getenv("NEO4J_MAX_CONNECTIONS", "20"))
+    app.config["NEO4J_MAX_CONNECTION_AGE"] = float(os.getenv("NEO4J_MAX_CONNECTION_AGE", "3600"))
+    # Durée (secondes) pendant laquelle le résultat de la sonde de disponibilité est réutilisé
+    app.config["READINESS_CACHE_SECONDS"] = float(os.getenv("READINESS_CACHE_SECONDS", "5"))
+    # Création des contraintes et index à la première connexion (désactivable avec SCHEMA_BOOTSTRAP=0)
+    app.config["SCHEMA_BOOTSTRAP"] = os.getenv("SCHEMA_BOOTSTRAP", "1").lower() in ("1", "true", "yes")
+    # Taille des lots UNWIND pour l'import en masse
+    app.config["BULK_BATCH_SIZE"] = int(os.getenv("BULK_BATCH_SIZE", "500"))
+    # Cache des entités lues par id: nombre d'entrées (0 = désactivé) et durées de vie en secondes
+    app.config["ENTITY_CACHE_SIZE"] = int(os.getenv("ENTITY_CACHE_SIZE", "10000"))
+    app.config["ENTITY_CACHE_TTL"] = float(os.getenv("ENTITY_CACHE_TTL", "60"))
+    app.config["ENTITY_CACHE_NEGATIVE_TTL"] = float(os.getenv("ENTITY_CACHE_NEGATIVE_TTL", "5"))
+    # Fil d'actualité: longueur des timelines et nombre d'amis au-delà duquel le fan-out est fait à la lecture
+    app.config["FEED_TIMELINE_SIZE"] = int(os.getenv("FEED_TIMELINE_SIZE", "500"))
+    app.config["FEED_FANOUT_MAX_FRIENDS"] = int(os.getenv("FEED_FANOUT_MAX_FRIENDS", "1000"))
+    # Nombre de suggestions d'amis précalculées conservées par utilisateur
+    app.config["SUGGESTIONS_SIZE"] = int(os.getenv("SUGGESTIONS_SIZE", "50"))
+    # Instantané en mémoire des amitiés (are_friends, amis communs, chemins): activation, intervalle
+    # de rechargement complet en secondes (0 = jamais) et longueur maximale des chemins recherchés
+    app.config["FRIEND_GRAPH_SNAPSHOT"] = os.getenv("FRIEND_GRAPH_SNAPSHOT", "1").lower() in ("1", "true", "yes")
+    app.config["FRIEND_GRAPH_REFRESH_SECONDS"] = float(os.getenv("FRIEND_GRAPH_REFRESH_SECONDS", "300"))
+    app.config["FRIEND_PATH_MAX_DEPTH"] = int(os.getenv("FRIEND_PATH_MAX_DEPTH", "6"))
+    # Instantané binaire (export-snapshot) d'où lire le premier chargement des amitiés sans passer par
+    # la base (vide = aucun), ignoré s'il a plus de FRIEND_GRAPH_SNAPSHOT_FILE_MAX_AGE secondes
+    app.config["FRIEND_GRAPH_SNAPSHOT_FILE"] = os.getenv("FRIEND_GRAPH_SNAPSHOT_FILE", "")
+    app.config["FRIEND_GRAPH_SNAPSHOT_FILE_MAX_AGE"] = float(os.getenv("FRIEND_GRAPH_SNAPSHOT_FILE_MAX_AGE", "3600"))
+    # Index de recherche plein texte: activation, fichier de sauvegarde (vide = pas de sauvegarde) et
+    # intervalle de sauvegarde (secondes, 0 = seulement à l'arrêt), attente du chargement par la
+    # première recherche (secondes) avant de répondre 503
+    app.config["SEARCH_INDEX"] = os.getenv("SEARCH_INDEX", "1").lower() in ("1", "true", "yes")
+    app.config["SEARCH_INDEX_PATH"] = os.getenv("SEARCH_INDEX_PATH", "search_index.json.gz")
+    app.config["SEARCH_INDEX_SAVE_SECONDS"] = float(os.getenv("SEARCH_INDEX_SAVE_SECONDS", "300"))
+    app.config["SEARCH_LOAD_WAIT_SECONDS"] = float(os.getenv("SEARCH_LOAD_WAIT_SECONDS", "2"))
+    # Posts tendance: demi-vie des scores (heures), poids d'un like et d'un commentaire, nombre de posts
+    # classés, fraîcheur du classement (secondes), fichier et intervalle de sauvegarde des scores, et
+    # intervalle de recalcul complet depuis le graphe (0 = jamais; utile avec plusieurs processus),
+    # attente du chargement par la première lecture (secondes) avant de répondre 503
+    app.config["TRENDING"] = os.getenv("TRENDING", "1").lower() in ("1", "true", "yes")
+    app.config["TRENDING_HALF_LIFE_HOURS"] = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "6"))
+    app.config["TRENDING_LIKE_WEIGHT"] = float(os.getenv("TRENDING_LIKE_WEIGHT", "1"))
+    app.config["TRENDING_COMMENT_WEIGHT"] = float(os.getenv("TRENDING_COMMENT_WEIGHT", "3"))
+    app.config["TRENDING_SIZE"] = int(os.getenv("TRENDING_SIZE", "100"))
+    app.config["TRENDING_REFRESH_SECONDS"] = float(os.getenv("TRENDING_REFRESH_SECONDS", "5"))
+    app.config["TRENDING_CHECKPOINT_PATH"] = os.getenv("TRENDING_CHECKPOINT_PATH", "trending.json.gz")
+    app.config["TRENDING_CHECKPOINT_SECONDS"] = float(os.getenv("TRENDING_CHECKPOINT_SECONDS", "60"))
+    app.config["TRENDING_REBUILD_SECONDS"] = float(os.getenv("TRENDING_REBUILD_SECONDS", "0"))
+    app.config["TRENDING_LOAD_WAIT_SECONDS"] = float(os.getenv("TRENDING_LOAD_WAIT_SECONDS", "2"))
+    # Écriture différée des likes (désactivée par défaut): taille du tampon et intervalle (secondes) qui
+    # déclenchent son écriture, répertoire du journal de reprise (vide = sans journal) et fsync à chaque like
+    app.config["LIKE_WRITE_BEHIND"] = os.getenv("LIKE_WRITE_BEHIND", "0").lower() in ("1", "true", "yes")
+    app.config["LIKE_BUFFER_MAX_PENDING"] = int(os.getenv("LIKE_BUFFER_MAX_PENDING", "500"))
+    app.config["LIKE_FLUSH_SECONDS"] = float(os.getenv("LIKE_FLUSH_SECONDS", "1"))
+    app.config["LIKE_JOURNAL_DIR"] = os.getenv("LIKE_JOURNAL_DIR", "like_journal")
+    app.config["LIKE_JOURNAL_FSYNC"] = os.getenv("LIKE_JOURNAL_FSYNC", "0").lower() in ("1", "true", "yes")
+    # Suppressions en cascade: éléments supprimés par transaction, nombre d'éléments au-delà duquel la
+    # suppression est confiée à un job d'arrière-plan, threads des jobs et conservation des jobs terminés
+    app.config["DELETE_BATCH_SIZE"] = int(os.getenv("DELETE_BATCH_SIZE", "1000"))
+    app.config["DELETE_JOB_THRESHOLD"] = int(os.getenv("DELETE_JOB_THRESHOLD", "1000"))
+    app.config["JOB_WORKERS"] = int(os.getenv("JOB_WORKERS", "2"))
+    app.config["JOB_RETENTION_HOURS"] = float(os.getenv("JOB_RETENTION_HOURS", "24"))
+    # Réponses conditionnelles des routes de lecture (ETag, Last-Modified, 304): activation, nombre de
+    # réponses dont l'empreinte est retenue et durée (secondes) pendant laquelle un 304 est envoyé sans
+    # interroger le stockage si aucune écriture du processus n'a touché les collections concernées
+    app.config["CONDITIONAL_GET"] = os.getenv("CONDITIONAL_GET", "1").lower() in ("1", "true", "yes")
+    app.config["CONDITIONAL_CACHE_SIZE"] = int(os.getenv("CONDITIONAL_CACHE_SIZE", "10000"))
+    app.config["CONDITIONAL_MAX_AGE"] = float(os.getenv("CONDITIONAL_MAX_AGE", "10"))
+    # Compression gzip/deflate des réponses JSON (à partir de COMPRESSION_MIN_BYTES octets, et toujours
+    # en streaming) selon Accept-Encoding, et niveau de compression (1 à 9)
+    app.config["COMPRESSION"] = os.getenv("COMPRESSION", "1").lower() in ("1", "true", "yes")
+    app.config["COMPRESSION_MIN_BYTES"] = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+    app.config["COMPRESSION_LEVEL"] = int(os.getenv("COMPRESSION_LEVEL", "6"))
+    # Journal des modifications partagé par les processus (invalidation des caches des autres workers,
+    # GET /api/changes): répertoire (vide = désactivé; toujours désactivé avec le backend memory), taille
+    # d'un segment (Mo), nombre de segments conservés et intervalle (secondes) de suivi du journal
+    app.config["CHANGELOG_DIR"] = os.getenv("CHANGELOG_DIR", "changelog")
+    app.config["CHANGELOG_SEGMENT_MB"] = float(os.getenv("CHANGELOG_SEGMENT_MB", "16"))
+    app.config["CHANGELOG_SEGMENTS"] = int(os.getenv("CHANGELOG_SEGMENTS", "8"))
+    app.config["CHANGELOG_POLL_SECONDS"] = float(os.getenv("CHANGELOG_POLL_SECONDS", "0.2"))
+    # Contrôle d'admission des requêtes qui accèdent au stockage: activation, requêtes en cours et taille
+    # de la file d'attente de chaque classe de routes (par défaut, leur somme égale NEO4J_MAX_CONNECTIONS),
+    # attente maximale dans la file (secondes) et valeur de l'en-tête Retry-After des réponses 503
+    app.config["ADMISSION_CONTROL"] = os.getenv("ADMISSION_CONTROL", "1").lower() in ("1", "true", "yes")
+    for route_class, limit, queue in (("READ", 12, 64), ("WRITE", 4, 32), ("HEAVY", 4, 32)):
+        app.config[f"ADMISSION_{route_class}_LIMIT"] = int(os.getenv(f"ADMISSION_{route_class}_LIMIT", str(limit)))
+        app.config[f"ADMISSION_{route_class}_QUEUE"] = int(os.getenv(f"ADMISSION_{route_class}_QUEUE", str(queue)))
+    app.config["ADMISSION_QUEUE_TIMEOUT"] = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+    app.config["ADMISSION_RETRY_AFTER"] = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    # Profil agrégé (GET /api/users/<id>/profile): threads qui lisent les sections en parallèle (partagés
+    # par les requêtes du processus) et délai (secondes) au-delà duquel une section est renvoyée en erreur.
+    # Délai propre d'une section: PROFILE_USER_TIMEOUT, PROFILE_FRIEND_COUNT_TIMEOUT, PROFILE_FRIENDS_TIMEOUT,
+    # PROFILE_POSTS_TIMEOUT, PROFILE_COMMENTS_TIMEOUT (vides: PROFILE_SECTION_TIMEOUT)
+    app.config["PROFILE_WORKERS"] = int(os.getenv("PROFILE_WORKERS", "8"))
+    # Sections en attente d'un thread au-delà desquelles un profil est rejeté (503)
+    app.config["PROFILE_QUEUE"] = int(os.getenv("PROFILE_QUEUE", "16"))
+    app.config["PROFILE_SECTION_TIMEOUT"] = float(os.getenv("PROFILE_SECTION_TIMEOUT", "2"))
+    for section in PROFILE_TASKS:
+        value = os.getenv(f"PROFILE_{section.upper()}_TIMEOUT")
+        app.config[f"PROFILE_{section.upper()}_TIMEOUT"] = float(value) if value else None
+    # Seuil (en millisecondes) au-delà duquel une requête au stockage est journalisée; 0 = désactivé
+    app.config["SLOW_QUERY_MS"] = float(os.getenv("SLOW_QUERY_MS", "0"))
 
-# Enregistrement des blueprints avec le préfixe '/api'
-app.register_blueprint(users.users_bp, url_prefix='/api')
-app.register_blueprint(posts.posts_bp, url_prefix='/api')
-app.register_blueprint(comments.comments_bp, url_prefix='/api')
\ No newline at end of file
+
+def _neo4j_graph(app):
+    """ Graph Neo4j paresseux: la connexion est ouverte à la première requête de chaque
+    processus, puis le schéma est déclaré (une erreur est journalisée sans bloquer le service) """
+    def connect():
+        # Import local: py2neo n'est nécessaire qu'avec ce backend
+        from py2neo import Graph
+        # Graph est l'objet qui permettre d'exécuter les requêtes Cypher
+        return Graph(app.config["NEO4J_URI"], auth=app.config["NEO4J_AUTH"],
+                     max_size=app.config["NEO4J_MAX_CONNECTIONS"],
+                     max_age=app.config["NEO4J_MAX_CONNECTION_AGE"])
+
+    def bootstrap(graph):
+        if not app.config["SCHEMA_BOOTSTRAP"]:
+            return
+        from app.schema import ensure_schema
+        try:
+            ensure_schema(graph)
+        except Exception as e:
+            app.logger.error("Schema bootstrap failed: %s", e)
+
+    return CountingGraph(connect, on_connect=bootstrap)
+
+
+def create_app(config=None):
+    """ Crée l'application Flask. Aucune connexion n'est ouverte ici: le backend neo4j se
+    connecte à la première requête, avec un pool propre à chaque processus (worker) """
+    # Création de l'application Flask
+    app = Flask(__name__)
+    load_config(app)
+    if config:
+        app.config.update(config)
+
+    from app.models import User, Timeline, Suggestions, Cascade, Changes
+    from app.snapshot import friend_graph_from_snapshot
+    entity_cache.configure(app.config["ENTITY_CACHE_SIZE"],
+                           app.config["ENTITY_CACHE_TTL"],
+                           app.config["ENTITY_CACHE_NEGATIVE_TTL"])
+    Timeline.size = app.config["FEED_TIMELINE_SIZE"]
+    Timeline.fanout_max_friends = app.config["FEED_FANOUT_MAX_FRIENDS"]
+    Suggestions.size = app.config["SUGGESTIONS_SIZE"]
+    Cascade.batch_size = app.config["DELETE_BATCH_SIZE"]
+    Cascade.job_threshold = app.config["DELETE_JOB_THRESHOLD"]
+    collection_versions.configure(app.config["CONDITIONAL_CACHE_SIZE"], app.config["CONDITIONAL_MAX_AGE"])
+
+    # CountingGraph compte les allers-retours vers Neo4j pour chaque requête HTTP
+    graph = _neo4j_graph(app) if app.config["GRAPH_BACKEND"] == "neo4j" else None
+    backend = create_repository(app.config["GRAPH_BACKEND"], graph)
+    if graph is None and app.config["SCHEMA_BOOTSTRAP"]:
+        backend.ensure_schema()
+    # Repository instrumenté pour exporter la latence de chaque requête sur /api/metrics
+    app.extensions["graph"] = graph
+    app.extensions["repository"] = InstrumentedRepository(backend, app.config["GRAPH_BACKEND"],
+                                                          slow_query_ms=app.config["SLOW_QUERY_MS"])
+    # L'instantané des amitiés est chargé en arrière-plan à la première utilisation dans chaque processus,
+    # depuis le fichier FRIEND_GRAPH_SNAPSHOT_FILE s'il est récent (les rechargements lisent la base)
+    snapshot_file = app.config["FRIEND_GRAPH_SNAPSHOT_FILE"]
+    friend_graph.configure(app.extensions["repository"].list_friendships,
+                           enabled=app.config["FRIEND_GRAPH_SNAPSHOT"],
+                           refresh_seconds=app.config["FRIEND_GRAPH_REFRESH_SECONDS"],
+                           initial_loader=functools.partial(
+                               friend_graph_from_snapshot, snapshot_file,
+                               max_age=app.config["FRIEND_GRAPH_SNAPSHOT_FILE_MAX_AGE"]) if snapshot_file else None)
+    # Index de recherche, chargé en arrière-plan à la première recherche. Le backend memory perd ses
+    # données à l'arrêt: son index n'est pas sauvegardé
+    search_index.configure(app.extensions["repository"],
+                           path=(app.config["SEARCH_INDEX_PATH"] or None) if graph is not None else None,
+                           enabled=app.config["SEARCH_INDEX"],
+                           load_wait_seconds=app.config["SEARCH_LOAD_WAIT_SECONDS"],
+                           save_seconds=app.config["SEARCH_INDEX_SAVE_SECONDS"])
+    # Scores des posts tendance, chargés en arrière-plan à la première lecture (sans sauvegarde avec memory)
+    trending.configure(app.extensions["repository"],
+                       enabled=app.config["TRENDING"],
+                       half_life_hours=app.config["TRENDING_HALF_LIFE_HOURS"],
+                       like_weight=app.config["TRENDING_LIKE_WEIGHT"],
+                       comment_weight=app.config["TRENDING_COMMENT_WEIGHT"],
+                       size=app.config["TRENDING_SIZE"],
+                       refresh_seconds=app.config["TRENDING_REFRESH_SECONDS"],
+                       path=(app.config["TRENDING_CHECKPOINT_PATH"] or None) if graph is not None else None,
+                       checkpoint_seconds=app.config["TRENDING_CHECKPOINT_SECONDS"],
+                       rebuild_seconds=app.config["TRENDING_REBUILD_SECONDS"],
+                       load_wait_seconds=app.config["TRENDING_LOAD_WAIT_SECONDS"])
+    # Likes différés: écrits par lots UNWIND depuis un thread d'arrière-plan, vidés à l'arrêt du processus
+    repository = app.extensions["repository"]
+    like_buffer.configure(lambda rows: User.set_likes(repository, rows),
+                          enabled=app.config["LIKE_WRITE_BEHIND"],
+                          max_pending=app.config["LIKE_BUFFER_MAX_PENDING"],
+                          flush_seconds=app.config["LIKE_FLUSH_SECONDS"],
+                          journal_dir=app.config["LIKE_JOURNAL_DIR"] or None,
+                          fsync=app.config["LIKE_JOURNAL_FSYNC"])
+    # Jobs d'arrière-plan (grosses suppressions), exécutés par un pool de threads de chaque processus
+    jobs.configure(repository, workers=app.config["JOB_WORKERS"],
+                   retention_seconds=app.config["JOB_RETENTION_HOURS"] * 3600)
+    # Budgets de concurrence des requêtes (lectures, écritures, routes lourdes)
+    admission_control.configure(
+        enabled=app.config["ADMISSION_CONTROL"],
+        budgets={route_class: (app.config[f"ADMISSION_{route_class.upper()}_LIMIT"],
+                               app.config[f"ADMISSION_{route_class.upper()}_QUEUE"],
+                               app.config["ADMISSION_QUEUE_TIMEOUT"])
+                 for route_class in ROUTE_CLASSES},
+        retry_after=app.config["ADMISSION_RETRY_AFTER"])
+    # Pool de threads des sections du profil agrégé
+    profile_loader.configure(workers=app.config["PROFILE_WORKERS"], queue=app.config["PROFILE_QUEUE"],
+                             timeout=app.config["PROFILE_SECTION_TIMEOUT"],
+                             section_timeouts={section: app.config[f"PROFILE_{section.upper()}_TIMEOUT"]
+                                               for section in PROFILE_TASKS
+                                               if app.config[f"PROFILE_{section.upper()}_TIMEOUT"] is not None})
+    # Journal des modifications: chaque processus y ajoute ses écritures et applique celles des autres.
+    # Le backend memory n'est pas partagé entre processus: pas de journal
+    changelog.configure(directory=(app.config["CHANGELOG_DIR"] or None) if graph is not None else None,
+                        segment_bytes=int(app.config["CHANGELOG_SEGMENT_MB"] * 1024 * 1024),
+                        max_segments=app.config["CHANGELOG_SEGMENTS"],
+                        poll_seconds=app.config["CHANGELOG_POLL_SECONDS"],
+                        apply=lambda events: Changes.apply(repository, events))
+
+    # Mesure de la latence et des codes de retour de chaque route (exportés sur /api/metrics)
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    # Contrôle d'admission: la requête attend une place dans sa classe de routes ou est rejetée (503).
+    # Les routes d'exploitation et le journal des modifications n'accèdent pas (ou peu) au stockage.
+    # Une lecture en streaming (sans limite, toute une collection) est une requête lourde
+    @app.before_request
+    def admit_request():
+        if not admission_control.enabled or request.endpoint is None or request.blueprint in ("admin", "changes"):
+            return
+        view = app.view_functions[request.endpoint]
+        route_class = getattr(view, "admission_class", None)
+        if route_class is None and request.method in ("GET", "HEAD"):
+            route_class = "heavy" if requested_stream(request.args) else "read"
+        route_class = route_class or "write"
+        admission_control.acquire(route_class)
+        g.admission_class = route_class
+
+    # La place d'une réponse en streaming est gardée jusqu'à l'envoi de son dernier morceau
+    @app.after_request
+    def release_admission_on_close(response):
+        if response.is_streamed and "admission_class" in g:
+            response.call_on_close(functools.partial(admission_control.release, g.pop("admission_class")))
+        return response
+
+    @app.teardown_request
+    def release_admission(exc):
+        route_class = g.pop("admission_class", None)
+        if route_class is not None:
+            admission_control.release(route_class)
+
+    @app.errorhandler(Overloaded)
+    def overloaded(e):
+        response = jsonify({"error": "Service overloaded, retry later", "route_class": e.route_class})
+        response.headers["Retry-After"] = str(admission_control.retry_after)
+        return response, 503
+
+    # Suivi du journal des modifications dès la première requête de chaque processus
+    @app.before_request
+    def start_changelog():
+        changelog.start()
+
+    # Une réponse en streaming n'est mesurée qu'une fois son corps envoyé (lignes lues depuis le stockage)
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop("request_started", None)
+        if started is None:
+            return response
+        method, status = request.method, str(response.status_code)
+        route = request.url_rule.rule if request.url_rule else "<unmatched>"
+        # g n'est plus accessible à la fermeture de la réponse: l'objet lui-même est conservé
+        state = g._get_current_object()
+
+        def record():
+            http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+            http_requests.inc(method=method, route=route, status=status)
+            http_request_round_trips.inc(state.get("db_round_trips", 0), method=method, route=route)
+
+        if response.is_streamed:
+            response.call_on_close(record)
+        else:
+            record()
+        return response
+
+    # Expose le nombre d'allers-retours vers le stockage de chaque requête dans l'en-tête X-DB-Round-Trips
+    # (pour une réponse en streaming: les requêtes envoyées avant le premier morceau du corps)
+    @app.after_request
+    def add_round_trips_header(response):
+        response.headers["X-DB-Round-Trips"] = str(round_trips())
+        return response
+
+    # Compression des réponses JSON selon l'en-tête Accept-Encoding du client
+    @app.after_request
+    def compress(response):
+        if not app.config["COMPRESSION"]:
+            return response
+        return compress_response(response, app.config["COMPRESSION_MIN_BYTES"], app.config["COMPRESSION_LEVEL"])
+
+    # Import des routes
+    from app.routes import users, posts, comments, search, jobs as jobs_routes, changes, bulk, admin
+    # Import des commandes CLI (flask --app app init-schema)
+    from app import commands
+
+    # Enregistrement des blueprints avec le préfixe '/api'
+    app.register_blueprint(users.users_bp, url_prefix='/api')
+    app.register_blueprint(posts.posts_bp, url_prefix='/api')
+    app.register_blueprint(comments.comments_bp, url_prefix='/api')
+    app.register_blueprint(search.search_bp, url_prefix='/api')
+    app.register_blueprint(jobs_routes.jobs_bp, url_prefix='/api')
+    app.register_blueprint(changes.changes_bp, url_prefix='/api')
+    app.register_blueprint(bulk.bulk_bp, url_prefix='/api')
+    app.register_blueprint(admin.admin_bp, url_prefix='/api')
+    commands.register(app)
+    return app
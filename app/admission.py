@@ -0,0 +1,117 @@
+# Contrôle d'admission des requêtes qui accèdent au stockage. Chaque classe de routes (read: lectures,
+# write: écritures, heavy: parcours du graphe, listes coûteuses et imports) a un nombre maximal de
+# requêtes en cours et une file d'attente bornée. Une requête qui trouve la file pleine, ou qui y attend
+# plus que le délai de sa classe, est rejetée aussitôt (503 et Retry-After): quand le stockage ralentit,
+# les threads ne s'accumulent pas sans limite et les routes d'exploitation restent disponibles.
+#
+# La classe d'une route est donnée par le décorateur admission(); à défaut, GET et HEAD sont des
+# lectures et les autres méthodes des écritures.
+import threading
+import time
+from app.metrics import admission_active, admission_waiting, admission_wait, admission_rejections
+
+ROUTE_CLASSES = ("read", "write", "heavy")
+
+
+class Overloaded(Exception):
+    """Requête rejetée par le contrôle d'admission (file pleine ou délai d'attente dépassé)"""
+
+    def __init__(self, route_class, reason):
+        super().__init__(f"{route_class} requests overloaded ({reason})")
+        self.route_class = route_class
+        self.reason = reason
+
+
+def admission(route_class):
+    """Décorateur des routes dont la classe n'est pas déduite de la méthode HTTP"""
+    if route_class not in ROUTE_CLASSES:
+        raise ValueError(f"Unknown route class {route_class!r}")
+
+    def decorator(view):
+        view.admission_class = route_class
+        return view
+    return decorator
+
+
+class _Budget:
+    """Requêtes en cours et en attente d'une classe de routes"""
+
+    def __init__(self, limit, queue_size, timeout):
+        self.condition = threading.Condition()
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "timeout": 0}
+
+
+class AdmissionControl:
+    """Budgets de concurrence par classe de routes, partagés par les threads du processus"""
+
+    def __init__(self):
+        self.enabled = False
+        self.retry_after = 1
+        self._budgets = {}
+
+    def configure(self, enabled=True, budgets=None, retry_after=1):
+        """ budgets: {classe: (requêtes en cours au plus, taille de la file, attente maximale en secondes)} """
+        self.enabled = enabled
+        self.retry_after = retry_after
+        self._budgets = {route_class: _Budget(*budget) for route_class, budget in (budgets or {}).items()}
+        for route_class in self._budgets:
+            admission_active.set(0, route_class=route_class)
+            admission_waiting.set(0, route_class=route_class)
+
+    def acquire(self, route_class):
+        """Attend une place dans la classe (dans l'ordre d'arrivée); lève Overloaded sinon"""
+        budget = self._budgets[route_class]
+        started = time.monotonic()
+        with budget.condition:
+            # Une requête ne double pas celles qui attendent déjà
+            if budget.waiting or budget.active >= budget.limit:
+                if budget.waiting >= budget.queue_size:
+                    self._reject(budget, route_class, "queue_full")
+                budget.waiting += 1
+                admission_waiting.set(budget.waiting, route_class=route_class)
+                deadline = started + budget.timeout
+                try:
+                    while budget.active >= budget.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._reject(budget, route_class, "timeout")
+                        budget.condition.wait(remaining)
+                finally:
+                    budget.waiting -= 1
+                    admission_waiting.set(budget.waiting, route_class=route_class)
+            budget.active += 1
+            budget.admitted += 1
+            admission_active.set(budget.active, route_class=route_class)
+        admission_wait.observe(time.monotonic() - started, route_class=route_class)
+
+    def _reject(self, budget, route_class, reason):
+        budget.rejected[reason] += 1
+        admission_rejections.inc(route_class=route_class, reason=reason)
+        raise Overloaded(route_class, reason)
+
+    def release(self, route_class):
+        budget = self._budgets[route_class]
+        with budget.condition:
+            budget.active -= 1
+            admission_active.set(budget.active, route_class=route_class)
+            budget.condition.notify()
+
+    def stats(self):
+        classes = {}
+        for route_class, budget in self._budgets.items():
+            with budget.condition:
+                classes[route_class] = {"limit": budget.limit, "queue_size": budget.queue_size,
+                                        "timeout": budget.timeout, "active": budget.active,
+                                        "waiting": budget.waiting, "admitted": budget.admitted,
+                                        "rejected": dict(budget.rejected)}
+        return {"enabled": self.enabled, "retry_after": self.retry_after, "classes": classes}
+
+
+# Instance partagée par les requêtes du processus, configurée par create_app
+admission_control = AdmissionControl()
@@ -0,0 +1,194 @@
+# Import en masse: validation ligne par ligne puis écriture par lots UNWIND
+import json
+import time
+import uuid
+from datetime import datetime
+from app.models import User, Post, Comment
+from app.validation import validate_user_payload, validate_post_payload, validate_comment_payload
+
+DEFAULT_BATCH_SIZE = 500
+MAX_BATCH_SIZE = 10000
+# Nombre maximal de lignes rejetées détaillées dans le rapport (toutes restent comptées)
+MAX_REJECTED_DETAILS = 100
+
+
+class InvalidLine:
+    """Ligne JSONL qui n'a pas pu être décodée"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def iter_jsonl(lines):
+    """ Décode un flux de lignes JSONL (str ou bytes) sans le charger en mémoire.
+    Renvoie des paires (numéro de ligne, objet); les lignes vides sont ignorées """
+    for lineno, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield lineno, json.loads(line)
+        except ValueError as e:
+            yield lineno, InvalidLine(f"Invalid JSON: {e}")
+
+
+def _now():
+    return int(datetime.now().timestamp())
+
+
+def _entity_fields(row):
+    # Identifiant et date de création optionnels: conservés pour une migration, générés sinon
+    entity_id = row.get('id') or str(uuid.uuid4())
+    created_at = row.get('created_at', _now())
+    if not isinstance(entity_id, str) or not isinstance(created_at, int):
+        return None
+    return {"id": entity_id, "created_at": created_at}
+
+
+def _prepare_user(row):
+    error = validate_user_payload(row)
+    if error:
+        return None, error
+    fields = _entity_fields(row)
+    if fields is None:
+        return None, "Invalid id or created_at"
+    return dict(fields, name=row['name'], email=row['email']), None
+
+
+def _prepare_post(row):
+    error = validate_post_payload(row)
+    if error:
+        return None, error
+    if not row.get('user_id'):
+        return None, "Missing user_id"
+    fields = _entity_fields(row)
+    if fields is None:
+        return None, "Invalid id or created_at"
+    return dict(fields, title=row['title'], content=row['content'], user_id=row['user_id']), None
+
+
+def _prepare_comment(row):
+    error = validate_comment_payload(row)
+    if error:
+        return None, error
+    if not row.get('post_id'):
+        return None, "Missing post_id"
+    fields = _entity_fields(row)
+    if fields is None:
+        return None, "Invalid id or created_at"
+    return dict(fields, content=row['content'], user_id=row['user_id'], post_id=row['post_id']), None
+
+
+def _prepare_friend(row):
+    if not row.get('user_id') or not row.get('friend_id'):
+        return None, "Missing user_id or friend_id"
+    return {"user_id": row['user_id'], "friend_id": row['friend_id']}, None
+
+
+def _prepare_like(row):
+    if not row.get('user_id'):
+        return None, "Missing user_id"
+    if bool(row.get('post_id')) == bool(row.get('comment_id')):
+        return None, "Exactly one of post_id or comment_id is required"
+    return {"user_id": row['user_id'],
+            "post_id": row.get('post_id'),
+            "comment_id": row.get('comment_id')}, None
+
+
+# Pour chaque type: préparation/validation d'une ligne, écriture d'un lot, erreur si non écrite
+BULK_KINDS = {
+    "users": (_prepare_user, User.bulk_create, "Email already exists"),
+    "posts": (_prepare_post, Post.bulk_create, "User not found"),
+    "comments": (_prepare_comment, Comment.bulk_create, "User or post not found"),
+    "friends": (_prepare_friend, User.bulk_add_friends, "User or friend not found"),
+    "likes": (_prepare_like, User.bulk_add_likes, "User or target not found"),
+}
+
+
+class BulkReport:
+    """Compteurs d'un import: lignes reçues, écrites, rejetées et débit de chaque lot"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.received = 0
+        self.written = 0
+        self.rejected = 0
+        self.rejected_rows = []
+        self.batches = []
+        self.started = time.perf_counter()
+
+    def reject(self, position, error):
+        self.rejected += 1
+        if len(self.rejected_rows) < MAX_REJECTED_DETAILS:
+            self.rejected_rows.append({"row": position, "error": error})
+
+    def to_dict(self):
+        seconds = time.perf_counter() - self.started
+        return {
+            "kind": self.kind,
+            "received": self.received,
+            "written": self.written,
+            "rejected": self.rejected,
+            "rejected_rows": self.rejected_rows,
+            "batches": self.batches,
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(self.written / seconds, 1) if seconds else None,
+        }
+
+
+def load(repo, kind, rows, batch_size=DEFAULT_BATCH_SIZE, on_batch=None, on_reject=None):
+    """ Importe des lignes (paires position, objet) d'un type donné.
+    Seul un lot est gardé en mémoire; chaque lot est écrit en une requête UNWIND.
+    on_batch(stats) et on_reject(position, row, error) sont appelés au fil de l'import """
+    prepare, write, not_written_error = BULK_KINDS[kind]
+    report = BulkReport(kind)
+
+    def reject(position, row, error):
+        report.reject(position, error)
+        if on_reject:
+            on_reject(position, row, error)
+
+    def flush(batch, positions):
+        started = time.perf_counter()
+        written = write(repo, batch)
+        seconds = time.perf_counter() - started
+        for item in batch:
+            if item["i"] not in written:
+                row = {key: value for key, value in item.items() if key != "i"}
+                reject(positions[item["i"]], row, not_written_error)
+        report.written += len(written)
+        stats = {
+            "batch": len(report.batches) + 1,
+            "rows": len(batch),
+            "written": len(written),
+            "seconds": round(seconds, 3),
+            "rows_per_sec": round(len(batch) / seconds, 1) if seconds else None,
+        }
+        report.batches.append(stats)
+        if on_batch:
+            on_batch(stats)
+
+    batch, positions = [], []
+    for position, row in rows:
+        report.received += 1
+        if isinstance(row, InvalidLine):
+            reject(position, None, row.error)
+            continue
+        if not isinstance(row, dict):
+            reject(position, row, "Row must be a JSON object")
+            continue
+        params, error = prepare(row)
+        if error:
+            reject(position, row, error)
+            continue
+        params["i"] = len(batch)
+        batch.append(params)
+        positions.append(position)
+        if len(batch) >= batch_size:
+            flush(batch, positions)
+            batch, positions = [], []
+    if batch:
+        flush(batch, positions)
+    return report.to_dict()
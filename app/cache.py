@@ -0,0 +1,144 @@
+# Cache local au processus des entités lues par id (User, Post, Comment)
+import threading
+import time
+from collections import OrderedDict
+
+# Valeur mise en cache pour un id absent de la base (cache négatif des 404)
+_MISSING = object()
+
+
+class EntityCache:
+    """ Cache LRU borné avec expiration (TTL) et cache négatif.
+    Les clés sont des tuples (label, id); les valeurs des dicts de propriétés """
+
+    def __init__(self, max_size=10000, ttl=60.0, negative_ttl=5.0):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Incrémenté à chaque invalidation: un chargement commencé avant n'est pas mis en cache
+        self._epoch = 0
+        self.configure(max_size, ttl, negative_ttl)
+        self.reset_stats()
+
+    def configure(self, max_size, ttl, negative_ttl):
+        """ max_size=0 désactive le cache """
+        with self._lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            self.negative_ttl = negative_ttl
+            self._entries.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return False, None
+        value, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return False, None
+        self._entries.move_to_end(key)
+        if value is _MISSING:
+            self.negative_hits += 1
+            return True, None
+        self.hits += 1
+        return True, dict(value)
+
+    def _store(self, key, value, epoch):
+        if self.max_size <= 0 or epoch != self._epoch:
+            return
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+        self._entries[key] = (_MISSING if value is None else dict(value), time.monotonic() + ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_load(self, key, load):
+        """ Renvoie la valeur en cache ou appelle load() (None si l'entité n'existe pas) """
+        with self._lock:
+            if self.max_size <= 0:
+                epoch = None
+            else:
+                found, value = self._lookup(key)
+                if found:
+                    return value
+                epoch = self._epoch
+        value = load()
+        if epoch is not None:
+            with self._lock:
+                self._store(key, value, epoch)
+        return value
+
+    def get_many_or_load(self, keys, load_many):
+        """ Version groupée de get_or_load: les clés absentes du cache sont chargées en un seul
+        appel load_many(clés manquantes), qui renvoie {clé: valeur} (clé absente = entité inexistante).
+        Renvoie {clé: valeur ou None} """
+        keys = list(dict.fromkeys(keys))
+        values = {}
+        missing = keys
+        epoch = None
+        with self._lock:
+            if self.max_size > 0:
+                missing = []
+                for key in keys:
+                    found, value = self._lookup(key)
+                    if found:
+                        values[key] = value
+                    else:
+                        missing.append(key)
+                epoch = self._epoch
+        if missing:
+            loaded = load_many(missing)
+            for key in missing:
+                values[key] = loaded.get(key)
+            if epoch is not None:
+                with self._lock:
+                    for key in missing:
+                        self._store(key, values[key], epoch)
+        return values
+
+    def invalidate(self, *keys):
+        """Retire les clés données du cache (entrées positives comme négatives)"""
+        with self._lock:
+            self._epoch += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.negative_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "negative_ttl": self.negative_ttl,
+                "hits": self.hits,
+                "negative_hits": self.negative_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.negative_hits) / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# Instance partagée par les modèles, configurée au démarrage depuis app.config
+entity_cache = EntityCache()
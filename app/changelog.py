@@ -0,0 +1,305 @@
+# Journal des modifications: chaque écriture des modèles y ajoute un événement compact (type d'entité,
+# id, opération, id lié, instant). Le retrait d'un like ou d'un commentaire porte aussi l'instant de sa
+# création (created_at), pour que les scores de tendance retirent exactement ce qui avait été compté. Le journal est partagé par les processus d'une même machine: segments
+# de taille fixe projetés en mémoire (mmap) dans CHANGELOG_DIR, ajoutés sous verrou de fichier (flock).
+# Chaque processus suit le journal depuis un thread d'arrière-plan et applique les événements des autres
+# processus à son état local (cache, instantané des amitiés, index de recherche, tendances). Les
+# consommateurs externes le lisent par offset (GET /api/changes).
+#
+# Offsets: l'offset d'un événement est sa position absolue dans le journal (base du segment + position
+# dans le segment); il croît avec chaque événement et sert de numéro de version. Le segment de base b
+# couvre les offsets [b, b + taille du segment) et s'appelle changes-<b>.log. Les segments les plus anciens
+# sont supprimés au-delà de max_segments.
+#
+# Segment: en-tête de HEADER_SIZE octets (magic, position de fin des événements écrits, drapeau de
+# clôture) puis des enregistrements [longueur, crc32, événement JSON]. La position de fin n'est avancée
+# qu'une fois l'enregistrement écrit: un lecteur ne voit jamais d'événement partiel.
+import bisect
+import fcntl
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+import zlib
+
+logger = logging.getLogger("app.changelog")
+
+MAGIC = b"CHG1"
+HEADER_SIZE = 64
+# En-tête: magic, position de fin (relative au segment), segment clos
+HEADER = struct.Struct(">4sQB")
+RECORD = struct.Struct(">II")
+SEGMENT_RE = re.compile(r"^changes-(\d{20})\.log$")
+
+
+class ChangelogTruncated(Exception):
+    """L'offset demandé est antérieur au plus ancien segment conservé"""
+
+
+class _Segment:
+    """Segment projeté en mémoire"""
+
+    def __init__(self, path, base, size, create=False):
+        self.path = path
+        self.base = base
+        # Un nouveau segment est préparé sous un nom temporaire puis renommé: les lecteurs ne voient
+        # jamais de segment sans en-tête
+        fd = os.open(f"{path}.tmp" if create else path, os.O_RDWR | (os.O_CREAT if create else 0), 0o644)
+        try:
+            if create:
+                os.ftruncate(fd, size)
+            # Un segment existant garde sa taille, même si segment_bytes a changé depuis
+            self.size = os.fstat(fd).st_size
+            self.mm = mmap.mmap(fd, self.size)
+        finally:
+            os.close(fd)
+        if create:
+            self.mm[:HEADER.size] = HEADER.pack(MAGIC, HEADER_SIZE, 0)
+            os.rename(f"{path}.tmp", path)
+        elif self.mm[:4] != MAGIC:
+            raise ValueError(f"{path} is not a change log segment")
+
+    @property
+    def position(self):
+        return HEADER.unpack_from(self.mm)[1]
+
+    @property
+    def sealed(self):
+        return HEADER.unpack_from(self.mm)[2] == 1
+
+    def write(self, data):
+        position = self.position
+        self.mm[position:position + len(data)] = data
+        HEADER.pack_into(self.mm, 0, MAGIC, position + len(data), 0)
+        return self.base + position
+
+    def seal(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, self.position, 1)
+
+    def read(self, position, limit):
+        """Événements à partir de la position donnée: ([(offset, événement)], position suivante)"""
+        end = self.position
+        events = []
+        while position + RECORD.size <= end and len(events) < limit:
+            length, checksum = RECORD.unpack_from(self.mm, position)
+            payload = self.mm[position + RECORD.size:position + RECORD.size + length]
+            if zlib.crc32(payload) != checksum:
+                logger.error("Corrupted change event at offset %d in %s", self.base + position, self.path)
+                position = end
+                break
+            events.append((self.base + position, json.loads(payload)))
+            position += RECORD.size + length
+        return events, position
+
+    def close(self):
+        self.mm.close()
+
+
+class ChangeLog:
+    """Journal des modifications partagé par les processus, suivi par un thread de chaque processus"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.directory = None
+        self.segment_bytes = 16 * 1024 * 1024
+        self.max_segments = 8
+        self.poll_seconds = 0.2
+        self._apply = None
+        self.appended = 0
+        self.applied = 0
+        self._reset()
+
+    def _reset(self):
+        self._pid = None
+        self._lock_fd = None
+        self._head = None
+        self._thread = None
+        self._segments = {}
+        # Offset jusqu'auquel le journal a été suivi (et les événements des autres processus appliqués)
+        self.position = None
+
+    @property
+    def enabled(self):
+        return self.directory is not None
+
+    def configure(self, directory=None, segment_bytes=16 * 1024 * 1024, max_segments=8, poll_seconds=0.2,
+                  apply=None):
+        """ directory=None désactive le journal; apply(events) applique les événements des autres processus """
+        with self._lock:
+            self._close()
+            self.directory = directory
+            self.segment_bytes = segment_bytes
+            self.max_segments = max_segments
+            self.poll_seconds = poll_seconds
+            self._apply = apply
+            self.appended = 0
+            self.applied = 0
+
+    def start(self):
+        """Ouvre le journal et démarre le suivi dans le processus courant (sans effet s'il est démarré)"""
+        if not self.enabled or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._reset()
+            self._pid = os.getpid()
+            os.makedirs(self.directory, exist_ok=True)
+            self._lock_fd = os.open(os.path.join(self.directory, ".lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            # Le suivi commence à la fin du journal: l'état local est lu depuis le stockage
+            offset = self.position = self.end_offset()
+            self._thread = threading.Thread(target=self._run, args=(self._pid, offset),
+                                            name="changelog", daemon=True)
+            self._thread.start()
+
+    def _close(self):
+        if self._pid == os.getpid():
+            for segment in self._segments.values():
+                segment.close()
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+        self._reset()
+
+    # Segments
+
+    def _bases(self):
+        return sorted(int(match.group(1)) for match in map(SEGMENT_RE.match, os.listdir(self.directory)) if match)
+
+    def _path(self, base):
+        return os.path.join(self.directory, f"changes-{base:020d}.log")
+
+    def _segment(self, base, create=False):
+        segment = self._segments.get(base)
+        if segment is None:
+            segment = self._segments[base] = _Segment(self._path(base), base, self.segment_bytes, create=create)
+        return segment
+
+    def _writable(self, size):
+        """Segment courant avec la place nécessaire (sous verrou de fichier), après rotation si besoin"""
+        if self._head is None or self._head.sealed:
+            bases = self._bases()
+            self._head = self._segment(bases[-1]) if bases else self._segment(0, create=True)
+        if self._head.sealed or self._head.position + size > self._head.size:
+            self._head.seal()
+            self._head = self._segment(self._head.base + self._head.size, create=True)
+            bases = self._bases()
+            for base in bases[:-self.max_segments]:
+                os.remove(self._path(base))
+                segment = self._segments.pop(base, None)
+                if segment is not None:
+                    segment.close()
+        return self._head
+
+    def end_offset(self):
+        """Offset du prochain événement écrit"""
+        bases = self._bases()
+        if not bases:
+            return 0
+        return self._segment(bases[-1]).base + self._segment(bases[-1]).position
+
+    # Écriture
+
+    def append(self, events):
+        """ Ajoute des événements (type, id, opération, id lié ou None[, created_at]); renvoie l'offset du
+        dernier """
+        if not self.enabled or not events:
+            return None
+        self.start()
+        now = round(time.time(), 3)
+        records = []
+        for entity_type, entity_id, op, ref, *created_at in events:
+            payload = json.dumps([now, self._pid, entity_type, entity_id, op, ref, *created_at],
+                                 separators=(",", ":")).encode("utf-8")
+            records.append(RECORD.pack(len(payload), zlib.crc32(payload)) + payload)
+        offset = None
+        with self._lock:
+            fcntl.flock(self._lock_fd, fcntl.LOCK_EX)
+            try:
+                for record in records:
+                    if HEADER_SIZE + len(record) > self.segment_bytes:
+                        logger.error("Change event too large for a segment (%d bytes), dropped", len(record))
+                        continue
+                    offset = self._writable(len(record)).write(record)
+            finally:
+                fcntl.flock(self._lock_fd, fcntl.LOCK_UN)
+            self.appended += len(records)
+        return offset
+
+    # Lecture
+
+    def read(self, offset=0, limit=100):
+        """ Événements à partir de offset (0: depuis le plus ancien conservé), au plus limit.
+        Renvoie (événements [{offset, at, type, id, op, ref[, created_at]}], offset suivant);
+        lève ChangelogTruncated """
+        with self._lock:
+            self.start()
+            bases = self._bases()
+            if not bases:
+                return [], offset
+            if offset == 0:
+                offset = bases[0] + HEADER_SIZE
+            elif offset < bases[0]:
+                raise ChangelogTruncated(offset)
+            # Les segments supprimés par un autre processus ne restent pas projetés
+            for base in set(self._segments) - set(bases):
+                self._segments.pop(base).close()
+            events = []
+            index = bisect.bisect_right(bases, offset) - 1
+            while len(events) < limit:
+                base = bases[index]
+                segment = self._segment(base)
+                found, position = segment.read(max(offset - base, HEADER_SIZE), limit - len(events))
+                events.extend(found)
+                offset = base + position
+                if len(events) >= limit or not segment.sealed or position < segment.position:
+                    break
+                # Segment clos et lu en entier: suite au segment suivant (s'il est déjà créé)
+                if index + 1 == len(bases):
+                    break
+                index += 1
+                offset = bases[index] + HEADER_SIZE
+            return [dict({"offset": event_offset, "at": at, "type": entity_type, "id": entity_id, "op": op,
+                          "ref": ref, "pid": pid}, **({"created_at": created_at[0]} if created_at else {}))
+                    for event_offset, (at, pid, entity_type, entity_id, op, ref, *created_at) in events], offset
+
+    def since(self, offset, batch_size=1000):
+        """ Tous les événements écrits depuis offset (0: depuis le début du journal, pas seulement depuis
+        le plus ancien segment conservé), lus par lots; lève ChangelogTruncated """
+        offset = offset or HEADER_SIZE
+        while True:
+            events, offset = self.read(offset, batch_size)
+            yield from events
+            if len(events) < batch_size:
+                return
+
+    def _run(self, pid, offset):
+        while self._pid == pid:
+            time.sleep(self.poll_seconds)
+            try:
+                while self._pid == pid:
+                    events, offset = self.read(offset, 1000)
+                    remote = [event for event in events if event["pid"] != pid]
+                    if remote and self._apply is not None:
+                        self._apply(remote)
+                        self.applied += len(remote)
+                    self.position = offset
+                    if len(events) < 1000:
+                        break
+            except ChangelogTruncated:
+                logger.error("Change log truncated before offset %d: local state may be stale", offset)
+                offset = self.position = self.end_offset()
+            except Exception as e:
+                logger.error("Change log tailing failed at offset %d: %s", offset, e)
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": self.enabled, "directory": self.directory, "appended": self.appended,
+                    "applied": self.applied, "end_offset": self.end_offset() if self._pid == os.getpid() else None}
+
+
+# Instance partagée par les modèles et la route des modifications, configurée par create_app
+changelog = ChangeLog()
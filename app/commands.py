@@ -0,0 +1,147 @@
+# Commandes d'administration accessibles via la CLI Flask (flask --app app <commande>)
+import click
+from flask.cli import with_appcontext
+from app import repo
+from app.models import Post, Comment, Timeline, Suggestions
+from app.search import search_index
+from app.trending import trending
+from app.snapshot import DEFAULT_CHUNK_ROWS, Snapshot, export_snapshot, load_snapshot
+
+
+# Commande pour créer les contraintes d'unicité et les index
+@click.command("init-schema")
+@with_appcontext
+def init_schema():
+    """Déclare les contraintes et index Neo4j (idempotent)"""
+    for statement in repo.ensure_schema():
+        click.echo(statement)
+
+
+# Commande pour recalculer les timelines (à lancer quand les relations FRIENDS_WITH changent)
+@click.command("rebuild-timelines")
+@with_appcontext
+@click.option("--user-id", help="Ne recalcule que la timeline de cet utilisateur")
+@click.option("--batch-size", default=500, show_default=True, help="Utilisateurs traités par requête")
+def rebuild_timelines(user_id, batch_size):
+    """Recalcule les timelines matérialisées à partir des amitiés et des posts"""
+    if user_id:
+        rebuilt, _ = Timeline.rebuild(repo, user_id=user_id)
+        click.echo(f"{rebuilt} timeline rebuilt")
+        return
+    total, after = 0, None
+    while True:
+        rebuilt, after = Timeline.rebuild(repo, after=after, batch_size=batch_size)
+        if not rebuilt:
+            break
+        total += rebuilt
+        click.echo(f"{total} timelines rebuilt (last user id: {after})")
+
+
+# Commande pour recalculer les suggestions d'amis (après un import en masse ou une suppression d'utilisateurs)
+@click.command("rebuild-suggestions")
+@with_appcontext
+@click.option("--user-id", help="Ne recalcule que les suggestions de cet utilisateur")
+@click.option("--batch-size", default=500, show_default=True, help="Utilisateurs traités par requête")
+def rebuild_suggestions(user_id, batch_size):
+    """Recalcule les suggestions d'amis (amis d'amis classés par amis communs)"""
+    if user_id:
+        rebuilt, _ = Suggestions.rebuild(repo, user_id=user_id)
+        click.echo(f"{rebuilt} user rebuilt")
+        return
+    total, after = 0, None
+    while True:
+        rebuilt, after = Suggestions.rebuild(repo, after=after, batch_size=batch_size)
+        if not rebuilt:
+            break
+        total += rebuilt
+        click.echo(f"{total} users rebuilt (last user id: {after})")
+
+
+# Commande pour corriger la dérive des compteurs like_count / comment_count
+@click.command("reconcile-counters")
+@with_appcontext
+@click.option("--batch-size", default=1000, show_default=True, help="Nœuds recalculés par requête")
+def reconcile_counters(batch_size):
+    """Recalcule les compteurs des posts et commentaires à partir des relations"""
+    for label, model in (("posts", Post), ("comments", Comment)):
+        checked_total, fixed_total, after = 0, 0, None
+        while True:
+            checked, fixed, after = model.reconcile_counters(repo, after=after, batch_size=batch_size)
+            if not checked:
+                break
+            checked_total += checked
+            fixed_total += fixed
+            click.echo(f"{label}: {checked_total} checked, {fixed_total} fixed")
+
+
+# Commande pour reconstruire l'index de recherche plein texte et le sauvegarder
+@click.command("rebuild-search-index")
+@with_appcontext
+def rebuild_search_index():
+    """Réindexe tous les posts et commentaires (SEARCH_INDEX_PATH)"""
+    for kind, count in search_index.rebuild().items():
+        click.echo(f"{count} {kind} indexed")
+    if search_index.path:
+        click.echo(f"Saved to {search_index.path}")
+
+
+# Commande pour recalculer les scores des posts tendance depuis le graphe et les sauvegarder
+@click.command("rebuild-trending")
+@with_appcontext
+@click.option("--batch-size", default=500, show_default=True, help="Posts relus par requête")
+def rebuild_trending(batch_size):
+    """Recalcule les scores de tendance à partir des likes et commentaires récents"""
+    scanned, scored = trending.rebuild(batch_size=batch_size)
+    click.echo(f"{scanned} posts scanned, {scored} trending")
+    if trending.checkpoint():
+        click.echo(f"Saved to {trending.path}")
+
+
+# Commande pour exporter tout le graphe dans un instantané binaire colonnaire
+@click.command("export-snapshot")
+@with_appcontext
+@click.argument("path")
+@click.option("--chunk-rows", default=DEFAULT_CHUNK_ROWS, show_default=True,
+              help="Lignes par bloc (et nœuds lus par requête)")
+def export_graph_snapshot(path, chunk_rows):
+    """ Exporte utilisateurs, posts, commentaires, amitiés et likes dans PATH.
+
+    Les blocs sont écrits au fil de l'eau; la mémoire utilisée dépend de --chunk-rows, pas de la taille
+    du graphe """
+    counts = export_snapshot(repo, path, chunk_rows=chunk_rows,
+                             on_chunk=lambda section, rows: click.echo(f"{section}: {rows} exported"))
+    click.echo(", ".join(f"{rows} {section}" for section, rows in counts.items()) + f" saved to {path}")
+
+
+# Commande pour recharger un instantané (par lots UNWIND; les nœuds existants sont conservés)
+@click.command("import-snapshot")
+@with_appcontext
+@click.argument("path")
+@click.option("--batch-size", default=500, show_default=True, help="Lignes écrites par requête")
+def import_graph_snapshot(path, batch_size):
+    """Recharge dans le graphe un instantané exporté par export-snapshot"""
+    report = load_snapshot(repo, path, batch_size=batch_size,
+                           on_batch=lambda section, rows, written: click.echo(
+                               f"{section}: {rows} read, {written} written"))
+    for section, counts in report.items():
+        click.echo(f"{section}: {counts['written']}/{counts['rows']} written")
+
+
+# Commande pour afficher le contenu d'un instantané (lu en mémoire projetée, sans le charger)
+@click.command("snapshot-info")
+@click.argument("path")
+def snapshot_info(path):
+    """Affiche la taille, le nombre de blocs et de lignes par section d'un instantané"""
+    with Snapshot(path) as snapshot:
+        stats = snapshot.stats()
+    click.echo(f"{stats['bytes']} bytes, {stats['chunks']} chunks")
+    for section, rows in stats["rows"].items():
+        click.echo(f"{section}: {rows}")
+
+
+def register(app):
+    """Ajoute les commandes à la CLI de l'application"""
+    for command in (init_schema, rebuild_timelines, rebuild_suggestions, reconcile_counters,
+                    rebuild_search_index, rebuild_trending, export_graph_snapshot, import_graph_snapshot,
+                    snapshot_info):
+        app.cli.add_command(command)
@@ -0,0 +1,181 @@
+# Réponses conditionnelles et compression des routes de lecture.
+#
+# Chaque collection (User, Post, Comment, Friendship) a un compteur de version, incrémenté par les
+# écritures du processus (voir models). Une réponse de lecture porte un ETag (empreinte du corps) et un
+# Last-Modified (instant où ce corps a été observé pour la première fois). Quand un client renvoie l'ETag
+# (If-None-Match) ou la date (If-Modified-Since) d'une réponse récente dont les collections n'ont pas changé
+# depuis, la réponse 304 est envoyée sans interroger le stockage ni sérialiser. Les écritures des autres
+# processus ne sont vues par ces compteurs qu'à travers le journal des modifications (avec un léger délai,
+# et pas du tout s'il est désactivé): ce raccourci est limité à max_age secondes, au-delà la requête est
+# exécutée et son empreinte comparée. Last-Modified est à la seconde: si le corps a changé pendant la
+# seconde de son Last-Modified, cette date ne distingue plus les deux corps et seul l'ETag vaut un 304.
+import functools
+import gzip
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from email.utils import formatdate
+from flask import request, make_response, current_app
+
+# Types de contenu compressés
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class CollectionVersions:
+    """ Compteurs de version des collections et dernières réponses conditionnelles connues:
+    {chemin complet: (etag, last_modified, exact, versions, vérifiée à)} en LRU borné; exact est faux si un
+    autre corps a été observé pendant la seconde last_modified """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._responses = OrderedDict()
+        self.max_size = 10000
+        self.max_age = 10.0
+        self.hits = 0
+
+    def configure(self, max_size=10000, max_age=10.0):
+        """ max_age=0 désactive le raccourci (les 304 sont alors décidés après exécution de la requête) """
+        with self._lock:
+            self.max_size = max_size
+            self.max_age = max_age
+            self._responses.clear()
+
+    def bump(self, *collections):
+        with self._lock:
+            for collection in collections:
+                self._versions[collection] = self._versions.get(collection, 0) + 1
+
+    def bump_all(self):
+        with self._lock:
+            for collection in self._versions:
+                self._versions[collection] += 1
+            self._versions[None] = self._versions.get(None, 0) + 1
+
+    def snapshot(self, collections):
+        with self._lock:
+            return (self._versions.get(None, 0),) + tuple(self._versions.get(collection, 0)
+                                                        for collection in collections)
+
+    def fresh(self, key, versions):
+        """ (etag, last_modified, exact) de la dernière réponse si elle est récente et ses collections
+        inchangées """
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is None or entry[3] != versions or time.monotonic() - entry[4] >= self.max_age:
+                return None
+            self._responses.move_to_end(key)
+            self.hits += 1
+            return entry[:3]
+
+    def record(self, key, etag, versions):
+        """ Enregistre l'empreinte d'une réponse; renvoie (last_modified, exact): son Last-Modified
+        (inchangé si le corps est identique à la réponse précédente) et s'il identifie ce corps """
+        now = int(time.time())
+        with self._lock:
+            entry = self._responses.get(key)
+            if entry is not None and entry[0] == etag:
+                last_modified, exact = entry[1], entry[2]
+            else:
+                # Corps changé dans la seconde où le précédent a été observé: même Last-Modified pour les deux
+                last_modified, exact = now, entry is None or entry[1] != now
+            if self.max_size > 0:
+                self._responses[key] = (etag, last_modified, exact, versions, time.monotonic())
+                self._responses.move_to_end(key)
+                while len(self._responses) > self.max_size:
+                    self._responses.popitem(last=False)
+            return last_modified, exact
+
+    def stats(self):
+        with self._lock:
+            return {"responses": len(self._responses), "max_age": self.max_age, "hits": self.hits,
+                    "versions": {collection or "*": version for collection, version in self._versions.items()}}
+
+
+# Instance partagée par les modèles (écritures) et les routes de lecture, configurée par create_app
+collection_versions = CollectionVersions()
+
+
+def _not_modified(etag, last_modified, exact):
+    """ Vrai si la requête conditionnelle correspond à la réponse (etag, last_modified). Une date égale
+    à un last_modified non exact peut être celle d'un autre corps observé pendant la même seconde """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    since = request.if_modified_since
+    return since is not None and (last_modified < since.timestamp()
+                                  or exact and last_modified == since.timestamp())
+
+
+def conditional(*collections):
+    """ Décorateur des routes GET dont la réponse ne dépend que des collections données:
+    ETag, Last-Modified et réponses 304 (les réponses en streaming ne sont pas concernées) """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.config["CONDITIONAL_GET"]:
+                return view(*args, **kwargs)
+            key = request.full_path
+            # Versions lues avant la requête: une écriture concurrente rend l'entrée périmée
+            versions = collection_versions.snapshot(collections)
+            if request.if_none_match or request.if_modified_since:
+                known = collection_versions.fresh(key, versions)
+                if known is not None and _not_modified(*known):
+                    response = current_app.response_class(status=304)
+                    response.set_etag(known[0], weak=True)
+                    response.headers["Last-Modified"] = formatdate(known[1], usegmt=True)
+                    return response
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            etag = hashlib.blake2b(response.get_data(), digest_size=16).hexdigest()
+            last_modified, exact = collection_versions.record(key, etag, versions)
+            response.set_etag(etag, weak=True)
+            response.headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+            if _not_modified(etag, last_modified, exact):
+                response = current_app.response_class(status=304, headers={
+                    "ETag": response.headers["ETag"], "Last-Modified": response.headers["Last-Modified"]})
+            return response
+        return wrapper
+    return decorator
+
+
+def _compress_stream(chunks, encoding, level):
+    """ Compresse un corps envoyé en streaming; chaque morceau est vidé (Z_SYNC_FLUSH) pour que le
+    client reçoive les lignes au fil de l'eau """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31 if encoding == "gzip" else 15)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk.encode("utf-8") if isinstance(chunk, str) else chunk)
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Le corps d'origine est fermé avec la réponse (fin de la requête en streaming)
+        if hasattr(chunks, "close"):
+            chunks.close()
+
+
+def compress_response(response, min_bytes, level):
+    """ Compresse en gzip ou deflate (selon Accept-Encoding) les réponses JSON ou texte d'au moins
+    min_bytes octets, et toutes les réponses en streaming de ces types """
+    if (response.status_code < 200 or response.status_code in (204, 304) or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(["gzip", "deflate"])
+    if encoding is None:
+        return response
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < min_bytes:
+            return response
+        response.set_data(gzip.compress(data, level) if encoding == "gzip" else zlib.compress(data, level))
+    response.headers["Content-Encoding"] = encoding
+    return response
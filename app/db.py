@@ -0,0 +1,66 @@
+# Accès à la base Neo4j: connexion paresseuse (un pool par processus) et comptage des
+# allers-retours par requête HTTP
+import os
+import threading
+from flask import g, has_request_context
+
+# Méthodes de Graph qui envoient une requête au serveur
+ROUND_TRIP_METHODS = ("create", "merge", "push", "pull", "delete", "separate")
+
+
+def count_round_trip():
+    """Incrémente le compteur d'allers-retours de la requête HTTP en cours"""
+    if has_request_context():
+        g.db_round_trips = g.get("db_round_trips", 0) + 1
+
+
+def round_trips():
+    """Nombre d'allers-retours vers Neo4j effectués pendant la requête HTTP en cours"""
+    return g.get("db_round_trips", 0) if has_request_context() else 0
+
+
+class CountingGraph:
+    """ Enveloppe autour de py2neo.Graph qui compte chaque appel envoyé à Neo4j.
+    Le Graph (et son pool de connexions) est créé par connect() au premier appel, puis
+    recréé dans chaque processus issu d'un fork: les workers ne partagent aucun socket.
+    on_connect(graph) est appelé après chaque nouvelle connexion (déclaration du schéma) """
+
+    def __init__(self, connect, on_connect=None):
+        self._connect = connect
+        self._on_connect = on_connect
+        self._connected = None
+        self._pid = None
+        self._lock = threading.RLock()
+
+    @property
+    def connected(self):
+        """Vrai si ce processus a déjà ouvert sa connexion"""
+        return self._connected is not None and self._pid == os.getpid()
+
+    @property
+    def _graph(self):
+        if not self.connected:
+            with self._lock:
+                if not self.connected:
+                    self._connected = self._connect()
+                    self._pid = os.getpid()
+                    if self._on_connect:
+                        self._on_connect(self)
+        return self._connected
+
+    def run(self, cypher, parameters=None, **kwparameters):
+        count_round_trip()
+        return self._graph.run(cypher, parameters, **kwparameters)
+
+    def evaluate(self, cypher, parameters=None, **kwparameters):
+        count_round_trip()
+        return self._graph.evaluate(cypher, parameters, **kwparameters)
+
+    def __getattr__(self, name):
+        attr = getattr(self._graph, name)
+        if name in ROUND_TRIP_METHODS:
+            def counted(*args, **kwargs):
+                count_round_trip()
+                return attr(*args, **kwargs)
+            return counted
+        return attr
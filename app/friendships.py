@@ -0,0 +1,351 @@
+# Instantané en mémoire des amitiés (FRIENDS_WITH) au format CSR: ids renumérotés en entiers,
+# voisins de chaque utilisateur triés dans un tableau compact. Sert are_friends, les amis communs
+# (intersection de tableaux triés) et les chemins entre utilisateurs (BFS bidirectionnel) sans
+# interroger la base. Les écritures de ce processus sont appliquées en delta; l'instantané est
+# rechargé périodiquement pour intégrer celles des autres processus.
+import logging
+import threading
+import time
+from array import array
+
+logger = logging.getLogger("app.friendships")
+
+# Au-delà de cette part d'arêtes modifiées (et d'au moins COMPACT_MIN_CHANGES), les deltas
+# sont fusionnés dans un nouveau tableau CSR
+COMPACT_RATIO = 0.1
+COMPACT_MIN_CHANGES = 10000
+
+
+def intersect_sorted(left, right):
+    """Intersection de deux séquences d'entiers triées, par fusion"""
+    result = []
+    i = j = 0
+    while i < len(left) and j < len(right):
+        if left[i] < right[j]:
+            i += 1
+        elif left[i] > right[j]:
+            j += 1
+        else:
+            result.append(left[i])
+            i += 1
+            j += 1
+    return result
+
+
+def bidirectional_bfs(source, target, neighbors, max_depth):
+    """ Plus court chemin de source à target (liste de nœuds) d'au plus max_depth arêtes, ou None.
+    Les deux parcours avancent en alternance, en développant toujours la plus petite frontière """
+    if source == target:
+        return [source]
+    parents = ({source: None}, {target: None})
+    frontiers = ([source], [target])
+    depth = 0
+    while frontiers[0] and frontiers[1] and depth < max_depth:
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        seen, other = parents[side], parents[1 - side]
+        next_frontier = []
+        meeting = None
+        for node in frontiers[side]:
+            for neighbor in neighbors(node):
+                if neighbor in seen:
+                    continue
+                seen[neighbor] = node
+                if neighbor in other:
+                    meeting = neighbor
+                    break
+                next_frontier.append(neighbor)
+            if meeting is not None:
+                break
+        depth += 1
+        if meeting is not None:
+            path = []
+            node = meeting
+            while node is not None:
+                path.append(node)
+                node = parents[0][node]
+            path.reverse()
+            node = parents[1][meeting]
+            while node is not None:
+                path.append(node)
+                node = parents[1][node]
+            return path
+        frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+    return None
+
+
+class CSRGraph:
+    """ Graphe non orienté immuable: les voisins du nœud i sont
+    neighbors[offsets[i]:offsets[i + 1]], triés et sans doublon """
+
+    def __init__(self, ids, offsets, neighbors):
+        self.ids = ids
+        self.index = {node_id: i for i, node_id in enumerate(ids)}
+        self.offsets = offsets
+        self.neighbors = neighbors
+
+    @classmethod
+    def build(cls, edges, ids=None):
+        """Construit le graphe à partir de paires (id, id); ids fixe la numérotation des nœuds connus"""
+        ids = list(ids or [])
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        sources, targets = array("i"), array("i")
+        for left, right in edges:
+            if left == right:
+                continue
+            for node_id in (left, right):
+                if node_id not in index:
+                    index[node_id] = len(ids)
+                    ids.append(node_id)
+            sources.append(index[left])
+            targets.append(index[right])
+        return cls.from_indexes(ids, sources, targets)
+
+    @classmethod
+    def from_indexes(cls, ids, sources, targets):
+        """ Construit le graphe à partir d'arêtes déjà numérotées: (sources[k], targets[k]) sont des
+        positions dans ids (tableaux d'entiers, sans boucle) """
+        # Comptage des degrés puis sommes préfixes (chaque arête figure dans les deux sens)
+        degrees = array("i", bytes(4 * len(ids)))
+        for i in range(len(sources)):
+            degrees[sources[i]] += 1
+            degrees[targets[i]] += 1
+        offsets = array("i", bytes(4 * (len(ids) + 1)))
+        for i, degree in enumerate(degrees):
+            offsets[i + 1] = offsets[i] + degree
+        neighbors = array("i", bytes(4 * offsets[-1]))
+        cursor = array("i", offsets[:-1])
+        for i in range(len(sources)):
+            left, right = sources[i], targets[i]
+            neighbors[cursor[left]] = right
+            cursor[left] += 1
+            neighbors[cursor[right]] = left
+            cursor[right] += 1
+
+        # Tri de chaque ligne et suppression des arêtes en double
+        compact = array("i")
+        compact_offsets = array("i", [0])
+        for i in range(len(ids)):
+            row = sorted(set(neighbors[offsets[i]:offsets[i + 1]]))
+            compact.extend(row)
+            compact_offsets.append(len(compact))
+        return cls(ids, compact_offsets, compact)
+
+    @property
+    def edge_count(self):
+        return len(self.neighbors) // 2
+
+    def row(self, i):
+        if i >= len(self.offsets) - 1:
+            return array("i")
+        return self.neighbors[self.offsets[i]:self.offsets[i + 1]]
+
+
+class FriendGraph:
+    """ Instantané CSR et deltas des écritures locales (ajouts et retraits d'arêtes).
+    Le chargement et le rechargement périodique se font dans un thread d'arrière-plan:
+    tant que le premier chargement n'est pas terminé, snapshot() renvoie None """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loader = None
+        self._initial_loader = None
+        self.enabled = False
+        self.refresh_seconds = 300.0
+        self._reset()
+
+    def _reset(self):
+        self._csr = None
+        self._index = {}
+        self._ids = []
+        self._added = {}
+        self._removed = {}
+        self._changes = 0
+        # Écritures reçues pendant un chargement, rejouées sur le nouvel instantané
+        self._pending = None
+        self._thread = None
+        self._generation = getattr(self, "_generation", 0) + 1
+        self.loaded_at = None
+
+    def configure(self, loader, enabled=True, refresh_seconds=300.0, initial_loader=None):
+        """ loader() renvoie les paires (id, id) des amitiés; refresh_seconds=0 désactive le rechargement.
+        initial_loader() peut fournir le premier instantané (CSRGraph, ou None pour appeler loader) """
+        with self._lock:
+            self._loader = loader
+            self._initial_loader = initial_loader
+            self.enabled = enabled
+            self.refresh_seconds = refresh_seconds
+            self._reset()
+
+    # Chargement
+
+    def snapshot(self):
+        """Renvoie l'instantané prêt à l'emploi, ou None (chargement lancé en arrière-plan si besoin)"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._thread is None:
+                self._pending = []
+                self._thread = threading.Thread(target=self._run, args=(self._generation,),
+                                                name="friend-graph", daemon=True)
+                self._thread.start()
+            return self if self._csr is not None else None
+
+    def load(self):
+        """Charge l'instantané de façon synchrone (commandes, mesures, tests)"""
+        with self._lock:
+            self._pending = []
+        self._load(self._generation)
+
+    def _run(self, generation):
+        while True:
+            try:
+                self._load(generation)
+            except Exception as e:
+                logger.error("Friend graph snapshot load failed: %s", e)
+            if not self.refresh_seconds:
+                return
+            time.sleep(self.refresh_seconds)
+            with self._lock:
+                if generation != self._generation:
+                    return
+                self._pending = []
+
+    def _load(self, generation):
+        started = time.perf_counter()
+        csr = None
+        if self._csr is None and self._initial_loader is not None:
+            try:
+                csr = self._initial_loader()
+            except Exception as e:
+                logger.error("Friend graph initial load failed, reading the database: %s", e)
+        if csr is None:
+            csr = CSRGraph.build(self._loader())
+        with self._lock:
+            if generation != self._generation:
+                return
+            pending, self._pending = self._pending or [], None
+            self._csr = csr
+            self._index = dict(csr.index)
+            self._ids = list(csr.ids)
+            self._added, self._removed, self._changes = {}, {}, 0
+            for operation, left, right in pending:
+                self._apply(operation, left, right)
+            self.loaded_at = time.time()
+        logger.info("Friend graph snapshot loaded: %d users, %d friendships in %.2fs",
+                    len(csr.ids), csr.edge_count, time.perf_counter() - started)
+
+    # Écritures locales
+
+    def add_edge(self, user_id, friend_id):
+        self._record("add", user_id, friend_id)
+
+    def remove_edge(self, user_id, friend_id):
+        self._record("remove", user_id, friend_id)
+
+    def remove_node(self, user_id):
+        # Pendant un chargement, les voisins retirés sont ceux du nouvel instantané (voir _apply)
+        self._record("remove_node", user_id, None)
+
+    def _record(self, operation, left, right):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((operation, left, right))
+            if self._csr is not None:
+                self._apply(operation, left, right)
+                if self._changes > max(COMPACT_MIN_CHANGES, COMPACT_RATIO * self._csr.edge_count):
+                    self._compact()
+
+    def _node(self, node_id):
+        i = self._index.get(node_id)
+        if i is None:
+            i = self._index[node_id] = len(self._ids)
+            self._ids.append(node_id)
+        return i
+
+    def _apply(self, operation, left, right):
+        if operation == "remove_node":
+            for friend_id in [self._ids[i] for i in self._neighbors(self._index.get(left))]:
+                self._apply("remove", left, friend_id)
+            return
+        if left == right:
+            return
+        i, j = self._node(left), self._node(right)
+        for a, b in ((i, j), (j, i)):
+            if operation == "add":
+                self._removed.get(a, set()).discard(b)
+                self._added.setdefault(a, set()).add(b)
+            else:
+                self._added.get(a, set()).discard(b)
+                self._removed.setdefault(a, set()).add(b)
+        self._changes += 1
+
+    def _compact(self):
+        edges = ((self._ids[i], self._ids[j]) for i in range(len(self._ids))
+                 for j in self._neighbors(i) if i < j)
+        csr = CSRGraph.build(edges, ids=self._ids)
+        self._csr = csr
+        self._added, self._removed, self._changes = {}, {}, 0
+
+    # Lectures
+
+    def _neighbors(self, i):
+        """Voisins triés du nœud i (base CSR corrigée par les deltas)"""
+        if i is None:
+            return []
+        base = self._csr.row(i)
+        added, removed = self._added.get(i), self._removed.get(i)
+        if not added and not removed:
+            return base
+        return sorted((set(base) - (removed or set())) | (added or set()))
+
+    def are_friends(self, user_id, friend_id):
+        with self._lock:
+            i, j = self._index.get(user_id), self._index.get(friend_id)
+            if i is None or j is None:
+                return False
+            row = self._neighbors(i)
+            # Recherche dichotomique dans la ligne triée
+            low, high = 0, len(row)
+            while low < high:
+                middle = (low + high) // 2
+                if row[middle] < j:
+                    low = middle + 1
+                else:
+                    high = middle
+            return low < len(row) and row[low] == j
+
+    def mutual_friends(self, user_id, other_id):
+        """Ids des amis communs"""
+        with self._lock:
+            i, j = self._index.get(user_id), self._index.get(other_id)
+            if i is None or j is None:
+                return []
+            return [self._ids[k] for k in intersect_sorted(self._neighbors(i), self._neighbors(j))]
+
+    def path(self, source_id, target_id, max_depth):
+        """Ids du plus court chemin d'amitiés entre deux utilisateurs (au plus max_depth arêtes), ou None"""
+        with self._lock:
+            if source_id == target_id:
+                return [source_id]
+            i, j = self._index.get(source_id), self._index.get(target_id)
+            if i is None or j is None:
+                return None
+            path = bidirectional_bfs(i, j, self._neighbors, max_depth)
+            return [self._ids[k] for k in path] if path is not None else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "loaded": self._csr is not None,
+                "loaded_at": self.loaded_at,
+                "users": len(self._ids),
+                "snapshot_friendships": self._csr.edge_count if self._csr is not None else 0,
+                "pending_changes": self._changes,
+                "bytes": (self._csr.offsets.itemsize * len(self._csr.offsets)
+                          + self._csr.neighbors.itemsize * len(self._csr.neighbors)) if self._csr is not None else 0,
+            }
+
+
+# Instance partagée par les modèles, configurée par create_app
+friend_graph = FriendGraph()
@@ -0,0 +1,108 @@
+# Jobs d'arrière-plan (suppressions en cascade des gros sous-graphes): exécutés par un pool de threads
+# du processus qui les a créés. Leur état (statut, progression) est enregistré dans le stockage à chaque
+# étape, il est donc consultable depuis n'importe quel processus (GET /api/jobs/<id>).
+#
+# Statuts: queued -> running -> succeeded | failed. Un job interrompu par l'arrêt du processus reste
+# "running"; les suppressions en cascade étant idempotentes, il suffit de relancer la suppression.
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("app.jobs")
+
+
+class JobRunner:
+    """Pool de threads exécutant les jobs et enregistrant leur progression dans le stockage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._repo = None
+        self.workers = 2
+        self.retention_seconds = 86400.0
+        self._executor = None
+        self._pid = None
+        # (kind, target_id) -> job en cours dans ce processus
+        self._active = {}
+
+    def configure(self, repo, workers=2, retention_seconds=86400.0):
+        """ repo enregistre l'état des jobs et leur est passé; retention_seconds est la durée de
+        conservation des jobs terminés """
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self._repo = repo
+            self.workers = workers
+            self.retention_seconds = retention_seconds
+            self._executor = None
+            self._pid = None
+            self._active = {}
+
+    def _pool(self):
+        # Un pool par processus: les threads ne survivent pas à un fork
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+            self._pid = os.getpid()
+            self._active = {}
+        return self._executor
+
+    def submit(self, kind, target_id, total, run):
+        """ Lance run(repo, progress) en arrière-plan; progress(count) ajoute count éléments traités.
+        Un job identique (même kind et cible) déjà en cours dans ce processus est renvoyé à la place.
+        Renvoie l'état du job (dict) """
+        with self._lock:
+            pool = self._pool()
+            job = self._active.get((kind, target_id))
+            if job is not None:
+                return dict(job)
+            job = {"id": str(uuid.uuid4()), "kind": kind, "target_id": target_id, "status": "queued",
+                   "total": total, "done": 0, "created_at": int(time.time())}
+            self._repo.save_job(job)
+            self._active[(kind, target_id)] = job
+            queued = dict(job)
+            pool.submit(self._run, job, run)
+            return queued
+
+    def _save(self, job, **changes):
+        job.update(changes)
+        self._repo.save_job(dict(job))
+
+    def _run(self, job, run):
+        started = time.perf_counter()
+
+        def progress(count):
+            self._save(job, done=job["done"] + count)
+
+        try:
+            self._save(job, status="running", started_at=int(time.time()))
+            run(self._repo, progress)
+            self._save(job, status="succeeded", finished_at=int(time.time()))
+            logger.info("Job %s (%s %s) succeeded: %d items in %.2fs", job["id"], job["kind"],
+                        job["target_id"], job["done"], time.perf_counter() - started)
+        except Exception as e:
+            logger.error("Job %s (%s %s) failed after %d items: %s", job["id"], job["kind"],
+                         job["target_id"], job["done"], e)
+            try:
+                self._save(job, status="failed", error=str(e), finished_at=int(time.time()))
+            except Exception as save_error:
+                logger.error("Job %s state could not be saved: %s", job["id"], save_error)
+        finally:
+            with self._lock:
+                self._active.pop((job["kind"], job["target_id"]), None)
+        try:
+            self._repo.prune_jobs(int(time.time() - self.retention_seconds))
+        except Exception as e:
+            logger.error("Job pruning failed: %s", e)
+
+    def get(self, job_id):
+        return self._repo.get_job(job_id)
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "active": len(self._active) if self._pid == os.getpid() else 0}
+
+
+# Instance partagée par les modèles et la route des jobs, configurée par create_app
+jobs = JobRunner()
@@ -0,0 +1,243 @@
+# Écriture différée (write-behind) des likes: chaque like ou retrait de like est acquitté
+# immédiatement, journalisé sur disque puis regroupé en mémoire (la dernière action d'un utilisateur
+# sur une cible l'emporte). Le tampon est écrit en une requête UNWIND quand il atteint max_pending
+# actions ou toutes les flush_seconds secondes, et à l'arrêt du processus.
+#
+# Journal: fichiers likes-<pid>-<n>.jsonl dans journal_dir, une action JSON par ligne. Chaque vidage
+# ouvre un nouveau fichier; les fichiers antérieurs sont supprimés une fois le lot écrit. Au démarrage,
+# les journaux laissés par un processus arrêté sont repris (renommés) puis rejoués.
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger("app.like_buffer")
+
+JOURNAL_RE = re.compile(r"^likes-(\d+)-(\d+)\.jsonl$")
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LikeBuffer:
+    """Tampon des likes en attente d'écriture, vidé par un thread d'arrière-plan"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._apply = None
+        self.enabled = False
+        self.max_pending = 500
+        self.flush_seconds = 1.0
+        self.journal_dir = None
+        self.fsync = False
+        self.flushed = 0
+        self.failures = 0
+        self._reset()
+        atexit.register(self.close)
+
+    def _reset(self):
+        # (user_id, "post" | "comment", target_id) -> (aimé, horodatage)
+        self._pending = {}
+        # Lot en cours d'écriture (retiré de _pending mais pas encore dans le stockage)
+        self._writing = {}
+        self._thread = None
+        self._journal = None
+        self._segment = 0
+        self._flushing = threading.Lock()
+        self._pid = None
+
+    def configure(self, apply, enabled=False, max_pending=500, flush_seconds=1.0, journal_dir=None, fsync=False):
+        """ apply(rows) écrit un lot [{i, user_id, post_id, comment_id, liked, created_at}] et renvoie
+        l'ensemble des index i effectivement modifiés; journal_dir=None désactive le journal """
+        self.close()
+        with self._lock:
+            self._apply = apply
+            self.enabled = enabled
+            self.max_pending = max_pending
+            self.flush_seconds = flush_seconds
+            self.journal_dir = journal_dir
+            self.fsync = fsync
+            self.flushed = 0
+            self.failures = 0
+            self._reset()
+
+    def _start(self):
+        """Démarre le thread de vidage du processus courant (après reprise des journaux orphelins)"""
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        self._reset()
+        self._pid = os.getpid()
+        if self.journal_dir:
+            os.makedirs(self.journal_dir, exist_ok=True)
+            self._recover()
+            self._open_segment()
+        self._thread = threading.Thread(target=self._run, name="like-buffer", daemon=True)
+        self._thread.start()
+
+    # Journal
+
+    def _segment_path(self, pid, segment):
+        return os.path.join(self.journal_dir, f"likes-{pid}-{segment}.jsonl")
+
+    def _open_segment(self):
+        self._segment += 1
+        if self._journal is not None:
+            os.close(self._journal)
+        self._journal = os.open(self._segment_path(self._pid, self._segment),
+                                os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+
+    def _own_segments(self, up_to):
+        for name in os.listdir(self.journal_dir):
+            match = JOURNAL_RE.match(name)
+            if match and int(match.group(1)) == self._pid and int(match.group(2)) <= up_to:
+                yield os.path.join(self.journal_dir, name)
+
+    def _recover(self):
+        """ Reprend les journaux des processus arrêtés et rejoue leurs actions: pour chaque paire,
+        l'action la plus récente l'emporte """
+        own, orphans = [], []
+        for name in os.listdir(self.journal_dir):
+            match = JOURNAL_RE.match(name)
+            if not match:
+                continue
+            pid, segment = int(match.group(1)), int(match.group(2))
+            if pid == self._pid:
+                # Journal d'un ancien processus de même pid: repris sans renommage
+                own.append(os.path.join(self.journal_dir, name))
+                self._segment = max(self._segment, segment)
+            elif not _alive(pid):
+                orphans.append(name)
+        claimed = list(own)
+        for name in orphans:
+            self._segment += 1
+            path = self._segment_path(self._pid, self._segment)
+            try:
+                # Le renommage est atomique: un seul processus reprend chaque journal
+                os.rename(os.path.join(self.journal_dir, name), path)
+            except FileNotFoundError:
+                self._segment -= 1
+                continue
+            claimed.append(path)
+        replayed = 0
+        for path in claimed:
+            with open(path, encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        user_id, kind, target_id, liked, at = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal
+                        continue
+                    key = (user_id, kind, target_id)
+                    if key not in self._pending or self._pending[key][1] <= at:
+                        self._pending[key] = (liked, at)
+                    replayed += 1
+        if replayed:
+            logger.info("Recovered %d buffered likes from %d journal files", replayed, len(claimed))
+
+    # Enregistrement et vidage
+
+    def record(self, user_id, kind, target_id, liked):
+        """Enregistre un like (liked=True) ou un retrait de like sur un post ou un commentaire"""
+        at = int(time.time())
+        with self._lock:
+            self._start()
+            if self._journal is not None:
+                line = json.dumps([user_id, kind, target_id, liked, at], separators=(",", ":")) + "\n"
+                os.write(self._journal, line.encode("utf-8"))
+                if self.fsync:
+                    os.fsync(self._journal)
+            self._pending[(user_id, kind, target_id)] = (liked, at)
+            if len(self._pending) >= self.max_pending:
+                self._wake.set()
+
+    def pending(self, user_id, kind, target_id):
+        """ Dernière action en attente (ou en cours d'écriture) sur la cible: True (like), False (retrait),
+        ou None s'il n'y en a pas """
+        key = (user_id, kind, target_id)
+        with self._lock:
+            action = self._pending.get(key) or self._writing.get(key)
+            return None if action is None else action[0]
+
+    def _run(self):
+        pid = self._pid
+        while self._pid == pid:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Like buffer flush failed: %s", e)
+
+    def flush(self):
+        """Écrit les actions en attente; en cas d'erreur elles restent en attente (et journalisées)"""
+        with self._flushing:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, {}
+                self._writing = batch
+                segment = self._segment
+                if self._journal is not None:
+                    self._open_segment()
+            rows = [{"i": i, "user_id": user_id,
+                     "post_id": target_id if kind == "post" else None,
+                     "comment_id": target_id if kind == "comment" else None,
+                     "liked": liked, "created_at": at}
+                    for i, ((user_id, kind, target_id), (liked, at)) in enumerate(batch.items())]
+            try:
+                self._apply(rows)
+            except Exception:
+                self.failures += 1
+                with self._lock:
+                    # Les actions reçues pendant l'écriture sont plus récentes et l'emportent
+                    for key, value in batch.items():
+                        self._pending.setdefault(key, value)
+                    self._writing = {}
+                raise
+            with self._lock:
+                self._writing = {}
+            if self._journal is not None:
+                for path in self._own_segments(segment):
+                    os.remove(path)
+            self.flushed += len(rows)
+            return len(rows)
+
+    def close(self):
+        """Vide le tampon et arrête le thread (arrêt du processus); le journal n'est gardé que si l'écriture échoue"""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                return
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Like buffer flush on shutdown failed (kept in the journal): %s", e)
+        with self._lock:
+            if self._journal is not None:
+                os.close(self._journal)
+                self._journal = None
+                if not self._pending:
+                    for path in list(self._own_segments(self._segment)):
+                        os.remove(path)
+            self._pid = None
+            self._thread = None
+            self._wake.set()
+
+    def stats(self):
+        with self._lock:
+            return {"enabled": self.enabled, "pending": len(self._pending), "flushed": self.flushed,
+                    "failures": self.failures, "journal_dir": self.journal_dir}
+
+
+# Instance partagée par les modèles, configurée par create_app
+like_buffer = LikeBuffer()
@@ -0,0 +1,169 @@
+# Métriques du processus (requêtes HTTP et requêtes au stockage) au format texte Prometheus
+import threading
+
+# Bornes des histogrammes de latence, en secondes
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur monotone, une série par combinaison de labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Gauge:
+    """Valeur instantanée (qui monte et descend), une série par combinaison de labels"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, key), value
+
+
+class Histogram:
+    """Histogramme à bornes fixes (cumulatives, comme attendu par Prometheus), par labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Une case par borne, plus +Inf; puis somme et nombre d'observations
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            else:
+                series[0][-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield self.name + "_bucket", _format_labels(self.labels, key, [("le", le)]), cumulative
+            yield self.name + "_sum", _format_labels(self.labels, key), total
+            yield self.name + "_count", _format_labels(self.labels, key), count
+
+
+class Registry:
+    """Ensemble des métriques exportées sur /api/metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name, documentation, labels=()):
+        metric = Counter(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, documentation, labels=()):
+        metric = Gauge(name, documentation, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Exposition au format texte Prometheus (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# Requêtes HTTP, par règle de route Flask
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests by route and status code", ("method", "route", "status"))
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+http_request_round_trips = registry.counter(
+    "http_request_db_round_trips_total", "Storage round trips made while serving each route", ("method", "route"))
+
+# Requêtes au stockage, par nom stable (méthode du repository)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Storage query latency by query name", ("backend", "query"))
+db_query_rows = registry.counter(
+    "db_query_rows_total", "Rows or entities returned by each query", ("backend", "query"))
+db_query_errors = registry.counter(
+    "db_query_errors_total", "Storage queries that raised, by exception type", ("backend", "query", "error"))
+
+# Contrôle d'admission, par classe de routes (read, write, heavy)
+admission_active = registry.gauge(
+    "admission_active_requests", "Admitted requests in progress by route class", ("route_class",))
+admission_waiting = registry.gauge(
+    "admission_queue_depth", "Requests waiting for admission by route class", ("route_class",))
+admission_wait = registry.histogram(
+    "admission_wait_seconds", "Time spent waiting for admission by route class", ("route_class",))
+admission_rejections = registry.counter(
+    "admission_rejections_total", "Requests rejected with 503 by route class and reason", ("route_class", "reason"))
@@ -1,169 +1,580 @@
 import uuid
-from py2neo import Node, Relationship
 from datetime import datetime
+from app.cache import entity_cache
+from app.friendships import friend_graph
+from app.search import search_index
+from app.trending import trending
+from app.like_buffer import like_buffer
+from app.conditional import collection_versions
+from app.changelog import changelog
+from app.jobs import jobs
+from app.repository import DuplicateEmailError, CASCADE_STAGES
+
+# Les modèles s'appuient sur un Repository (Neo4j ou en mémoire, voir app.repository):
+# chaque opération est un seul aller-retour vers le stockage.
+# Les lectures par id passent par entity_cache; les écritures invalident les clés modifiées et
+# incrémentent la version des collections touchées (réponses conditionnelles, voir app.conditional).
+# Chaque écriture est ajoutée au journal des modifications (changelog), appliqué par les autres processus.
+# Les tests d'amitié, amis communs et chemins sont servis par l'instantané friend_graph une fois chargé.
+# Les posts et commentaires écrits sont (ré)indexés dans search_index; likes et commentaires mettent
+# à jour les scores de trending. En mode write-behind, likes et retraits passent par like_buffer.
+# Les suppressions sont en cascade (Cascade), par lots; les plus grosses sont confiées à un job.
+
+
+# Compteurs dénormalisés, maintenus dans la même transaction que les likes et commentaires
+COUNTER_FIELDS = ("like_count", "comment_count")
+
+
+def _now():
+    return int(datetime.now().timestamp())
+
+
+def _without_counters(props):
+    """Les compteurs ne sont jamais modifiés directement par une mise à jour"""
+    return {key: value for key, value in props.items() if key not in COUNTER_FIELDS}
+
+
+def _invalidate(*keys):
+    """Invalide les clés de cache (label, id) et incrémente la version de leurs collections"""
+    entity_cache.invalidate(*keys)
+    collection_versions.bump(*{label for label, _ in keys})
+
+
+def _invalidate_all():
+    entity_cache.clear()
+    collection_versions.bump_all()
+
+
+def _log(*events):
+    """ Ajoute au journal des modifications des événements (type, id, opération, id lié ou None), suivis
+    pour un retrait de like ou de commentaire de l'instant de sa création """
+    changelog.append(events)
+
+
+def _invalidate_written(rows, written, keys, event=None):
+    """ Invalide les clés de cache (keys(row)) des lignes écrites par une opération en masse
+    et journalise leurs événements (event(row)) """
+    _invalidate(*[key for row in rows if row["i"] in written for key in keys(row)])
+    if event is not None:
+        _log(*[event(row) for row in rows if row["i"] in written])
+    return written
+
+
+def _index_written(kind, rows, written):
+    """Indexe pour la recherche les lignes écrites par une création en masse"""
+    for row in rows:
+        if row["i"] in written:
+            search_index.add(kind, {key: value for key, value in row.items() if key != "i"})
+
+
+def _like_event(row, liked, liked_at=None):
+    """Événement d'un like (ou retrait, avec l'instant du like retiré) d'une ligne {user_id, post_id, comment_id}"""
+    label, target_id = ("Post", row["post_id"]) if row["post_id"] else ("Comment", row["comment_id"])
+    if liked:
+        return label, target_id, "like", row["user_id"]
+    return label, target_id, "unlike", row["user_id"], liked_at
+
+
+def _buffer_like(repo, user_id, label, target_id, liked):
+    """ Like ou retrait de like différé (like_buffer). Un like n'est accepté que si l'utilisateur et la
+    cible existent (vérifié via le cache), un retrait que si le like existe (en attente d'écriture ou dans
+    le stockage). Renvoie False sinon, comme l'écriture immédiate """
+    kind = label.lower()
+    if liked:
+        model = Post if label == "Post" else Comment
+        if not User.find_by_id(repo, user_id) or not model.find_by_id(repo, target_id):
+            return False
+    else:
+        pending = like_buffer.pending(user_id, kind, target_id)
+        if not (repo.has_like(user_id, label, target_id) if pending is None else pending):
+            return False
+    like_buffer.record(user_id, kind, target_id, liked)
+    return True
+
+
+def _find_many(repo, label, ids):
+    """ Entités lues par id via le cache; celles qui n'y sont pas sont chargées en une seule requête.
+    Renvoie une liste alignée sur ids (None pour un id inexistant) """
+    def load_many(keys):
+        found = repo.get_many(label, [node_id for _, node_id in keys])
+        return {(label, node_id): props for node_id, props in found.items()}
+
+    values = entity_cache.get_many_or_load([(label, node_id) for node_id in ids], load_many)
+    return [values[(label, node_id)] for node_id in ids]
+
 
 class User:
-    """Classe représentant un utilisateur dans le graphe Neo4j""" 
+    """Classe représentant un utilisateur dans le graphe"""
 
     @staticmethod
-    def create(graph, name, email):
-        user = Node("User", 
-                   id=str(uuid.uuid4()),
-                   name=name, 
-                   email=email, 
-                   created_at=int(datetime.now().timestamp()))
-        graph.create(user)
+    def create(repo, name, email):
+        # L'unicité de l'email est garantie par le stockage (DuplicateEmailError)
+        user = repo.create_user({"id": str(uuid.uuid4()),
+                                 "name": name,
+                                 "email": email,
+                                 "created_at": _now()})
+        _invalidate(("User", user["id"]))
+        _log(("User", user["id"], "create", None))
         return user
-    
+
+    @staticmethod
+    def find_by_id(repo, user_id):
+        return entity_cache.get_or_load(("User", user_id), lambda: repo.get_user(user_id))
+
     @staticmethod
-    def find_by_id(graph, user_id):
-        return graph.nodes.match("User", id=user_id).first()
+    def find_many(repo, ids):
+        return _find_many(repo, "User", ids)
 
     @staticmethod
-    def update(graph, user_id, **kwargs):
+    def update(repo, user_id, **kwargs):
         """ **kwargs: Paires clé-valeur des propriétés à mettre à jour """
-        user = User.find_by_id(graph, user_id)
-        if not user:
-            return None
-        for key, value in kwargs.items():
-            user[key] = value
-        graph.push(user)
+        user = repo.update_user(user_id, kwargs)
+        _invalidate(("User", user_id))
+        if user:
+            _log(("User", user_id, "update", None))
         return user
-    
+
     @staticmethod
-    def delete(graph, user_id):
-        user = User.find_by_id(graph, user_id)
-        if user:
-            graph.delete(user)
-            return True
-        return False
-    
-    @staticmethod
-    def add_friend(graph, user_id, friend_id):
-        # Vérifier si les deux utilisateurs existent
-        print(f"Searching User ID: {user_id}")
-        print(f"Searching Friend ID: {friend_id}")
-        user = graph.nodes.match("User", id=user_id).first()
-        friend = graph.nodes.match("User", id=friend_id).first()
-        print(f"User found: {user}")
-        print(f"Friend found: {friend}") 
-        if not user or not friend:
-            print("One of the users was not found.")
-            return None
-
-        # Vérifier si la relation existe déjà
-        existing_rel = graph.match((user, friend), r_type="FRIENDS_WITH").first()
-        if existing_rel:
-            return existing_rel  # Retourne la relation existante
-        
-        rel = Relationship(user, "FRIENDS_WITH", friend)
-        graph.create(rel)
-        return rel
+    def delete(repo, user_id):
+        """ Supprime l'utilisateur avec ses posts, ses commentaires et ses likes (voir Cascade).
+        Renvoie (trouvé, job), job étant None si la suppression est déjà faite """
+        return Cascade.delete(repo, "User", user_id)
+
+    @staticmethod
+    def add_friend(repo, user_id, friend_id):
+        # La relation n'est créée que si elle n'existe pas déjà (dans un sens ou l'autre), avec les
+        # suggestions touchées par la nouvelle amitié; une amitié existante ne change rien
+        found, created = repo.add_friend(user_id, friend_id, Suggestions.size)
+        if created:
+            friend_graph.add_edge(user_id, friend_id)
+            collection_versions.bump("Friendship")
+            _log(("Friendship", user_id, "add", friend_id))
+        return found
+
+    @staticmethod
+    def remove_friend(repo, user_id, friend_id):
+        removed = repo.remove_friend(user_id, friend_id, Suggestions.size)
+        if removed:
+            friend_graph.remove_edge(user_id, friend_id)
+            collection_versions.bump("Friendship")
+            _log(("Friendship", user_id, "remove", friend_id))
+        return removed
+
+    @staticmethod
+    def are_friends(repo, user_id, friend_id):
+        snapshot = friend_graph.snapshot()
+        if snapshot is not None:
+            return snapshot.are_friends(user_id, friend_id)
+        return repo.are_friends(user_id, friend_id)
+
+    @staticmethod
+    def friends(repo, user_id):
+        return repo.list_friends(user_id)
+
+    @staticmethod
+    def friend_count(repo, user_id):
+        return repo.count_friends(user_id)
+
+    @staticmethod
+    def mutual_friends(repo, user_id, other_id):
+        snapshot = friend_graph.snapshot()
+        if snapshot is not None:
+            return [user for user in User.find_many(repo, snapshot.mutual_friends(user_id, other_id)) if user]
+        return repo.mutual_friends(user_id, other_id)
+
+    @staticmethod
+    def path(repo, user_id, other_id, max_depth):
+        """ Plus court chemin d'amitiés entre deux utilisateurs (au plus max_depth relations):
+        liste des ids de user_id à other_id, ou None """
+        snapshot = friend_graph.snapshot()
+        if snapshot is not None:
+            return snapshot.path(user_id, other_id, max_depth)
+        return repo.friend_path(user_id, other_id, max_depth)
+
+    @staticmethod
+    def suggestions(repo, user_id, limit=20):
+        """Personnes que l'utilisateur pourrait connaître, par nombre d'amis communs décroissant"""
+        return repo.list_suggestions(user_id, limit)
+
+    @staticmethod
+    def bulk_create(repo, rows):
+        """ rows: [{i, id, name, email, created_at}]
+        Une ligne dont l'email appartient déjà à un autre utilisateur n'est pas écrite """
+        return _invalidate_written(rows, repo.bulk_create_users(rows), lambda row: [("User", row["id"])],
+                                   lambda row: ("User", row["id"], "create", None))
+
+    @staticmethod
+    def bulk_add_friends(repo, rows):
+        """ rows: [{i, user_id, friend_id}] """
+        written = repo.bulk_add_friends(rows)
+        for row in rows:
+            if row["i"] in written:
+                friend_graph.add_edge(row["user_id"], row["friend_id"])
+        if written:
+            collection_versions.bump("Friendship")
+            _log(*[("Friendship", row["user_id"], "add", row["friend_id"]) for row in rows if row["i"] in written])
+        return written
+
+    @staticmethod
+    def bulk_add_likes(repo, rows):
+        """ rows: [{i, user_id, post_id, comment_id}], une seule des deux cibles renseignée """
+        return _invalidate_written(
+            rows, repo.bulk_add_likes(rows),
+            lambda row: [("Post", row["post_id"]) if row["post_id"] else ("Comment", row["comment_id"])],
+            lambda row: _like_event(row, True))
+
+    @staticmethod
+    def set_likes(repo, rows):
+        """ rows: [{i, user_id, post_id, comment_id, liked, created_at}], lot de likes différés.
+        Renvoie {index: instant du like retiré ou None} des lignes qui ont changé l'état """
+        written = repo.bulk_set_likes(rows)
+        _invalidate_written(
+            rows, written,
+            lambda row: [("Post", row["post_id"]) if row["post_id"] else ("Comment", row["comment_id"])],
+            lambda row: _like_event(row, row["liked"], written[row["i"]]))
+        for row in rows:
+            if row["i"] in written and row["post_id"]:
+                if row["liked"]:
+                    trending.like(row["post_id"], row["created_at"])
+                else:
+                    trending.unlike(row["post_id"], written[row["i"]])
+        return written
 
 class Post:
-    """Classe représentant un post dans le graphe Neo4j"""
-
-    @staticmethod
-    def create(graph, title, content, user_id):
-        user = User.find_by_id(graph, user_id)
-        if not user:
-            return None
-            
-        post = Node("Post",
-                   id=str(uuid.uuid4()),
-                   title=title,
-                   content=content,
-                   created_at=int(datetime.now().timestamp()))
-        rel = Relationship(user, "CREATED", post)
-        graph.create(post)
-        graph.create(rel)
+    """Classe représentant un post dans le graphe"""
+
+    @staticmethod
+    def create(repo, title, content, user_id):
+        # Le post est ajouté en tête de la timeline de chaque ami (fan-out à l'écriture),
+        # sauf si l'auteur a trop d'amis: ses posts sont alors lus à la demande dans le fil
+        post = repo.create_post(user_id,
+                                {"id": str(uuid.uuid4()),
+                                 "title": title,
+                                 "content": content,
+                                 "created_at": _now(),
+                                 "like_count": 0,
+                                 "comment_count": 0},
+                                fanout_max_friends=Timeline.fanout_max_friends,
+                                timeline_size=Timeline.size)
+        if post:
+            _invalidate(("Post", post["id"]))
+            _log(("Post", post["id"], "create", user_id))
+            search_index.add("posts", post)
         return post
-    
+
     @staticmethod
-    def find_by_id(graph, post_id):
-        return graph.nodes.match("Post", id=post_id).first()
+    def find_by_id(repo, post_id):
+        return entity_cache.get_or_load(("Post", post_id), lambda: repo.get_post(post_id))
 
     @staticmethod
-    def update(graph, post_id, **kwargs):
-        post = Post.find_by_id(graph, post_id)
-        if not post:
-            return None
-        for key, value in kwargs.items():
-            post[key] = value
-        graph.push(post)
-        return post
-    
+    def find_many(repo, ids):
+        return _find_many(repo, "Post", ids)
+
     @staticmethod
-    def delete(graph, post_id):
-        post = Post.find_by_id(graph, post_id)
-        if post:
-            graph.delete(post)
-            return True
-        return False
+    def detail(repo, post_id, comments_after=None, comments_limit=50):
+        """ Post, auteur, page de commentaires (avec leurs auteurs) et compteurs, en une requête.
+        Un commentaire de plus est lu pour savoir s'il existe une page suivante.
+        Renvoie (détail ou None, page suivante existante) """
+        fetch = comments_limit + 1 if comments_limit else 0
+        detail = repo.get_post_detail(post_id, comments_after=comments_after, comments_limit=fetch)
+        if detail is None:
+            return None, False
+        post = detail["post"]
+        return {"post": post,
+                "author": detail["author"],
+                "comments": detail["comments"][:comments_limit],
+                "counts": {"likes": post.get("like_count", 0),
+                           "comments": post.get("comment_count", 0)}}, len(detail["comments"]) > comments_limit
+
+    @staticmethod
+    def update(repo, post_id, **kwargs):
+        updated = repo.update_post(post_id, _without_counters(kwargs))
+        _invalidate(("Post", post_id))
+        if updated:
+            _log(("Post", post_id, "update", None))
+            search_index.add("posts", updated)
+        return updated
+
+    @staticmethod
+    def delete(repo, post_id):
+        """ Supprime le post avec ses commentaires et ses likes (voir Cascade). Renvoie (trouvé, job) """
+        return Cascade.delete(repo, "Post", post_id)
+
+    @staticmethod
+    def add_like(repo, user_id, post_id):
+        if like_buffer.enabled:
+            return _buffer_like(repo, user_id, "Post", post_id, True)
+        # Like idempotent: le compteur n'est incrémenté, et le post invalidé, que si la relation est créée
+        liked, created = repo.add_post_like(user_id, post_id)
+        if created:
+            _invalidate(("Post", post_id))
+            _log(("Post", post_id, "like", user_id))
+            # Même résolution (la seconde) que l'instant enregistré, que le retrait du like soustraira
+            trending.like(post_id, _now())
+        return liked
+
+    @staticmethod
+    def remove_like(repo, user_id, post_id):
+        if like_buffer.enabled:
+            return _buffer_like(repo, user_id, "Post", post_id, False)
+        removed, liked_at = repo.remove_post_like(user_id, post_id)
+        if removed:
+            _invalidate(("Post", post_id))
+            _log(("Post", post_id, "unlike", user_id, liked_at))
+            trending.unlike(post_id, liked_at)
+        return removed
+
+    @staticmethod
+    def bulk_create(repo, rows):
+        """ rows: [{i, id, title, content, user_id, created_at}] """
+        written = _invalidate_written(rows, repo.bulk_create_posts(rows), lambda row: [("Post", row["id"])],
+                                      lambda row: ("Post", row["id"], "create", row["user_id"]))
+        _index_written("posts", rows, written)
+        return written
 
     @staticmethod
-    def add_like(graph, user_id, post_id):
-        user = User.find_by_id(graph, user_id)
-        post = Post.find_by_id(graph, post_id)
-        if not user or not post:
-            return None
-        rel = Relationship(user, "LIKES", post)
-        graph.create(rel)
-        return rel
+    def reconcile_counters(repo, after=None, batch_size=1000):
+        """Recalcule like_count et comment_count d'un lot de posts à partir des relations"""
+        checked, fixed, last_id = repo.reconcile_counters("Post", after=after, batch_size=batch_size)
+        if fixed:
+            _invalidate_all()
+            _log(("*", None, "reset", None))
+        return checked, fixed, last_id
 
 class Comment:
-    """Classe représentant un comment dans le graphe Neo4j"""
-    @staticmethod
-    def create(graph, content, user_id, post_id):
-        user = User.find_by_id(graph, user_id)
-        post = Post.find_by_id(graph, post_id)
-        if not user or not post:
-            return None
-            
-        comment = Node("Comment", 
-                       id=str(uuid.uuid4()),
-                       content=content,
-                       created_at=int(datetime.now().timestamp())
-                    )
-        
-        # Relation avec le créateur
-        created_rel = Relationship(user, "CREATED", comment)
-        # Relation avec le post
-        has_comment_rel = Relationship(post, "HAS_COMMENT", comment)
-        
-        graph.create(comment)
-        graph.create(created_rel)
-        graph.create(has_comment_rel)
+    """Classe représentant un comment dans le graphe"""
+    @staticmethod
+    def create(repo, content, user_id, post_id):
+        # Le commentaire et ses relations avec le créateur et le post sont créés ensemble
+        comment = repo.create_comment(user_id, post_id,
+                                      {"id": str(uuid.uuid4()),
+                                       "content": content,
+                                       "created_at": _now(),
+                                       "like_count": 0})
+        if comment:
+            _invalidate(("Comment", comment["id"]), ("Post", post_id))
+            _log(("Comment", comment["id"], "create", post_id))
+            search_index.add("comments", comment)
+            trending.comment(post_id, comment["created_at"])
         return comment
 
     @staticmethod
-    def find_by_id(graph, comment_id):
-        return graph.nodes.match("Comment", id=comment_id).first()
+    def find_by_id(repo, comment_id):
+        return entity_cache.get_or_load(("Comment", comment_id), lambda: repo.get_comment(comment_id))
 
     @staticmethod
-    def update(graph, comment_id, **kwargs):
-        comment = Comment.find_by_id(graph, comment_id)
-        if not comment:
-            return None
-        for key, value in kwargs.items():
-            comment[key] = value
-        graph.push(comment)
-        return comment
+    def find_many(repo, ids):
+        return _find_many(repo, "Comment", ids)
 
     @staticmethod
-    def delete(graph, comment_id):
-        comment = Comment.find_by_id(graph, comment_id)
-        if comment:
-            graph.delete(comment)
-            return True
-        return False
-
-    @staticmethod
-    def add_like(graph, user_id, comment_id):
-        user = User.find_by_id(graph, user_id)
-        comment = Comment.find_by_id(graph, comment_id)
-        if not user or not comment:
-            return None
-        rel = Relationship(user, "LIKES", comment)
-        graph.create(rel)
-        return rel
\ No newline at end of file
+    def update(repo, comment_id, **kwargs):
+        updated = repo.update_comment(comment_id, _without_counters(kwargs))
+        _invalidate(("Comment", comment_id))
+        if updated:
+            _log(("Comment", comment_id, "update", None))
+            search_index.add("comments", updated)
+        return updated
+
+    @staticmethod
+    def delete(repo, comment_id, post_id=None):
+        """ Supprime un commentaire et ses likes, et décrémente le compteur de son post.
+        Si post_id est donné, le commentaire doit appartenir à ce post. Renvoie (trouvé, job) """
+        return Cascade.delete(repo, "Comment", comment_id, post_id=post_id)
+
+    @staticmethod
+    def add_like(repo, user_id, comment_id):
+        if like_buffer.enabled:
+            return _buffer_like(repo, user_id, "Comment", comment_id, True)
+        # Like idempotent: rien n'est invalidé ni journalisé si la relation existait déjà
+        liked, created = repo.add_comment_like(user_id, comment_id)
+        if created:
+            _invalidate(("Comment", comment_id))
+            _log(("Comment", comment_id, "like", user_id))
+        return liked
+
+    @staticmethod
+    def remove_like(repo, user_id, comment_id):
+        if like_buffer.enabled:
+            return _buffer_like(repo, user_id, "Comment", comment_id, False)
+        removed = repo.remove_comment_like(user_id, comment_id)
+        if removed:
+            _invalidate(("Comment", comment_id))
+            _log(("Comment", comment_id, "unlike", user_id))
+        return removed
+
+    @staticmethod
+    def bulk_create(repo, rows):
+        """ rows: [{i, id, content, user_id, post_id, created_at}] """
+        written = _invalidate_written(rows, repo.bulk_create_comments(rows),
+                                      lambda row: [("Comment", row["id"]), ("Post", row["post_id"])],
+                                      lambda row: ("Comment", row["id"], "create", row["post_id"]))
+        _index_written("comments", rows, written)
+        for row in rows:
+            if row["i"] in written:
+                trending.comment(row["post_id"], row["created_at"])
+        return written
+
+    @staticmethod
+    def reconcile_counters(repo, after=None, batch_size=1000):
+        """Recalcule like_count d'un lot de commentaires à partir des relations LIKES"""
+        checked, fixed, last_id = repo.reconcile_counters("Comment", after=after, batch_size=batch_size)
+        if fixed:
+            _invalidate_all()
+            _log(("*", None, "reset", None))
+        return checked, fixed, last_id
+
+class Timeline:
+    """ Fil d'actualité matérialisé d'un utilisateur: ids des derniers posts de ses amis,
+    du plus récent au plus ancien (longueur bornée) """
+
+    # Nombre maximal de posts conservés par timeline
+    size = 500
+    # Au-delà de ce nombre d'amis, les posts d'un auteur ne sont pas recopiés dans les
+    # timelines de ses amis mais lus à la demande (fan-out à la lecture)
+    fanout_max_friends = 1000
+
+    @staticmethod
+    def rebuild(repo, after=None, batch_size=500, user_id=None):
+        """ Recalcule les timelines d'un lot d'utilisateurs (ordonnés par id, après `after`),
+        ou d'un seul utilisateur. Renvoie (nombre de timelines, dernier id traité) """
+        collection_versions.bump("Friendship")
+        _log(("Friendship", user_id, "rebuild", None))
+        return repo.rebuild_timelines(Timeline.fanout_max_friends, Timeline.size,
+                                      after=after, batch_size=batch_size, user_id=user_id)
+
+
+class Suggestions:
+    """ Suggestions d'amis précalculées: pour chaque utilisateur, les candidats (amis d'amis) ayant
+    le plus d'amis communs avec lui. Mises à jour à chaque ajout ou retrait d'amitié """
+
+    # Nombre maximal de candidats conservés par utilisateur
+    size = 50
+
+    @staticmethod
+    def rebuild(repo, after=None, batch_size=500, user_id=None):
+        """ Recalcule les suggestions d'un lot d'utilisateurs (ordonnés par id, après `after`),
+        ou d'un seul utilisateur. Renvoie (nombre d'utilisateurs, dernier id traité) """
+        collection_versions.bump("Friendship")
+        _log(("Friendship", user_id, "rebuild", None))
+        return repo.rebuild_suggestions(Suggestions.size, after=after, batch_size=batch_size, user_id=user_id)
+
+
+class Cascade:
+    """ Suppressions en cascade d'un nœud et de ses dépendances, étape par étape (CASCADE_STAGES) et par
+    lots bornés. Au-delà de job_threshold éléments à supprimer, elles sont confiées à un job d'arrière-plan """
+
+    # Nombre maximal d'éléments supprimés par transaction
+    batch_size = 1000
+    # Nombre d'éléments au-delà duquel la suppression est faite en arrière-plan
+    job_threshold = 1000
+
+    @staticmethod
+    def delete(repo, label, node_id, post_id=None):
+        """ Supprime le nœud (un commentaire doit appartenir à post_id si donné).
+        Renvoie (trouvé, job): job est l'état du job créé, ou None si la suppression est faite """
+        size = repo.cascade_size(label, node_id)
+        if size is None or (post_id is not None and size.get("parent_id") != post_id):
+            return False, None
+        # Éléments à supprimer, nœud compris
+        total = sum(size[stage] for stage in CASCADE_STAGES[label] if stage != "node") + 1
+        if total > Cascade.job_threshold:
+            job = jobs.submit(f"delete_{label.lower()}", node_id, total,
+                              lambda job_repo, progress: Cascade.run(job_repo, label, node_id, progress))
+            return True, job
+        Cascade.run(repo, label, node_id)
+        return True, None
+
+    @staticmethod
+    def run(repo, label, node_id, progress=None):
+        """ Vide chaque étape puis supprime le nœud; progress(count) après chaque lot. Le nœud n'est
+        supprimé que sans dépendances: celles créées pendant la cascade sont supprimées par un nouveau
+        passage sur toutes les étapes, jusqu'à la suppression (ou disparition) du nœud """
+        while True:
+            for stage in CASCADE_STAGES[label]:
+                # Un lot incomplet termine l'étape
+                while stage != "node" and Cascade._batch(repo, label, node_id, stage, progress) == Cascade.batch_size:
+                    pass
+            if Cascade._batch(repo, label, node_id, "node", progress) or repo.cascade_size(label, node_id) is None:
+                return
+
+    @staticmethod
+    def _batch(repo, label, node_id, stage, progress):
+        result = repo.delete_batch(label, node_id, stage, Cascade.batch_size)
+        Cascade._forget(result)
+        if progress is not None and result["count"]:
+            progress(result["count"])
+        return result["count"]
+
+    @staticmethod
+    def _forget(result):
+        """Répercute un lot supprimé sur le cache, l'instantané des amitiés, la recherche et les tendances"""
+        _invalidate(*[(label, node_id) for label, node_id in result["deleted"]],
+                    *[(label, node_id) for label, node_id, _, _ in result["touched"]])
+        _log(*[(label, node_id, "delete", None) for label, node_id in result["deleted"]],
+             *[(label, node_id, "unlike" if counter == "like_count" else "uncomment", None, at)
+               for label, node_id, counter, at in result["touched"]])
+        for label, node_id in result["deleted"]:
+            if label == "User":
+                friend_graph.remove_node(node_id)
+                collection_versions.bump("Friendship")
+            elif label == "Post":
+                search_index.remove("posts", node_id)
+                trending.remove(node_id)
+            else:
+                search_index.remove("comments", node_id)
+        for label, node_id, counter, at in result["touched"]:
+            if label == "Post" and counter == "like_count":
+                trending.unlike(node_id, at)
+            elif label == "Post":
+                trending.uncomment(node_id, at)
+
+
+class Changes:
+    """ Application des événements du journal des modifications écrits par les autres processus:
+    même effet local que l'écriture correspondante (cache, amitiés, recherche, tendances) """
+
+    @staticmethod
+    def apply(repo, events):
+        keys = []
+        indexed = {"Post": set(), "Comment": set()}
+        for event in events:
+            entity_type, entity_id, op, ref = event["type"], event["id"], event["op"], event["ref"]
+            if op == "reset":
+                _invalidate_all()
+                continue
+            if entity_type == "Friendship":
+                if op == "add":
+                    friend_graph.add_edge(entity_id, ref)
+                elif op == "remove":
+                    friend_graph.remove_edge(entity_id, ref)
+                collection_versions.bump("Friendship")
+                continue
+            keys.append((entity_type, entity_id))
+            if op == "delete":
+                indexed.get(entity_type, set()).discard(entity_id)
+                if entity_type == "User":
+                    friend_graph.remove_node(entity_id)
+                    collection_versions.bump("Friendship")
+                elif entity_type == "Post":
+                    search_index.remove("posts", entity_id)
+                    trending.remove(entity_id)
+                else:
+                    search_index.remove("comments", entity_id)
+            elif op in ("create", "update") and entity_type in indexed:
+                indexed[entity_type].add(entity_id)
+                if entity_type == "Comment" and op == "create":
+                    keys.append(("Post", ref))
+                    trending.comment(ref, int(event["at"]))
+            elif entity_type == "Post" and op == "like":
+                trending.like(entity_id, int(event["at"]))
+            elif entity_type == "Post" and op == "unlike":
+                trending.unlike(entity_id, event.get("created_at"))
+            elif entity_type == "Post" and op == "uncomment":
+                trending.uncomment(entity_id, event.get("created_at"))
+        _invalidate(*keys)
+        # Les documents créés ou modifiés sont relus (après invalidation) pour l'index de recherche
+        for label, kind in (("Post", "posts"), ("Comment", "comments")):
+            ids = sorted(indexed[label])
+            for doc in _find_many(repo, label, ids) if ids else []:
+                if doc:
+                    search_index.add(kind, doc)
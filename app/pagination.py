@@ -0,0 +1,133 @@
+# Pagination par curseur (keyset) et réponses JSON en streaming pour les routes de liste.
+# Les lignes sont consommées au fil de l'eau depuis le repository, sans être matérialisées.
+import base64
+import binascii
+import json
+from urllib.parse import urlencode
+from flask import request, jsonify, Response, stream_with_context
+
+# Taille de page par défaut et taille maximale autorisée
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Modes de streaming acceptés via ?stream=
+STREAM_MODES = ("ndjson", "json")
+
+
+class PaginationError(ValueError):
+    """Paramètres de pagination invalides (limit ou curseur)"""
+
+
+def encode_cursor(created_at, entity_id):
+    """Encode la position (created_at, id) d'un élément en curseur opaque"""
+    raw = json.dumps([created_at, entity_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Décode un curseur opaque en tuple (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, entity_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (binascii.Error, UnicodeError, ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    return created_at, entity_id
+
+
+def requested_stream(args):
+    """Mode de streaming demandé (?stream= ou Accept: application/x-ndjson), ou None"""
+    stream = args.get("stream")
+    if stream is None and "application/x-ndjson" in request.headers.get("Accept", ""):
+        stream = "ndjson"
+    return stream
+
+
+def parse_page_args(args):
+    """ Lit limit, after et stream depuis la query string.
+    En mode streaming, limit est optionnel: sans limite toutes les lignes sont envoyées """
+    stream = requested_stream(args)
+    if stream is not None and stream not in STREAM_MODES:
+        raise PaginationError("stream must be one of: " + ", ".join(STREAM_MODES))
+
+    limit = args.get("limit")
+    if limit is None:
+        limit = None if stream else DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise PaginationError("limit must be an integer")
+        if limit < 1 or limit > MAX_LIMIT:
+            raise PaginationError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    after = args.get("after")
+    after = decode_cursor(after) if after else None
+    return {"limit": limit, "after": after, "stream": stream}
+
+
+def _stream_response(rows, mode):
+    """ Corps envoyé au fil de la lecture des lignes. Le générateur garde le contexte de la requête
+    (stream_with_context): les lignes sont lues et comptées, et la requête terminée (métriques,
+    contrôle d'admission), quand le dernier morceau est envoyé et non au retour de la vue """
+    def generate():
+        try:
+            if mode == "ndjson":
+                for row in rows:
+                    yield json.dumps(row) + "\n"
+                return
+            yield "["
+            first = True
+            for row in rows:
+                yield ("" if first else ",") + json.dumps(row)
+                first = False
+            yield "]"
+        finally:
+            # Client déconnecté: le curseur est fermé aussitôt
+            if hasattr(rows, "close"):
+                rows.close()
+    mimetype = "application/x-ndjson" if mode == "ndjson" else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+
+def next_page_url(**params):
+    """URL de la page suivante: les paramètres de la requête courante, modifiés par params"""
+    args = request.args.copy()
+    for key, value in params.items():
+        args[key] = value
+    return f"{request.base_url}?{urlencode(list(args.items(multi=True)))}"
+
+
+def paginated_list(repo, kind, **scope):
+    """ Lit une page d'une liste du repository (voir LIST_KINDS) et renvoie la réponse Flask.
+    Hors streaming, une ligne de plus que limit est lue pour détecter la page suivante """
+    try:
+        page = parse_page_args(request.args)
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    limit = page["limit"]
+    fetch = limit if page["stream"] or limit is None else limit + 1
+    rows = repo.list_page(kind, after=page["after"], limit=fetch, **scope)
+
+    if page["stream"]:
+        return _stream_response(rows, page["stream"])
+
+    items = []
+    next_cursor = None
+    try:
+        for row in rows:
+            if len(items) == limit:
+                last = items[-1]
+                next_cursor = encode_cursor(last.get("created_at"), last.get("id"))
+                break
+            items.append(row)
+    finally:
+        # Ligne de plus lue: le curseur est fermé sans attendre le ramasse-miettes
+        if hasattr(rows, "close"):
+            rows.close()
+
+    response = jsonify(items)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_page_url(limit=limit, after=next_cursor)}>; rel="next"'
+    return response, 200
@@ -0,0 +1,159 @@
+# Profil agrégé d'un utilisateur (GET /api/users/<id>/profile): l'utilisateur, son nombre d'amis et la
+# première page de ses amis, ses posts récents (avec leurs compteurs) et ses commentaires récents.
+# Les sections sont des requêtes indépendantes exécutées en parallèle sur un pool de threads borné, chacune
+# sur sa propre connexion du pool Neo4j. Chaque section a sa limite de lignes et son propre délai: une
+# section en échec ou trop lente est renvoyée avec son erreur sans faire échouer le profil.
+# Une section expirée ne peut pas être interrompue: elle garde son thread jusqu'à la fin de sa requête.
+# Les sections en cours ou en file sont donc comptées, et un profil est rejeté (503) quand le pool n'a plus
+# de place pour toutes ses sections, plutôt que d'attendre derrière des sections déjà expirées.
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from flask import copy_current_request_context, g
+from app.admission import Overloaded
+from app.models import User
+from app.pagination import encode_cursor
+
+logger = logging.getLogger("app.profile")
+
+# Sections facultatives (?include=) et liste paginée de chacune
+PROFILE_SECTIONS = {"friends": "user_friends", "posts": "user_posts", "comments": "user_comments"}
+# Toutes les sections du profil, chacune avec son délai (voir ProfileLoader.configure)
+PROFILE_TASKS = ("user", "friend_count", *PROFILE_SECTIONS)
+
+
+def _page(repo, kind, user_id, limit):
+    """Première page d'une liste: {items, next_cursor} (une ligne de plus est lue pour le curseur)"""
+    items = list(repo.list_page(kind, limit=limit + 1, user_id=user_id))
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1].get("created_at"), items[-1].get("id"))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+class ProfileLoader:
+    """Pool de threads partagé par les requêtes de profil du processus"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.workers = 8
+        self.queue = 16
+        self.timeout = 2.0
+        self.section_timeouts = {}
+        self._executor = None
+        self._pid = None
+        self.in_flight = 0
+        self.timeouts = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def configure(self, workers=8, queue=16, timeout=2.0, section_timeouts=None):
+        """ queue: sections en attente d'un thread au-delà desquelles un profil est rejeté; timeout: délai (secondes) au-delà duquel une section non terminée est renvoyée en erreur;
+        section_timeouts: délai propre de certaines sections {section: secondes} (voir PROFILE_TASKS) """
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False)
+            self.workers = workers
+            self.queue = queue
+            self.timeout = timeout
+            self.section_timeouts = {name: (section_timeouts or {}).get(name, timeout) for name in PROFILE_TASKS}
+            self._executor = None
+            self._pid = None
+            self.in_flight = 0
+            self.timeouts = 0
+            self.failures = 0
+            self.rejected = 0
+
+    def _pool(self):
+        # Un pool par processus: les threads ne survivent pas à un fork
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="profile")
+                self._pid = os.getpid()
+                self.in_flight = 0
+            return self._executor
+
+    def _reserve(self, count):
+        """ Réserve une place dans le pool par section: quand les threads et la file sont pris (sections
+        expirées encore en cours comprises), le profil est rejeté au lieu d'attendre derrière elles """
+        with self._lock:
+            if self.in_flight + count > self.workers + self.queue:
+                self.rejected += 1
+                raise Overloaded("heavy", "profile workers busy")
+            self.in_flight += count
+
+    def _release(self, pid):
+        with self._lock:
+            if pid == self._pid:
+                self.in_flight -= 1
+
+    def _submit(self, pool, task, deadline):
+        """ Exécute task() dans le contexte de la requête courante; renvoie (résultat, allers-retours)
+        pour que la requête compte les allers-retours de ses sections """
+        @copy_current_request_context
+        def run():
+            # Section restée en file au-delà de son délai: déjà renvoyée en erreur, elle n'est pas lue
+            if time.monotonic() >= deadline:
+                raise TimeoutError("Section expired before it started")
+            return task(), g.get("db_round_trips", 0)
+        future = pool.submit(run)
+        pid = self._pid
+        future.add_done_callback(lambda _: self._release(pid))
+        return future
+
+    def load(self, repo, user_id, include, limits):
+        """ Profil de l'utilisateur avec les sections include (limite de lignes dans limits).
+        Renvoie None si l'utilisateur n'existe pas, sinon {user, friend_count, <section>..., errors}.
+        Lève Overloaded si le pool est saturé """
+        tasks = {"user": functools.partial(User.find_by_id, repo, user_id)}
+        if "friends" in include:
+            tasks["friend_count"] = functools.partial(User.friend_count, repo, user_id)
+        for section in include:
+            tasks[section] = functools.partial(_page, repo, PROFILE_SECTIONS[section], user_id, limits[section])
+        pool = self._pool()
+        self._reserve(len(tasks))
+        started = time.monotonic()
+        deadlines = {name: started + self.section_timeouts[name] for name in tasks}
+        futures = {name: self._submit(pool, task, deadlines[name]) for name, task in tasks.items()}
+
+        results, errors = {}, {}
+        # Chaque section est attendue jusqu'à son propre délai
+        for name, future in sorted(futures.items(), key=lambda item: deadlines[item[0]]):
+            try:
+                results[name], round_trips = future.result(timeout=max(deadlines[name] - time.monotonic(), 0))
+                g.db_round_trips = g.get("db_round_trips", 0) + round_trips
+            except FutureTimeoutError:
+                # Annulée si elle n'a pas commencé; sinon son thread reste réservé jusqu'à la fin de la requête
+                future.cancel()
+                errors[name] = f"Timed out after {self.section_timeouts[name]}s"
+                with self._lock:
+                    self.timeouts += 1
+            except Exception as e:
+                logger.error("Profile section %s of user %s failed: %s", name, user_id, e)
+                errors[name] = str(e)
+                with self._lock:
+                    self.failures += 1
+        # Sans l'utilisateur, le profil ne peut pas être construit
+        if "user" in errors:
+            raise RuntimeError(f"User lookup failed: {errors['user']}")
+        if results["user"] is None:
+            return None
+
+        # Une section en erreur vaut null et son message est dans errors
+        profile = {name: results.get(name) for name in tasks}
+        profile["errors"] = errors
+        return profile
+
+    def stats(self):
+        with self._lock:
+            return {"workers": self.workers, "queue": self.queue, "timeout": self.timeout, "section_timeouts": self.section_timeouts,
+                    "in_flight": self.in_flight, "timeouts": self.timeouts, "failures": self.failures,
+                    "rejected": self.rejected}
+
+
+# Instance partagée par la route de profil, configurée par create_app
+profile_loader = ProfileLoader()
@@ -0,0 +1,44 @@
+# Projection des réponses composites via ?fields=: seules les sections et propriétés demandées
+# sont renvoyées, pour réduire la taille des réponses.
+# Exemple: ?fields=post.title,post.like_count,author.name,comments.content
+
+
+class FieldsError(ValueError):
+    """Paramètre fields invalide (section inconnue)"""
+
+
+def parse_fields(value, sections):
+    """ Lit la liste "section" ou "section.propriété" séparée par des virgules.
+    Renvoie None (tout renvoyer) ou {section: None (section entière) ou ensemble de propriétés} """
+    if not value:
+        return None
+    fields = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        section, _, prop = item.partition(".")
+        if section not in sections:
+            raise FieldsError(f"Unknown field: {section} (expected one of: {', '.join(sections)})")
+        if not prop:
+            fields[section] = None
+        elif section not in fields or fields[section] is not None:
+            fields.setdefault(section, set()).add(prop)
+    return fields
+
+
+def _pick(value, props):
+    if props is None:
+        return value
+    if isinstance(value, list):
+        return [_pick(item, props) for item in value]
+    if isinstance(value, dict):
+        return {key: item for key, item in value.items() if key in props}
+    return value
+
+
+def project(document, fields):
+    """Ne garde du document que les sections et propriétés de fields (voir parse_fields)"""
+    if fields is None:
+        return document
+    return {section: _pick(document[section], props) for section, props in fields.items() if section in document}
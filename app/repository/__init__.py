@@ -0,0 +1,17 @@
+# Backends de stockage du graphe: Neo4j (py2neo) ou en mémoire, choisi par GRAPH_BACKEND
+from app.repository.base import Repository, DuplicateEmailError, LIST_KINDS, CASCADE_STAGES, EXPORT_KINDS
+from app.repository.memory import MemoryRepository
+from app.repository.instrumented import InstrumentedRepository
+
+BACKENDS = ("neo4j", "memory")
+
+
+def create_repository(backend, graph=None):
+    """Crée le backend demandé; le backend neo4j utilise le graph py2neo fourni"""
+    if backend == "memory":
+        return MemoryRepository()
+    if backend == "neo4j":
+        # Import local: py2neo n'est nécessaire qu'avec ce backend
+        from app.repository.neo4j import Neo4jRepository
+        return Neo4jRepository(graph)
+    raise ValueError(f"Unknown GRAPH_BACKEND {backend!r}, expected one of: {', '.join(BACKENDS)}")
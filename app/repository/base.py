@@ -0,0 +1,245 @@
+# Interface commune aux backends de stockage du graphe social
+# Chaque méthode correspond à un seul aller-retour vers le stockage et renvoie des dicts de propriétés.
+
+
+class DuplicateEmailError(Exception):
+    """L'email est déjà utilisé par un autre utilisateur"""
+
+
+# Listes paginées disponibles pour list_page, avec les paramètres de portée attendus
+LIST_KINDS = {
+    "users": (),
+    "posts": (),
+    "comments": (),
+    "user_posts": ("user_id",),
+    "user_comments": ("user_id",),
+    "user_friends": ("user_id",),
+    "post_comments": ("post_id",),
+    "feed": ("user_id", "fanout_max_friends"),
+}
+
+# Exports par lots (voir export_page): lignes produites pour chaque type, à partir d'un lot de nœuds
+# ordonnés par id (utilisateurs pour les amitiés et les likes)
+EXPORT_KINDS = {
+    "users": ("id", "name", "email", "created_at"),
+    "posts": ("id", "user_id", "title", "content", "created_at"),
+    "comments": ("id", "user_id", "post_id", "content", "created_at"),
+    "friendships": ("user_id", "friend_id"),
+    "likes": ("user_id", "post_id", "comment_id", "created_at"),
+}
+
+# Étapes des suppressions en cascade (voir delete_batch), dans leur ordre d'exécution:
+# les dépendances d'abord, le nœud lui-même ("node") en dernier
+CASCADE_STAGES = {
+    # Commentaires et likes des posts de l'utilisateur, ses posts, ses commentaires et ses likes
+    # ailleurs, ses autres relations (amitiés, suggestions) puis l'utilisateur et sa timeline
+    "User": ("post_comments", "post_likes", "posts", "comments", "likes", "relationships", "node"),
+    "Post": ("comments", "likes", "node"),
+    "Comment": ("likes", "node"),
+}
+
+
+class Repository:
+    """ Accès au graphe (utilisateurs, posts, commentaires et leurs relations).
+    Les lignes des opérations en masse portent un index "i"; elles renvoient l'ensemble
+    des index effectivement écrits """
+
+    # Schéma et listes
+
+    def ping(self):
+        """Vérifie que le stockage répond (sonde de disponibilité); lève une exception sinon"""
+        raise NotImplementedError
+
+    def ensure_schema(self):
+        """Déclare les contraintes et index du backend; renvoie la liste des déclarations"""
+        raise NotImplementedError
+
+    def list_page(self, kind, after=None, limit=None, **scope):
+        """ Éléments d'une liste (voir LIST_KINDS) du plus récent au plus ancien, par
+        (created_at, id), strictement après le curseur `after` et au plus `limit` éléments """
+        raise NotImplementedError
+
+    def get_many(self, label, ids):
+        """Nœuds "User", "Post" ou "Comment" dont l'id est dans ids, en une requête: {id: propriétés}"""
+        raise NotImplementedError
+
+    # Utilisateurs
+
+    def create_user(self, props):
+        """Crée un utilisateur; lève DuplicateEmailError si l'email existe déjà"""
+        raise NotImplementedError
+
+    def get_user(self, user_id):
+        raise NotImplementedError
+
+    def update_user(self, user_id, props):
+        """Renvoie l'utilisateur modifié ou None; lève DuplicateEmailError"""
+        raise NotImplementedError
+
+    def add_friend(self, user_id, friend_id, size):
+        """ Crée la relation FRIENDS_WITH si elle n'existe pas et, dans la même opération, met à jour les
+        suggestions touchées par la nouvelle amitié: les scores des paires dont un ami commun a changé
+        sont recalculés exactement, puis chaque liste est tronquée à ses size meilleurs candidats.
+        Renvoie (trouvé, créé): (False, False) si un utilisateur manque, (True, False) si déjà amis """
+        raise NotImplementedError
+
+    def remove_friend(self, user_id, friend_id, size):
+        """Supprime la relation FRIENDS_WITH et met à jour les suggestions comme add_friend"""
+        raise NotImplementedError
+
+    def are_friends(self, user_id, friend_id):
+        raise NotImplementedError
+
+    def list_friends(self, user_id):
+        raise NotImplementedError
+
+    def count_friends(self, user_id):
+        raise NotImplementedError
+
+    def mutual_friends(self, user_id, other_id):
+        raise NotImplementedError
+
+    def list_friendships(self):
+        """Toutes les amitiés, chacune une fois: itérable de paires (user_id, friend_id)"""
+        raise NotImplementedError
+
+    def friend_path(self, user_id, other_id, max_depth):
+        """Ids du plus court chemin d'amitiés (au plus max_depth relations), ou None"""
+        raise NotImplementedError
+
+    def list_suggestions(self, user_id, limit):
+        """ Suggestions d'amis précalculées, par nombre d'amis communs décroissant:
+        [{...propriétés du candidat, mutual_friends}] """
+        raise NotImplementedError
+
+    def bulk_create_users(self, rows):
+        """Une ligne dont l'email appartient déjà à un autre utilisateur n'est pas écrite"""
+        raise NotImplementedError
+
+    def bulk_add_friends(self, rows):
+        raise NotImplementedError
+
+    def bulk_add_likes(self, rows):
+        """Lignes {i, user_id, post_id, comment_id}, une seule des deux cibles renseignée"""
+        raise NotImplementedError
+
+    def bulk_set_likes(self, rows):
+        """ Lignes {i, user_id, post_id, comment_id, liked, created_at}: crée (liked) ou supprime la
+        relation LIKES et met like_count à jour. Renvoie {index: instant du like retiré, None pour un like
+        créé} des lignes qui ont changé l'état """
+        raise NotImplementedError
+
+    # Posts
+
+    def create_post(self, user_id, props, fanout_max_friends, timeline_size):
+        """ Crée le post et l'ajoute en tête de la timeline des amis de l'auteur
+        (sauf si l'auteur a plus de fanout_max_friends amis); None si l'auteur manque """
+        raise NotImplementedError
+
+    def get_post(self, post_id):
+        raise NotImplementedError
+
+    def get_post_detail(self, post_id, comments_after=None, comments_limit=None):
+        """ Post, résumé de son auteur {id, name} et une page de ses commentaires (ordre de
+        list_page), chacun avec le résumé de son auteur. Renvoie {post, author, comments} ou None """
+        raise NotImplementedError
+
+    def update_post(self, post_id, props):
+        raise NotImplementedError
+
+
+    def add_post_like(self, user_id, post_id):
+        """ Like idempotent; like_count n'est incrémenté que si la relation est créée.
+        Renvoie (utilisateur et post trouvés, relation créée) """
+        raise NotImplementedError
+
+    def remove_post_like(self, user_id, post_id):
+        """ Retire le like et décrémente like_count. Renvoie (like retiré, instant du like retiré ou None);
+        un like sans horodatage (import en masse) prend la date du post, comme dans list_post_activity """
+        raise NotImplementedError
+
+    def bulk_create_posts(self, rows):
+        raise NotImplementedError
+
+    # Commentaires
+
+    def create_comment(self, user_id, post_id, props):
+        """Crée le commentaire et incrémente comment_count du post; None si un endpoint manque"""
+        raise NotImplementedError
+
+    def get_comment(self, comment_id):
+        raise NotImplementedError
+
+    def update_comment(self, comment_id, props):
+        raise NotImplementedError
+
+    def add_comment_like(self, user_id, comment_id):
+        """Comme add_post_like: (utilisateur et commentaire trouvés, relation créée)"""
+        raise NotImplementedError
+
+    def remove_comment_like(self, user_id, comment_id):
+        raise NotImplementedError
+
+    def has_like(self, user_id, label, target_id):
+        """Vrai si l'utilisateur aime le nœud "Post" ou "Comment" target_id"""
+        raise NotImplementedError
+
+    def bulk_create_comments(self, rows):
+        raise NotImplementedError
+
+    # Suppressions en cascade
+
+    def cascade_size(self, label, node_id):
+        """ Nombre d'éléments (nœuds ou relations) que supprimera chaque étape de CASCADE_STAGES[label]
+        avant le nœud lui-même: {étape: nombre}, plus parent_id (id du post) pour un commentaire.
+        None si le nœud n'existe pas """
+        raise NotImplementedError
+
+    def delete_batch(self, label, node_id, stage, batch_size):
+        """ Exécute un lot d'au plus batch_size suppressions de l'étape stage (CASCADE_STAGES[label]).
+        Les compteurs des nœuds conservés (like_count, comment_count) sont décrémentés dans le même lot.
+        L'étape node ne supprime le nœud que si les autres étapes n'ont plus rien à supprimer (count 0 sinon).
+        Renvoie {count: éléments supprimés, deleted: [(label, id)] des nœuds supprimés,
+        touched: [(label, id, compteur, instant)], une entrée par décrément, avec l'instant de création du
+        like ou du commentaire retiré} """
+        raise NotImplementedError
+
+    # Jobs
+
+    def save_job(self, props):
+        """Crée ou met à jour l'état d'un job d'arrière-plan (propriétés à plat, clé id)"""
+        raise NotImplementedError
+
+    def get_job(self, job_id):
+        raise NotImplementedError
+
+    def prune_jobs(self, before):
+        """Supprime les jobs terminés avant l'horodatage before; renvoie leur nombre"""
+        raise NotImplementedError
+
+    # Maintenance
+
+    def list_post_activity(self, since, after=None, batch_size=500):
+        """ Horodatages des likes et commentaires postérieurs à since d'un lot de posts ordonnés par id:
+        [{id, likes: [created_at], comments: [created_at]}] """
+        raise NotImplementedError
+
+    def export_page(self, kind, after=None, batch_size=1000):
+        """ Lignes d'un type (voir EXPORT_KINDS) pour un lot de nœuds ordonnés par id, après `after`:
+        chaque amitié n'est produite qu'une fois (user_id < friend_id). Renvoie (lignes, dernier id) """
+        raise NotImplementedError
+
+    def reconcile_counters(self, label, after=None, batch_size=1000):
+        """ Recalcule les compteurs d'un lot de nœuds "Post" ou "Comment" ordonnés par id.
+        Renvoie (nœuds vérifiés, nœuds corrigés, dernier id traité) """
+        raise NotImplementedError
+
+    def rebuild_suggestions(self, size, after=None, batch_size=500, user_id=None):
+        """ Recalcule entièrement les suggestions d'un lot d'utilisateurs ordonnés par id, ou d'un seul.
+        Renvoie (nombre d'utilisateurs, dernier id traité) """
+        raise NotImplementedError
+
+    def rebuild_timelines(self, fanout_max_friends, timeline_size, after=None, batch_size=500, user_id=None):
+        """ Recalcule les timelines d'un lot d'utilisateurs ordonnés par id, ou d'un seul.
+        Renvoie (nombre de timelines, dernier id traité) """
+        raise NotImplementedError
@@ -0,0 +1,76 @@
+# Instrumentation des accès au stockage: latence, lignes renvoyées et erreurs de chaque requête,
+# sous un nom stable (la méthode du repository, suffixée du type de liste pour list_page et export_page),
+# et journal des requêtes lentes.
+import inspect
+import logging
+import time
+from app.metrics import db_query_duration, db_query_rows, db_query_errors
+
+slow_query_logger = logging.getLogger("app.slow_queries")
+
+# Longueur maximale des paramètres recopiés dans le journal des requêtes lentes
+MAX_LOGGED_PARAMS = 300
+
+
+def _row_count(result):
+    """Nombre de lignes d'un résultat: entités (dict), listes, ensembles d'index écrits"""
+    if result is None or result is False:
+        return 0
+    if isinstance(result, (list, set, frozenset)):
+        return len(result)
+    return 1
+
+
+class InstrumentedRepository:
+    """ Enveloppe un Repository et mesure chacune de ses opérations.
+    Les résultats paresseux (générateurs de list_page) sont comptés au fil de leur lecture """
+
+    def __init__(self, repo, backend, slow_query_ms=0):
+        self._repo = repo
+        self.backend = backend
+        self.slow_query_ms = slow_query_ms
+
+    def __getattr__(self, name):
+        attr = getattr(self._repo, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+
+        def instrumented(*args, **kwargs):
+            query = f"{name}.{args[0]}" if name in ("list_page", "export_page") and args else name
+            started = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                self._record(query, started, args, kwargs, error=type(e).__name__)
+                raise
+            if inspect.isgenerator(result):
+                self._record(query, started, args, kwargs)
+                return self._count_rows(query, result)
+            self._record(query, started, args, kwargs, rows=_row_count(result))
+            return result
+        return instrumented
+
+    def _count_rows(self, query, rows):
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                yield row
+        finally:
+            db_query_rows.inc(count, backend=self.backend, query=query)
+            if hasattr(rows, "close"):
+                rows.close()
+
+    def _record(self, query, started, args, kwargs, rows=None, error=None):
+        seconds = time.perf_counter() - started
+        db_query_duration.observe(seconds, backend=self.backend, query=query)
+        if rows is not None:
+            db_query_rows.inc(rows, backend=self.backend, query=query)
+        if error is not None:
+            db_query_errors.inc(backend=self.backend, query=query, error=error)
+        if self.slow_query_ms and seconds * 1000 >= self.slow_query_ms:
+            params = repr((args, kwargs))
+            if len(params) > MAX_LOGGED_PARAMS:
+                params = params[:MAX_LOGGED_PARAMS] + "..."
+            slow_query_logger.warning("slow query %s: %.1f ms (backend=%s%s) params=%s", query, seconds * 1000,
+                                      self.backend, f", error={error}" if error else "", params)
@@ -0,0 +1,717 @@
+# Backend en mémoire: remplaçant de Neo4j pour les tests unitaires et les mesures de référence.
+# Index par hachage sur id et email, listes d'adjacence par type de relation, index triés
+# par (created_at, id) pour la pagination. Chaque opération compte comme un aller-retour.
+import bisect
+import functools
+import heapq
+import threading
+import time
+from collections import defaultdict
+from app.db import count_round_trip
+from app.friendships import bidirectional_bfs
+from app.repository.base import Repository, DuplicateEmailError, CASCADE_STAGES
+
+
+def _operation(method):
+    """Compte l'appel comme un aller-retour et l'exécute sous le verrou du stockage"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        count_round_trip()
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _sort_key(props):
+    return (props.get("created_at") or 0, props["id"])
+
+
+class _SortedIndex:
+    """Clés (created_at, id) triées par ordre croissant, parcourues du plus récent au plus ancien"""
+
+    def __init__(self):
+        self.keys = []
+
+    def add(self, props):
+        bisect.insort(self.keys, _sort_key(props))
+
+    def remove(self, props):
+        key = _sort_key(props)
+        position = bisect.bisect_left(self.keys, key)
+        if position < len(self.keys) and self.keys[position] == key:
+            del self.keys[position]
+
+    def iter_desc(self, after=None):
+        position = len(self.keys) if after is None else bisect.bisect_left(self.keys, tuple(after))
+        for index in range(position - 1, -1, -1):
+            yield self.keys[index][1]
+
+
+class _Adjacency:
+    """Relations d'un type donné: voisins sortants et entrants de chaque nœud"""
+
+    def __init__(self):
+        self.out = defaultdict(set)
+        self.inc = defaultdict(set)
+        # Horodatage (created_at) des relations qui en ont un
+        self.created_at = {}
+
+    def add(self, source, target, created_at=None):
+        if target in self.out[source]:
+            return False
+        self.out[source].add(target)
+        self.inc[target].add(source)
+        if created_at is not None:
+            self.created_at[(source, target)] = created_at
+        return True
+
+    def remove(self, source, target):
+        if target not in self.out.get(source, ()):
+            return False
+        self.out[source].discard(target)
+        self.inc[target].discard(source)
+        self.created_at.pop((source, target), None)
+        return True
+
+    def targets(self, source):
+        return self.out.get(source, set())
+
+    def sources(self, target):
+        return self.inc.get(target, set())
+
+    def remove_node(self, node_id):
+        """Supprime toutes les relations entrantes et sortantes du nœud (DETACH)"""
+        for target in self.out.pop(node_id, set()):
+            self.inc[target].discard(node_id)
+            self.created_at.pop((node_id, target), None)
+        for source in self.inc.pop(node_id, set()):
+            self.out[source].discard(node_id)
+            self.created_at.pop((source, node_id), None)
+
+
+class MemoryRepository(Repository):
+    """Stockage du graphe dans des structures Python, local au processus"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # Nœuds par label, indexés par id
+        self.users = {}
+        self.posts = {}
+        self.comments = {}
+        # Index unique sur l'email
+        self.users_by_email = {}
+        # Index triés pour les listes paginées
+        self.sorted = {"User": _SortedIndex(), "Post": _SortedIndex(), "Comment": _SortedIndex()}
+        # Relations: FRIENDS_WITH (un seul sens stocké, lue dans les deux), CREATED, HAS_COMMENT, LIKES
+        self.friends = _Adjacency()
+        self.created_posts = _Adjacency()
+        self.created_comments = _Adjacency()
+        self.has_comment = _Adjacency()
+        self.likes_posts = _Adjacency()
+        self.likes_comments = _Adjacency()
+        # Timelines matérialisées: ids de posts du plus récent au plus ancien
+        self.timelines = {}
+        # Suggestions d'amis précalculées: user_id -> {candidat: nombre d'amis communs}
+        self.suggestions = {}
+        # Jobs d'arrière-plan, par id
+        self.jobs = {}
+
+    def _nodes(self, label):
+        return {"User": self.users, "Post": self.posts, "Comment": self.comments}[label]
+
+    def _insert(self, label, props):
+        self._nodes(label)[props["id"]] = props
+        self.sorted[label].add(props)
+        if label == "User":
+            self.users_by_email[props["email"]] = props["id"]
+
+    def _update(self, label, node_id, props):
+        nodes = self._nodes(label)
+        node = nodes.get(node_id)
+        if node is None:
+            return None
+        self.sorted[label].remove(node)
+        node.update(props)
+        self.sorted[label].add(node)
+        return dict(node)
+
+    def _remove(self, label, node_id):
+        node = self._nodes(label).pop(node_id, None)
+        if node is not None:
+            self.sorted[label].remove(node)
+        return node
+
+    def _friend_ids(self, user_id):
+        return self.friends.targets(user_id) | self.friends.sources(user_id)
+
+    # Schéma et listes
+
+    @_operation
+    def ping(self):
+        return True
+
+    def ensure_schema(self):
+        # Les index par hachage sur id et email sont inhérents au stockage
+        return []
+
+    def _scope_ids(self, kind, scope):
+        """Ids candidats d'une liste limitée à un utilisateur ou un post (None pour toute la collection)"""
+        if kind == "user_posts":
+            return self.created_posts.targets(scope["user_id"])
+        if kind == "user_comments":
+            return self.created_comments.targets(scope["user_id"])
+        if kind == "user_friends":
+            return self._friend_ids(scope["user_id"])
+        if kind == "post_comments":
+            return self.has_comment.targets(scope["post_id"])
+        if kind == "feed":
+            user_id = scope["user_id"]
+            if user_id not in self.users:
+                return set()
+            ids = {post_id for post_id in self.timelines.get(user_id, []) if post_id in self.posts}
+            for friend_id in self._friend_ids(user_id):
+                if len(self._friend_ids(friend_id)) > scope["fanout_max_friends"]:
+                    ids |= self.created_posts.targets(friend_id)
+            return ids
+        return None
+
+    @_operation
+    def list_page(self, kind, after=None, limit=None, **scope):
+        label, nodes = {"users": ("User", self.users), "user_friends": ("User", self.users),
+                        "comments": ("Comment", self.comments), "post_comments": ("Comment", self.comments),
+                        "user_comments": ("Comment", self.comments)}.get(kind, ("Post", self.posts))
+        ids = self._scope_ids(kind, scope)
+        if ids is None:
+            ordered = self.sorted[label].iter_desc(after)
+        else:
+            keys = sorted((_sort_key(nodes[node_id]) for node_id in ids), reverse=True)
+            if after is not None:
+                keys = [key for key in keys if key < tuple(after)]
+            ordered = (key[1] for key in keys)
+        items = []
+        for node_id in ordered:
+            if limit is not None and len(items) >= limit:
+                break
+            items.append(dict(nodes[node_id]))
+        return items
+
+    @_operation
+    def get_many(self, label, ids):
+        nodes = self._nodes(label)
+        return {node_id: dict(nodes[node_id]) for node_id in ids if node_id in nodes}
+
+    # Utilisateurs
+
+    @_operation
+    def create_user(self, props):
+        if props["email"] in self.users_by_email:
+            raise DuplicateEmailError(props["email"])
+        self._insert("User", dict(props))
+        return dict(props)
+
+    @_operation
+    def get_user(self, user_id):
+        user = self.users.get(user_id)
+        return dict(user) if user is not None else None
+
+    @_operation
+    def update_user(self, user_id, props):
+        user = self.users.get(user_id)
+        if user is None:
+            return None
+        email = props.get("email")
+        if email is not None and self.users_by_email.get(email, user_id) != user_id:
+            raise DuplicateEmailError(email)
+        if email is not None:
+            self.users_by_email.pop(user.get("email"), None)
+            self.users_by_email[email] = user_id
+        return self._update("User", user_id, props)
+
+    def _add_friend(self, user_id, friend_id):
+        """(trouvé, créé), comme add_post_like"""
+        if user_id not in self.users or friend_id not in self.users:
+            return False, False
+        if friend_id in self._friend_ids(user_id):
+            return True, False
+        self.friends.add(user_id, friend_id)
+        return True, True
+
+    @_operation
+    def add_friend(self, user_id, friend_id, size):
+        found, created = self._add_friend(user_id, friend_id)
+        if created:
+            self._update_suggestions(user_id, friend_id, size)
+        return found, created
+
+    @_operation
+    def remove_friend(self, user_id, friend_id, size):
+        removed = self.friends.remove(user_id, friend_id) or self.friends.remove(friend_id, user_id)
+        if removed:
+            self._update_suggestions(user_id, friend_id, size)
+        return removed
+
+    @_operation
+    def are_friends(self, user_id, friend_id):
+        return friend_id in self._friend_ids(user_id)
+
+    @_operation
+    def list_friends(self, user_id):
+        return [dict(self.users[friend_id]) for friend_id in self._friend_ids(user_id)]
+
+    @_operation
+    def count_friends(self, user_id):
+        return len(self._friend_ids(user_id))
+
+    @_operation
+    def mutual_friends(self, user_id, other_id):
+        mutual = self._friend_ids(user_id) & self._friend_ids(other_id)
+        return [dict(self.users[friend_id]) for friend_id in mutual]
+
+    def _best_suggestions(self, candidates, size):
+        return heapq.nsmallest(size, candidates.items(), key=lambda item: (-item[1], item[0]))
+
+    @_operation
+    def list_friendships(self):
+        return [(user_id, friend_id) for user_id, targets in self.friends.out.items() for friend_id in targets]
+
+    @_operation
+    def friend_path(self, user_id, other_id, max_depth):
+        if user_id not in self.users or other_id not in self.users:
+            return None
+        return bidirectional_bfs(user_id, other_id, self._friend_ids, max_depth)
+
+    @_operation
+    def list_suggestions(self, user_id, limit):
+        best = self._best_suggestions(self.suggestions.get(user_id, {}), limit)
+        return [dict(self.users[candidate_id], mutual_friends=mutual)
+                for candidate_id, mutual in best if candidate_id in self.users]
+
+    def _update_suggestions(self, user_id, friend_id, size):
+        """ Suggestions touchées par l'ajout ou le retrait de l'amitié (user_id, friend_id): les scores des
+        paires dont un ami commun a changé sont recalculés, puis chaque liste est tronquée à size """
+        pairs = {(friend_id, other) for other in self._friend_ids(user_id) if other != friend_id}
+        pairs |= {(user_id, other) for other in self._friend_ids(friend_id) if other != user_id}
+        pairs.add((user_id, friend_id))
+        touched = set()
+        for user, candidate in pairs:
+            friend_ids = self._friend_ids(user)
+            mutual = 0 if candidate in friend_ids else len(friend_ids & self._friend_ids(candidate))
+            for source, target in ((user, candidate), (candidate, user)):
+                candidates = self.suggestions.setdefault(source, {})
+                if mutual:
+                    candidates[target] = mutual
+                else:
+                    candidates.pop(target, None)
+                touched.add(source)
+        for source in touched:
+            if len(self.suggestions[source]) > size:
+                self.suggestions[source] = dict(self._best_suggestions(self.suggestions[source], size))
+        return len(touched)
+
+    @_operation
+    def bulk_create_users(self, rows):
+        written = set()
+        for row in rows:
+            existing_id = self.users_by_email.get(row["email"])
+            if existing_id is None:
+                self._insert("User", {key: row[key] for key in ("id", "name", "email", "created_at")})
+            elif existing_id != row["id"]:
+                continue
+            written.add(row["i"])
+        return written
+
+    @_operation
+    def bulk_add_friends(self, rows):
+        # Comme MERGE côté Neo4j: une amitié qui existait déjà compte comme écrite
+        return {row["i"] for row in rows if self._add_friend(row["user_id"], row["friend_id"])[0]}
+
+    @_operation
+    def bulk_add_likes(self, rows):
+        written = set()
+        for row in rows:
+            if row.get("post_id"):
+                liked = self._add_like(self.posts, self.likes_posts, row["user_id"], row["post_id"])
+            else:
+                liked = self._add_like(self.comments, self.likes_comments, row["user_id"], row["comment_id"])
+            if liked is not None:
+                written.add(row["i"])
+        return written
+
+    @_operation
+    def bulk_set_likes(self, rows):
+        written = {}
+        for row in rows:
+            nodes, likes, target_id = ((self.posts, self.likes_posts, row["post_id"]) if row.get("post_id")
+                                       else (self.comments, self.likes_comments, row["comment_id"]))
+            if row["liked"]:
+                if self._add_like(nodes, likes, row["user_id"], target_id, created_at=row["created_at"]):
+                    written[row["i"]] = None
+            elif target_id in nodes:
+                liked_at = self._like_time(nodes, likes, row["user_id"], target_id)
+                if self._remove_like(nodes, likes, row["user_id"], target_id):
+                    written[row["i"]] = liked_at
+        return written
+
+    # Likes (posts et commentaires)
+
+    def _add_like(self, nodes, likes, user_id, target_id, created_at=None):
+        """None si l'utilisateur ou la cible manque, sinon vrai si le like vient d'être créé"""
+        target = nodes.get(target_id)
+        if user_id not in self.users or target is None:
+            return None
+        if not likes.add(user_id, target_id, created_at=created_at):
+            return False
+        target["like_count"] = (target.get("like_count") or 0) + 1
+        return True
+
+    def _like_time(self, nodes, likes, user_id, target_id):
+        """Instant du like (celui de la cible pour un like sans horodatage)"""
+        return likes.created_at.get((user_id, target_id), nodes[target_id].get("created_at") or 0)
+
+    def _remove_like(self, nodes, likes, user_id, target_id):
+        if user_id not in self.users or not likes.remove(user_id, target_id):
+            return False
+        target = nodes[target_id]
+        target["like_count"] = max((target.get("like_count") or 0) - 1, 0)
+        return True
+
+    # Posts
+
+    def _create_post(self, user_id, props):
+        self._insert("Post", props)
+        self.created_posts.add(user_id, props["id"])
+
+    @_operation
+    def create_post(self, user_id, props, fanout_max_friends, timeline_size):
+        if user_id not in self.users:
+            return None
+        self._create_post(user_id, dict(props))
+        friend_ids = self._friend_ids(user_id)
+        if len(friend_ids) <= fanout_max_friends:
+            for friend_id in friend_ids:
+                self.timelines[friend_id] = ([props["id"]] + self.timelines.get(friend_id, []))[:timeline_size]
+        return dict(props)
+
+    @_operation
+    def get_post(self, post_id):
+        post = self.posts.get(post_id)
+        return dict(post) if post is not None else None
+
+    def _author(self, created, node_id):
+        """Résumé {id, name} du créateur d'un post ou d'un commentaire"""
+        user = self.users.get(next(iter(created.sources(node_id)), None))
+        return {"id": user["id"], "name": user["name"]} if user is not None else None
+
+    @_operation
+    def get_post_detail(self, post_id, comments_after=None, comments_limit=None):
+        post = self.posts.get(post_id)
+        if post is None:
+            return None
+        keys = sorted((_sort_key(self.comments[comment_id]) for comment_id in self.has_comment.targets(post_id)),
+                      reverse=True)
+        if comments_after is not None:
+            keys = [key for key in keys if key < tuple(comments_after)]
+        if comments_limit is not None:
+            keys = keys[:comments_limit]
+        comments = [dict(self.comments[comment_id], author=self._author(self.created_comments, comment_id))
+                    for _, comment_id in keys]
+        return {"post": dict(post), "author": self._author(self.created_posts, post_id), "comments": comments}
+
+    @_operation
+    def update_post(self, post_id, props):
+        return self._update("Post", post_id, props)
+
+    @_operation
+    def add_post_like(self, user_id, post_id):
+        created = self._add_like(self.posts, self.likes_posts, user_id, post_id, created_at=int(time.time()))
+        return created is not None, bool(created)
+
+    @_operation
+    def remove_post_like(self, user_id, post_id):
+        if post_id not in self.posts:
+            return False, None
+        liked_at = self._like_time(self.posts, self.likes_posts, user_id, post_id)
+        removed = self._remove_like(self.posts, self.likes_posts, user_id, post_id)
+        return removed, liked_at if removed else None
+
+    @_operation
+    def bulk_create_posts(self, rows):
+        written = set()
+        for row in rows:
+            if row["user_id"] not in self.users:
+                continue
+            if row["id"] not in self.posts:
+                props = {key: row[key] for key in ("id", "title", "content", "created_at")}
+                self._create_post(row["user_id"], dict(props, like_count=0, comment_count=0))
+            else:
+                self.created_posts.add(row["user_id"], row["id"])
+            written.add(row["i"])
+        return written
+
+    # Commentaires
+
+    def _create_comment(self, user_id, post_id, props):
+        if props["id"] not in self.comments:
+            self._insert("Comment", props)
+        self.created_comments.add(user_id, props["id"])
+        if self.has_comment.add(post_id, props["id"]):
+            post = self.posts[post_id]
+            post["comment_count"] = (post.get("comment_count") or 0) + 1
+
+    @_operation
+    def create_comment(self, user_id, post_id, props):
+        if user_id not in self.users or post_id not in self.posts:
+            return None
+        self._create_comment(user_id, post_id, dict(props))
+        return dict(props)
+
+    @_operation
+    def get_comment(self, comment_id):
+        comment = self.comments.get(comment_id)
+        return dict(comment) if comment is not None else None
+
+    @_operation
+    def update_comment(self, comment_id, props):
+        return self._update("Comment", comment_id, props)
+
+    @_operation
+    def add_comment_like(self, user_id, comment_id):
+        created = self._add_like(self.comments, self.likes_comments, user_id, comment_id,
+                                 created_at=int(time.time()))
+        return created is not None, bool(created)
+
+    @_operation
+    def remove_comment_like(self, user_id, comment_id):
+        return self._remove_like(self.comments, self.likes_comments, user_id, comment_id)
+
+    @_operation
+    def has_like(self, user_id, label, target_id):
+        likes = {"Post": self.likes_posts, "Comment": self.likes_comments}[label]
+        return target_id in likes.targets(user_id)
+
+    @_operation
+    def bulk_create_comments(self, rows):
+        written = set()
+        for row in rows:
+            if row["user_id"] not in self.users or row["post_id"] not in self.posts:
+                continue
+            props = {key: row[key] for key in ("id", "content", "created_at")}
+            self._create_comment(row["user_id"], row["post_id"], dict(props, like_count=0))
+            written.add(row["i"])
+        return written
+
+    # Suppressions en cascade
+
+    def _decrement(self, node, key):
+        node[key] = max((node.get(key) or 0) - 1, 0)
+
+    def _drop(self, label, node_id):
+        """Supprime un nœud et toutes ses relations (DETACH DELETE), sans toucher aux compteurs"""
+        node = self._remove(label, node_id)
+        if node is None:
+            return False
+        adjacencies = {
+            "User": (self.friends, self.created_posts, self.created_comments, self.likes_posts, self.likes_comments),
+            "Post": (self.created_posts, self.has_comment, self.likes_posts),
+            "Comment": (self.created_comments, self.has_comment, self.likes_comments),
+        }[label]
+        for adjacency in adjacencies:
+            adjacency.remove_node(node_id)
+        if label == "User":
+            self.users_by_email.pop(node.get("email"), None)
+            self.suggestions.pop(node_id, None)
+            # Relations SUGGESTED entrantes: l'utilisateur disparaît aussi des suggestions des autres
+            # (les listes étant tronquées, il peut y figurer sans que la réciproque existe)
+            for candidates in self.suggestions.values():
+                candidates.pop(node_id, None)
+            self.timelines.pop(node_id, None)
+        return True
+
+    def _cascade_items(self, label, node_id, stage):
+        """ Éléments supprimés par une étape de CASCADE_STAGES: ids de nœuds ("Post" ou "Comment")
+        ou relations (adjacence, source, cible) """
+        if label == "User":
+            post_ids = self.created_posts.targets(node_id)
+            if stage == "post_comments":
+                return [("Comment", comment_id) for post_id in post_ids
+                        for comment_id in self.has_comment.targets(post_id)]
+            if stage == "post_likes":
+                return [(self.likes_posts, user_id, post_id) for post_id in post_ids
+                        for user_id in self.likes_posts.sources(post_id)]
+            if stage == "posts":
+                return [("Post", post_id) for post_id in post_ids]
+            if stage == "comments":
+                return [("Comment", comment_id) for comment_id in self.created_comments.targets(node_id)]
+            if stage == "likes":
+                return ([(self.likes_posts, node_id, post_id) for post_id in self.likes_posts.targets(node_id)]
+                        + [(self.likes_comments, node_id, comment_id)
+                           for comment_id in self.likes_comments.targets(node_id)])
+            if stage == "relationships":
+                return ([(self.friends, node_id, friend_id) for friend_id in self.friends.targets(node_id)]
+                        + [(self.friends, friend_id, node_id) for friend_id in self.friends.sources(node_id)])
+        if label == "Post":
+            if stage == "comments":
+                return [("Comment", comment_id) for comment_id in self.has_comment.targets(node_id)]
+            if stage == "likes":
+                return [(self.likes_posts, user_id, node_id) for user_id in self.likes_posts.sources(node_id)]
+        if label == "Comment" and stage == "likes":
+            return [(self.likes_comments, user_id, node_id) for user_id in self.likes_comments.sources(node_id)]
+        raise ValueError(f"Unknown cascade stage {label}.{stage}")
+
+    @_operation
+    def cascade_size(self, label, node_id):
+        if node_id not in self._nodes(label):
+            return None
+        size = {stage: len(self._cascade_items(label, node_id, stage))
+                for stage in CASCADE_STAGES[label] if stage != "node"}
+        if label == "Comment":
+            size["parent_id"] = next(iter(self.has_comment.sources(node_id)), None)
+        return size
+
+    @_operation
+    def delete_batch(self, label, node_id, stage, batch_size):
+        deleted, touched = [], []
+        if stage == "node":
+            # Le nœud n'est supprimé qu'une fois ses dépendances supprimées
+            pending = node_id in self._nodes(label) and any(
+                self._cascade_items(label, node_id, other) for other in CASCADE_STAGES[label] if other != "node")
+            items = [(label, node_id)] if node_id in self._nodes(label) and not pending else []
+        else:
+            items = self._cascade_items(label, node_id, stage)[:batch_size]
+        for item in items:
+            if len(item) == 3:
+                adjacency, source, target = item
+                if label == "User" and stage == "likes":
+                    target_label = "Post" if adjacency is self.likes_posts else "Comment"
+                    nodes = self._nodes(target_label)
+                    touched.append((target_label, target, "like_count", self._like_time(nodes, adjacency, source,
+                                                                                       target)))
+                    self._decrement(nodes[target], "like_count")
+                adjacency.remove(source, target)
+                continue
+            item_label, item_id = item
+            # Un commentaire supprimé sans son post décrémente le compteur du post
+            if item_label == "Comment" and (label, stage) in (("User", "comments"), ("Comment", "node")):
+                for post_id in self.has_comment.sources(item_id):
+                    self._decrement(self.posts[post_id], "comment_count")
+                    touched.append(("Post", post_id, "comment_count", self.comments[item_id].get("created_at") or 0))
+            self._drop(item_label, item_id)
+            deleted.append((item_label, item_id))
+        return {"count": len(items), "deleted": deleted, "touched": touched}
+
+    # Jobs
+
+    @_operation
+    def save_job(self, props):
+        job = self.jobs.setdefault(props["id"], {})
+        for key, value in props.items():
+            # Comme SET += dans Neo4j: une valeur nulle retire la propriété
+            if value is None:
+                job.pop(key, None)
+            else:
+                job[key] = value
+
+    @_operation
+    def get_job(self, job_id):
+        job = self.jobs.get(job_id)
+        return dict(job) if job is not None else None
+
+    @_operation
+    def prune_jobs(self, before):
+        expired = [job_id for job_id, job in self.jobs.items() if job.get("finished_at", before) < before]
+        for job_id in expired:
+            del self.jobs[job_id]
+        return len(expired)
+
+    # Maintenance
+
+    def _ids_after(self, nodes, after, batch_size):
+        return heapq.nsmallest(batch_size, (node_id for node_id in nodes if after is None or node_id > after))
+
+    @_operation
+    def list_post_activity(self, since, after=None, batch_size=500):
+        rows = []
+        for post_id in self._ids_after(self.posts, after, batch_size):
+            created_at = self.posts[post_id].get("created_at") or 0
+            likes = [self.likes_posts.created_at.get((user_id, post_id), created_at)
+                     for user_id in self.likes_posts.sources(post_id)]
+            comments = [self.comments[comment_id].get("created_at") or 0
+                        for comment_id in self.has_comment.targets(post_id)]
+            rows.append({"id": post_id, "likes": [at for at in likes if at >= since],
+                         "comments": [at for at in comments if at >= since]})
+        return rows
+
+    @_operation
+    def export_page(self, kind, after=None, batch_size=1000):
+        def source(adjacency, node_id):
+            return next(iter(adjacency.sources(node_id)), None)
+
+        nodes = {"posts": self.posts, "comments": self.comments}.get(kind, self.users)
+        ids = self._ids_after(nodes, after, batch_size)
+        rows = []
+        for node_id in ids:
+            node = nodes[node_id]
+            if kind == "users":
+                rows.append({key: node.get(key) for key in ("id", "name", "email", "created_at")})
+            elif kind == "posts":
+                rows.append({"id": node_id, "user_id": source(self.created_posts, node_id), "title": node.get("title"),
+                             "content": node.get("content"), "created_at": node.get("created_at")})
+            elif kind == "comments":
+                rows.append({"id": node_id, "user_id": source(self.created_comments, node_id),
+                             "post_id": source(self.has_comment, node_id), "content": node.get("content"),
+                             "created_at": node.get("created_at")})
+            elif kind == "friendships":
+                rows.extend({"user_id": node_id, "friend_id": friend_id}
+                            for friend_id in sorted(self._friend_ids(node_id)) if node_id < friend_id)
+            else:
+                for likes, key in ((self.likes_posts, "post_id"), (self.likes_comments, "comment_id")):
+                    rows.extend({"user_id": node_id, "post_id": None, "comment_id": None, key: target_id,
+                                 "created_at": likes.created_at.get((node_id, target_id))}
+                                for target_id in sorted(likes.targets(node_id)))
+        return rows, (ids[-1] if ids else None)
+
+    @_operation
+    def reconcile_counters(self, label, after=None, batch_size=1000):
+        nodes, likes = (self.posts, self.likes_posts) if label == "Post" else (self.comments, self.likes_comments)
+        ids = self._ids_after(nodes, after, batch_size)
+        fixed = 0
+        for node_id in ids:
+            node = nodes[node_id]
+            counts = {"like_count": len(likes.sources(node_id))}
+            if label == "Post":
+                counts["comment_count"] = len(self.has_comment.targets(node_id))
+            if any(node.get(key) != value for key, value in counts.items()):
+                fixed += 1
+                node.update(counts)
+        return len(ids), fixed, (ids[-1] if ids else None)
+
+    @_operation
+    def rebuild_suggestions(self, size, after=None, batch_size=500, user_id=None):
+        if user_id is not None:
+            ids = [user_id] if user_id in self.users else []
+        else:
+            ids = self._ids_after(self.users, after, batch_size)
+        for uid in ids:
+            friend_ids = self._friend_ids(uid)
+            candidates = {}
+            for friend_id in friend_ids:
+                for candidate_id in self._friend_ids(friend_id):
+                    if candidate_id != uid and candidate_id not in friend_ids:
+                        candidates[candidate_id] = candidates.get(candidate_id, 0) + 1
+            self.suggestions[uid] = dict(self._best_suggestions(candidates, size))
+        return len(ids), (max(ids) if ids else None)
+
+    @_operation
+    def rebuild_timelines(self, fanout_max_friends, timeline_size, after=None, batch_size=500, user_id=None):
+        if user_id is not None:
+            ids = [user_id] if user_id in self.users else []
+        else:
+            ids = self._ids_after(self.users, after, batch_size)
+        for uid in ids:
+            post_ids = set()
+            for friend_id in self._friend_ids(uid):
+                if len(self._friend_ids(friend_id)) <= fanout_max_friends:
+                    post_ids |= self.created_posts.targets(friend_id)
+            keys = sorted((_sort_key(self.posts[post_id]) for post_id in post_ids), reverse=True)
+            self.timelines[uid] = [key[1] for key in keys[:timeline_size]]
+        return len(ids), (max(ids) if ids else None)
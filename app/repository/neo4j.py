@@ -0,0 +1,761 @@
+# Backend Neo4j (py2neo): chaque opération est une seule requête Cypher paramétrée,
+# exécutée dans une transaction auto-commit: un seul aller-retour Bolt et pas de nœud
+# orphelin en cas d'échec.
+from py2neo.errors import ClientError
+from app.repository.base import Repository, DuplicateEmailError
+from app.schema import ensure_schema, is_unique_violation
+
+# Clause MATCH de chaque liste paginée et variable du nœud renvoyé
+LIST_MATCHES = {
+    "users": ("MATCH (u:User)", "u"),
+    "posts": ("MATCH (p:Post)", "p"),
+    "comments": ("MATCH (c:Comment)", "c"),
+    "user_posts": ("MATCH (u:User {id: $user_id})-[:CREATED]->(p:Post)", "p"),
+    "user_comments": ("MATCH (u:User {id: $user_id})-[:CREATED]->(c:Comment)", "c"),
+    "user_friends": ("MATCH (:User {id: $user_id})-[:FRIENDS_WITH]-(f:User) WITH DISTINCT f", "f"),
+    "post_comments": ("MATCH (p:Post {id: $post_id})-[:HAS_COMMENT]->(c:Comment)", "c"),
+    # Posts de la timeline de l'utilisateur et posts des amis trop populaires pour le
+    # fan-out ($fanout_max_friends), dédupliqués dans p
+    "feed": ("""
+    MATCH (me:User {id: $user_id})
+    OPTIONAL MATCH (t:Timeline {user_id: $user_id})
+    CALL {
+        WITH t
+        UNWIND coalesce(t.post_ids, []) AS post_id
+        MATCH (p:Post {id: post_id})
+        RETURN p
+        UNION
+        WITH me
+        MATCH (me)-[:FRIENDS_WITH]-(f:User)-[:CREATED]->(p:Post)
+        WHERE COUNT { (f)-[:FRIENDS_WITH]-() } > $fanout_max_friends
+        RETURN p
+    }
+    WITH DISTINCT p""", "p"),
+}
+
+
+# Mise à jour des suggestions touchées par l'ajout ou le retrait de l'amitié (a, b), exécutée dans la
+# requête qui écrit la relation. Paires dont le nombre d'amis communs a changé: (b, x) pour x ami de a,
+# (a, y) pour y ami de b, et (a, b) elle-même. Leur score est recalculé puis écrit dans les deux sens
+# (relation SUGGESTED {mutual}), avant de tronquer les listes modifiées à $size
+SUGGESTIONS_UPDATE = """
+    CALL {
+        WITH a, b
+        MATCH (a)-[:FRIENDS_WITH]-(x:User) WHERE x <> b
+        RETURN b AS u, x AS c
+        UNION
+        WITH a, b
+        MATCH (b)-[:FRIENDS_WITH]-(y:User) WHERE y <> a
+        RETURN a AS u, y AS c
+        UNION
+        WITH a, b
+        RETURN a AS u, b AS c
+    }
+    WITH u, c,
+         EXISTS { (u)-[:FRIENDS_WITH]-(c) } AS friends,
+         COUNT { (u)-[:FRIENDS_WITH]-(:User)-[:FRIENDS_WITH]-(c) } AS mutual
+    UNWIND [[u, c], [c, u]] AS pair
+    WITH pair[0] AS s, pair[1] AS t, friends, mutual
+    OPTIONAL MATCH (s)-[old:SUGGESTED]->(t)
+    DELETE old
+    WITH DISTINCT s, t, friends, mutual
+    CALL {
+        WITH s, t, friends, mutual
+        WITH s, t, mutual WHERE NOT friends AND mutual > 0
+        CREATE (s)-[:SUGGESTED {mutual: mutual}]->(t)
+    }
+    WITH collect(DISTINCT s) AS sources
+    UNWIND sources AS s
+    CALL {
+        WITH s
+        MATCH (s)-[r:SUGGESTED]->(t:User)
+        WITH r ORDER BY r.mutual DESC, t.id SKIP $size
+        DELETE r
+    }
+    RETURN count(s) AS touched"""
+
+
+# Requêtes des étapes de suppression en cascade (CASCADE_STAGES): chacune supprime au plus
+# $batch_size éléments (l'étape node ne supprime le nœud que si les étapes précédentes n'ont plus rien à
+# supprimer) et renvoie count, deleted ([label, id] des nœuds supprimés) et touched
+# ([label, id, compteur, instant] des nœuds conservés dont un compteur a été décrémenté, avec l'instant
+# de création du like ou du commentaire retiré)
+CASCADE_QUERIES = {
+    ("User", "post_comments"): """
+    MATCH (:User {id: $id})-[:CREATED]->(:Post)-[:HAS_COMMENT]->(c:Comment)
+    WITH c, c.id AS comment_id LIMIT $batch_size
+    DETACH DELETE c
+    RETURN count(*) AS count, collect(['Comment', comment_id]) AS deleted, [] AS touched""",
+    ("User", "post_likes"): """
+    MATCH (:User {id: $id})-[:CREATED]->(:Post)<-[r:LIKES]-()
+    WITH r LIMIT $batch_size
+    DELETE r
+    RETURN count(*) AS count, [] AS deleted, [] AS touched""",
+    ("User", "posts"): """
+    MATCH (:User {id: $id})-[:CREATED]->(p:Post)
+    WITH p, p.id AS post_id LIMIT $batch_size
+    DETACH DELETE p
+    RETURN count(*) AS count, collect(['Post', post_id]) AS deleted, [] AS touched""",
+    # Commentaires laissés sur les posts des autres: le compteur de chaque post est décrémenté
+    ("User", "comments"): """
+    MATCH (:User {id: $id})-[:CREATED]->(c:Comment)
+    WITH c, c.id AS comment_id, coalesce(c.created_at, 0) AS created_at LIMIT $batch_size
+    OPTIONAL MATCH (p:Post)-[:HAS_COMMENT]->(c)
+    SET p.comment_count = CASE WHEN p.comment_count > 0 THEN p.comment_count - 1 ELSE 0 END
+    DETACH DELETE c
+    RETURN count(*) AS count, collect(['Comment', comment_id]) AS deleted,
+           collect(CASE WHEN p IS NOT NULL THEN ['Post', p.id, 'comment_count', created_at] END) AS touched""",
+    ("User", "likes"): """
+    MATCH (:User {id: $id})-[r:LIKES]->(t)
+    WITH r, t, coalesce(r.created_at, t.created_at, 0) AS liked_at LIMIT $batch_size
+    DELETE r
+    SET t.like_count = CASE WHEN t.like_count > 0 THEN t.like_count - 1 ELSE 0 END
+    RETURN count(*) AS count, [] AS deleted, collect([labels(t)[0], t.id, 'like_count', liked_at]) AS touched""",
+    # Amitiés et suggestions (dans les deux sens)
+    ("User", "relationships"): """
+    MATCH (:User {id: $id})-[r]-()
+    WITH r LIMIT $batch_size
+    DELETE r
+    RETURN count(*) AS count, [] AS deleted, [] AS touched""",
+    ("User", "node"): """
+    MATCH (u:User {id: $id}) WHERE NOT EXISTS { (u)--() }
+    OPTIONAL MATCH (t:Timeline {user_id: $id})
+    DETACH DELETE u, t
+    RETURN count(*) AS count, collect(['User', $id]) AS deleted, [] AS touched""",
+    ("Post", "comments"): """
+    MATCH (:Post {id: $id})-[:HAS_COMMENT]->(c:Comment)
+    WITH c, c.id AS comment_id LIMIT $batch_size
+    DETACH DELETE c
+    RETURN count(*) AS count, collect(['Comment', comment_id]) AS deleted, [] AS touched""",
+    ("Post", "likes"): """
+    MATCH (:Post {id: $id})<-[r:LIKES]-()
+    WITH r LIMIT $batch_size
+    DELETE r
+    RETURN count(*) AS count, [] AS deleted, [] AS touched""",
+    ("Post", "node"): """
+    MATCH (p:Post {id: $id}) WHERE NOT EXISTS { (p)-[:HAS_COMMENT]->() } AND NOT EXISTS { (p)<-[:LIKES]-() }
+    DETACH DELETE p
+    RETURN count(*) AS count, collect(['Post', $id]) AS deleted, [] AS touched""",
+    ("Comment", "likes"): """
+    MATCH (:Comment {id: $id})<-[r:LIKES]-()
+    WITH r LIMIT $batch_size
+    DELETE r
+    RETURN count(*) AS count, [] AS deleted, [] AS touched""",
+    # Un commentaire dont le post a été supprimé n'a plus de compteur à décrémenter
+    ("Comment", "node"): """
+    MATCH (c:Comment {id: $id}) WHERE NOT EXISTS { (c)<-[:LIKES]-() }
+    OPTIONAL MATCH (p:Post)-[:HAS_COMMENT]->(c)
+    WITH c, p, coalesce(c.created_at, 0) AS created_at
+    SET p.comment_count = CASE WHEN p.comment_count > 0 THEN p.comment_count - 1 ELSE 0 END
+    DETACH DELETE c
+    RETURN count(*) AS count, collect(['Comment', $id]) AS deleted,
+           collect(CASE WHEN p IS NOT NULL THEN ['Post', p.id, 'comment_count', created_at] END) AS touched""",
+}
+
+# Exports par lots: nœud parcouru par id et lignes produites pour chacun d'eux
+EXPORT_QUERIES = {
+    "users": ("User", "[u {.id, .name, .email, .created_at}]"),
+    "posts": ("Post", """COLLECT {
+        OPTIONAL MATCH (a:User)-[:CREATED]->(u)
+        RETURN {id: u.id, user_id: a.id, title: u.title, content: u.content, created_at: u.created_at}
+    }"""),
+    "comments": ("Comment", """COLLECT {
+        OPTIONAL MATCH (a:User)-[:CREATED]->(u)
+        OPTIONAL MATCH (p:Post)-[:HAS_COMMENT]->(u)
+        RETURN {id: u.id, user_id: a.id, post_id: p.id, content: u.content, created_at: u.created_at}
+    }"""),
+    "friendships": ("User", """COLLECT {
+        MATCH (u)-[:FRIENDS_WITH]-(f:User) WHERE u.id < f.id
+        RETURN DISTINCT {user_id: u.id, friend_id: f.id}
+    }"""),
+    "likes": ("User", """COLLECT {
+        MATCH (u)-[r:LIKES]->(t) WHERE t:Post OR t:Comment
+        RETURN {user_id: u.id, post_id: CASE WHEN t:Post THEN t.id END,
+                comment_id: CASE WHEN t:Comment THEN t.id END, created_at: r.created_at}
+    }"""),
+}
+
+# Taille de chaque étape de suppression en cascade, par sous-requêtes COUNT
+CASCADE_SIZES = {
+    "User": """
+    MATCH (u:User {id: $id})
+    RETURN {
+        post_comments: COUNT { (u)-[:CREATED]->(:Post)-[:HAS_COMMENT]->(:Comment) },
+        post_likes: COUNT { (u)-[:CREATED]->(:Post)<-[:LIKES]-() },
+        posts: COUNT { (u)-[:CREATED]->(:Post) },
+        comments: COUNT { (u)-[:CREATED]->(:Comment) },
+        likes: COUNT { (u)-[:LIKES]->() },
+        relationships: COUNT { (u)-[r]-() WHERE NOT type(r) IN ['CREATED', 'LIKES'] }
+    }""",
+    "Post": """
+    MATCH (p:Post {id: $id})
+    RETURN {
+        comments: COUNT { (p)-[:HAS_COMMENT]->(:Comment) },
+        likes: COUNT { (p)<-[:LIKES]-() }
+    }""",
+    "Comment": """
+    MATCH (c:Comment {id: $id})
+    OPTIONAL MATCH (p:Post)-[:HAS_COMMENT]->(c)
+    RETURN {
+        likes: COUNT { (c)<-[:LIKES]-() },
+        parent_id: p.id
+    }""",
+}
+
+
+def build_page_query(match, var, after, limit):
+    """ Construit la requête keyset: tri par created_at puis id décroissants,
+    filtrage après le curseur et LIMIT """
+    query = match
+    if after is not None:
+        query += f"""
+    WHERE {var}.created_at < $after_ts
+       OR ({var}.created_at = $after_ts AND {var}.id < $after_id)"""
+    query += f"""
+    RETURN {var}
+    ORDER BY {var}.created_at DESC, {var}.id DESC"""
+    if limit is not None:
+        query += "\n    LIMIT $limit"
+    return query
+
+
+def close_cursor(cursor):
+    """ Ferme un curseur py2neo abandonné avant la fin. Sans close() (py2neo 2021.2), les enregistrements
+    restants, déjà demandés au serveur (PULL), sont lus et ignorés: la connexion Bolt est rendue au pool """
+    close = getattr(cursor, "close", None)
+    if close is not None:
+        close()
+        return
+    while cursor.forward(1000):
+        pass
+
+
+class Neo4jRepository(Repository):
+    """Stockage du graphe dans Neo4j, via un py2neo.Graph (ou CountingGraph)"""
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def _single(self, query, **params):
+        """Exécute la requête et renvoie le premier nœud sous forme de dict (ou None)"""
+        node = self.graph.run(query, **params).evaluate()
+        return dict(node) if node is not None else None
+
+    def _count(self, query, **params):
+        """Exécute la requête et renvoie le compteur renvoyé en première colonne"""
+        return self.graph.run(query, **params).evaluate() or 0
+
+    def _record(self, query, **params):
+        """Exécute la requête et renvoie le premier enregistrement (ou None)"""
+        cursor = self.graph.run(query, **params)
+        return cursor.current if cursor.forward() else None
+
+    def _unwind(self, query, rows):
+        """ Exécute une requête UNWIND sur un lot de lignes portant chacune un index "i".
+        Renvoie l'ensemble des index effectivement écrits """
+        return set(self.graph.run(query, rows=rows).evaluate() or [])
+
+    # Schéma et listes
+
+    def ping(self):
+        return self.graph.run("RETURN 1").evaluate() == 1
+
+    def ensure_schema(self):
+        return ensure_schema(self.graph)
+
+    def list_page(self, kind, after=None, limit=None, **scope):
+        match, var = LIST_MATCHES[kind]
+        params = dict(scope)
+        if after is not None:
+            params["after_ts"], params["after_id"] = after
+        if limit is not None:
+            params["limit"] = limit
+        cursor = self.graph.run(build_page_query(match, var, after, limit), **params)
+        return self._page_rows(cursor, var)
+
+    @staticmethod
+    def _page_rows(cursor, var):
+        """ Enregistrements consommés au fil de l'eau depuis le curseur py2neo, fermé quand le
+        générateur l'est (page complète, client déconnecté) """
+        try:
+            yield from (dict(record[var]) for record in cursor)
+        finally:
+            close_cursor(cursor)
+
+    def get_many(self, label, ids):
+        if label not in ("User", "Post", "Comment"):
+            raise ValueError(f"Unknown label {label!r}")
+        cursor = self.graph.run(f"MATCH (n:{label}) WHERE n.id IN $ids RETURN n", ids=list(ids))
+        return {record["n"]["id"]: dict(record["n"]) for record in cursor}
+
+    # Utilisateurs
+
+    def create_user(self, props):
+        # L'unicité de l'email est garantie par la contrainte user_email_unique
+        try:
+            return self._single("CREATE (u:User $props) RETURN u", props=props)
+        except ClientError as e:
+            if is_unique_violation(e, "email"):
+                raise DuplicateEmailError(props.get("email"))
+            raise
+
+    def get_user(self, user_id):
+        return self._single("MATCH (u:User {id: $id}) RETURN u", id=user_id)
+
+    def update_user(self, user_id, props):
+        # Un email déjà utilisé par un autre utilisateur viole la contrainte user_email_unique
+        try:
+            return self._single("MATCH (u:User {id: $id}) SET u += $props RETURN u", id=user_id, props=props)
+        except ClientError as e:
+            if is_unique_violation(e, "email"):
+                raise DuplicateEmailError(props.get("email"))
+            raise
+
+    def add_friend(self, user_id, friend_id, size):
+        # MERGE ne crée la relation que si elle n'existe pas déjà (dans un sens ou l'autre);
+        # les suggestions ne sont mises à jour que pour une relation créée
+        query = f"""
+        MATCH (a:User {{id: $user_id}}), (b:User {{id: $friend_id}})
+        WITH a, b, NOT EXISTS {{ (a)-[:FRIENDS_WITH]-(b) }} AS created
+        MERGE (a)-[:FRIENDS_WITH]-(b)
+        WITH a, b, created
+        CALL {{
+            WITH a, b, created
+            WITH a, b WHERE created
+            {SUGGESTIONS_UPDATE}
+        }}
+        RETURN created
+        """
+        record = self._record(query, user_id=user_id, friend_id=friend_id, size=size)
+        if record is None:
+            return False, False
+        return True, record['created']
+
+    def remove_friend(self, user_id, friend_id, size):
+        query = f"""
+        MATCH (a:User {{id: $user_id}})-[r:FRIENDS_WITH]-(b:User {{id: $friend_id}})
+        WITH a, b, r
+        LIMIT 1
+        DELETE r
+        WITH a, b
+        CALL {{
+            WITH a, b
+            {SUGGESTIONS_UPDATE}
+        }}
+        RETURN count(*) AS deleted
+        """
+        return self._count(query, user_id=user_id, friend_id=friend_id, size=size) > 0
+
+    def are_friends(self, user_id, friend_id):
+        query = """
+        MATCH (u:User {id: $user_id})-[r:FRIENDS_WITH]-(f:User {id: $friend_id})
+        RETURN COUNT(r) > 0 as are_friends
+        """
+        return bool(self.graph.run(query, user_id=user_id, friend_id=friend_id).evaluate())
+
+    def list_friends(self, user_id):
+        query = """
+        MATCH (u:User {id: $user_id})-[:FRIENDS_WITH]-(f:User)
+        RETURN f
+        """
+        return [dict(record['f']) for record in self.graph.run(query, user_id=user_id)]
+
+    def count_friends(self, user_id):
+        query = """
+        MATCH (u:User {id: $user_id})
+        RETURN COUNT { (u)-[:FRIENDS_WITH]-(:User) }
+        """
+        return self._count(query, user_id=user_id)
+
+    def mutual_friends(self, user_id, other_id):
+        query = """
+        MATCH (u1:User {id: $user_id})-[:FRIENDS_WITH]-(mutual:User)-[:FRIENDS_WITH]-(u2:User {id: $other_id})
+        RETURN mutual
+        """
+        return [dict(record['mutual']) for record in self.graph.run(query, user_id=user_id, other_id=other_id)]
+
+    def list_friendships(self):
+        query = """
+        MATCH (u:User)-[:FRIENDS_WITH]->(f:User)
+        RETURN u.id AS user_id, f.id AS friend_id
+        """
+        # Les paires sont consommées au fil de l'eau depuis le curseur py2neo
+        return ((record['user_id'], record['friend_id']) for record in self.graph.run(query))
+
+    def friend_path(self, user_id, other_id, max_depth):
+        # La borne d'un chemin de longueur variable ne peut pas être un paramètre
+        query = f"""
+        MATCH (u:User {{id: $user_id}}), (o:User {{id: $other_id}})
+        MATCH p = shortestPath((u)-[:FRIENDS_WITH*..{int(max_depth)}]-(o))
+        RETURN [n IN nodes(p) | n.id]
+        """
+        if user_id == other_id:
+            return [user_id] if self.get_user(user_id) else None
+        return self.graph.run(query, user_id=user_id, other_id=other_id).evaluate()
+
+    def list_suggestions(self, user_id, limit):
+        query = """
+        MATCH (:User {id: $user_id})-[s:SUGGESTED]->(c:User)
+        RETURN c, s.mutual AS mutual
+        ORDER BY mutual DESC, c.id
+        LIMIT $limit
+        """
+        return [dict(record['c'], mutual_friends=record['mutual'])
+                for record in self.graph.run(query, user_id=user_id, limit=limit)]
+
+    def bulk_create_users(self, rows):
+        query = """
+        UNWIND $rows AS row
+        MERGE (u:User {email: row.email})
+        ON CREATE SET u.id = row.id, u.name = row.name, u.created_at = row.created_at
+        WITH row, u WHERE u.id = row.id
+        RETURN collect(row.i)
+        """
+        return self._unwind(query, rows)
+
+    def bulk_add_friends(self, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (u:User {id: row.user_id}), (f:User {id: row.friend_id})
+        MERGE (u)-[:FRIENDS_WITH]-(f)
+        RETURN collect(row.i)
+        """
+        return self._unwind(query, rows)
+
+    def bulk_add_likes(self, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (u:User {id: row.user_id})
+        CALL {
+            WITH row
+            MATCH (t:Post {id: row.post_id}) RETURN t
+            UNION
+            WITH row
+            MATCH (t:Comment {id: row.comment_id}) RETURN t
+        }
+        MERGE (u)-[:LIKES]->(t)
+        ON CREATE SET t.like_count = coalesce(t.like_count, 0) + 1
+        RETURN collect(row.i)
+        """
+        return self._unwind(query, rows)
+
+    def bulk_set_likes(self, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (u:User {id: row.user_id})
+        CALL {
+            WITH row
+            MATCH (t:Post {id: row.post_id}) RETURN t
+            UNION
+            WITH row
+            MATCH (t:Comment {id: row.comment_id}) RETURN t
+        }
+        CALL {
+            WITH u, t, row
+            WITH u, t, row WHERE row.liked AND NOT EXISTS { (u)-[:LIKES]->(t) }
+            CREATE (u)-[:LIKES {created_at: row.created_at}]->(t)
+            SET t.like_count = coalesce(t.like_count, 0) + 1
+            RETURN row.i AS changed, null AS liked_at
+            UNION
+            WITH u, t, row
+            WITH u, t, row WHERE NOT row.liked
+            MATCH (u)-[r:LIKES]->(t)
+            WITH t, r, row, coalesce(r.created_at, t.created_at, 0) AS liked_at
+            DELETE r
+            SET t.like_count = CASE WHEN t.like_count > 0 THEN t.like_count - 1 ELSE 0 END
+            RETURN row.i AS changed, liked_at
+        }
+        RETURN collect([changed, liked_at])
+        """
+        return dict(self.graph.run(query, rows=rows).evaluate() or [])
+
+    # Posts
+
+    def create_post(self, user_id, props, fanout_max_friends, timeline_size):
+        # Le post est ajouté en tête de la timeline de chaque ami (fan-out à l'écriture),
+        # sauf si l'auteur a trop d'amis: ses posts sont alors lus à la demande dans le fil
+        query = """
+        MATCH (u:User {id: $user_id})
+        CREATE (u)-[:CREATED]->(p:Post $props)
+        WITH u, p
+        CALL {
+            WITH u, p
+            MATCH (u)-[:FRIENDS_WITH]-(f:User)
+            WITH p, collect(DISTINCT f.id) AS friend_ids
+            WHERE size(friend_ids) <= $fanout_max_friends
+            UNWIND friend_ids AS friend_id
+            MERGE (t:Timeline {user_id: friend_id})
+            SET t.post_ids = ([p.id] + coalesce(t.post_ids, []))[0..$timeline_size]
+        }
+        RETURN p
+        """
+        return self._single(query, user_id=user_id, props=props,
+                            fanout_max_friends=fanout_max_friends,
+                            timeline_size=timeline_size)
+
+    def get_post(self, post_id):
+        return self._single("MATCH (p:Post {id: $id}) RETURN p", id=post_id)
+
+    def get_post_detail(self, post_id, comments_after=None, comments_limit=None):
+        # Auteurs par compréhension de motif et page de commentaires triée par sous-requête COLLECT:
+        # le tout en un seul aller-retour
+        query = """
+        MATCH (p:Post {id: $id})
+        RETURN p AS post,
+               [(author:User)-[:CREATED]->(p) | author {.id, .name}][0] AS author,
+               COLLECT {
+                   MATCH (p)-[:HAS_COMMENT]->(c:Comment)
+                   WHERE $after_ts IS NULL OR c.created_at < $after_ts
+                      OR (c.created_at = $after_ts AND c.id < $after_id)
+                   WITH c
+                   ORDER BY c.created_at DESC, c.id DESC
+                   LIMIT $limit
+                   RETURN c {.*, author: [(u:User)-[:CREATED]->(c) | u {.id, .name}][0]}
+               } AS comments
+        """
+        after_ts, after_id = comments_after if comments_after is not None else (None, None)
+        record = self._record(query, id=post_id, after_ts=after_ts, after_id=after_id,
+                              limit=comments_limit if comments_limit is not None else 2 ** 31 - 1)
+        if record is None:
+            return None
+        return {"post": dict(record["post"]), "author": record["author"], "comments": list(record["comments"])}
+
+    def update_post(self, post_id, props):
+        return self._single("MATCH (p:Post {id: $id}) SET p += $props RETURN p", id=post_id, props=props)
+
+    def add_post_like(self, user_id, post_id):
+        # Like idempotent: le compteur n'est incrémenté que si la relation est créée
+        query = """
+        MATCH (u:User {id: $user_id}), (p:Post {id: $post_id})
+        WITH u, p, NOT EXISTS { (u)-[:LIKES]->(p) } AS created
+        MERGE (u)-[r:LIKES]->(p)
+        ON CREATE SET p.like_count = coalesce(p.like_count, 0) + 1, r.created_at = timestamp() / 1000
+        RETURN created
+        """
+        record = self._record(query, user_id=user_id, post_id=post_id)
+        if record is None:
+            return False, False
+        return True, record['created']
+
+    def remove_post_like(self, user_id, post_id):
+        query = """
+        MATCH (u:User {id: $user_id})-[r:LIKES]->(p:Post {id: $post_id})
+        WITH r, p, coalesce(r.created_at, p.created_at, 0) AS liked_at
+        DELETE r
+        SET p.like_count = CASE WHEN p.like_count > 0 THEN p.like_count - 1 ELSE 0 END
+        RETURN liked_at
+        """
+        record = self._record(query, user_id=user_id, post_id=post_id)
+        return (True, record["liked_at"]) if record is not None else (False, None)
+
+    def bulk_create_posts(self, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (u:User {id: row.user_id})
+        MERGE (p:Post {id: row.id})
+        ON CREATE SET p.title = row.title, p.content = row.content, p.created_at = row.created_at,
+                      p.like_count = 0, p.comment_count = 0
+        MERGE (u)-[:CREATED]->(p)
+        RETURN collect(row.i)
+        """
+        return self._unwind(query, rows)
+
+    # Commentaires
+
+    def create_comment(self, user_id, post_id, props):
+        # Le commentaire et ses relations avec le créateur et le post sont créés ensemble
+        query = """
+        MATCH (u:User {id: $user_id}), (p:Post {id: $post_id})
+        CREATE (c:Comment $props),
+               (u)-[:CREATED]->(c),
+               (p)-[:HAS_COMMENT]->(c)
+        SET p.comment_count = coalesce(p.comment_count, 0) + 1
+        RETURN c
+        """
+        return self._single(query, user_id=user_id, post_id=post_id, props=props)
+
+    def get_comment(self, comment_id):
+        return self._single("MATCH (c:Comment {id: $id}) RETURN c", id=comment_id)
+
+    def update_comment(self, comment_id, props):
+        return self._single("MATCH (c:Comment {id: $id}) SET c += $props RETURN c", id=comment_id, props=props)
+
+    def add_comment_like(self, user_id, comment_id):
+        query = """
+        MATCH (u:User {id: $user_id}), (c:Comment {id: $comment_id})
+        WITH u, c, NOT EXISTS { (u)-[:LIKES]->(c) } AS created
+        MERGE (u)-[r:LIKES]->(c)
+        ON CREATE SET c.like_count = coalesce(c.like_count, 0) + 1, r.created_at = timestamp() / 1000
+        RETURN created
+        """
+        record = self._record(query, user_id=user_id, comment_id=comment_id)
+        if record is None:
+            return False, False
+        return True, record['created']
+
+    def remove_comment_like(self, user_id, comment_id):
+        query = """
+        MATCH (u:User {id: $user_id})-[r:LIKES]->(c:Comment {id: $comment_id})
+        DELETE r
+        SET c.like_count = CASE WHEN c.like_count > 0 THEN c.like_count - 1 ELSE 0 END
+        RETURN count(r)
+        """
+        return self._count(query, user_id=user_id, comment_id=comment_id) > 0
+
+    def has_like(self, user_id, label, target_id):
+        if label not in ("Post", "Comment"):
+            raise ValueError(f"Unknown label {label!r}")
+        query = f"""
+        MATCH (:User {{id: $user_id}})-[r:LIKES]->(:{label} {{id: $target_id}})
+        RETURN count(r) > 0
+        """
+        return bool(self.graph.run(query, user_id=user_id, target_id=target_id).evaluate())
+
+    def bulk_create_comments(self, rows):
+        query = """
+        UNWIND $rows AS row
+        MATCH (u:User {id: row.user_id}), (p:Post {id: row.post_id})
+        MERGE (c:Comment {id: row.id})
+        ON CREATE SET c.content = row.content, c.created_at = row.created_at, c.like_count = 0
+        MERGE (u)-[:CREATED]->(c)
+        MERGE (p)-[:HAS_COMMENT]->(c)
+        ON CREATE SET p.comment_count = coalesce(p.comment_count, 0) + 1
+        RETURN collect(row.i)
+        """
+        return self._unwind(query, rows)
+
+    # Suppressions en cascade
+
+    def cascade_size(self, label, node_id):
+        size = self.graph.run(CASCADE_SIZES[label], id=node_id).evaluate()
+        return dict(size) if size is not None else None
+
+    def delete_batch(self, label, node_id, stage, batch_size):
+        # Chaque lot est une transaction auto-commit bornée, à la manière de CALL { } IN TRANSACTIONS
+        record = self._record(CASCADE_QUERIES[(label, stage)], id=node_id, batch_size=batch_size)
+        return {"count": record["count"],
+                "deleted": [tuple(item) for item in record["deleted"]],
+                "touched": [tuple(item) for item in record["touched"]]}
+
+    # Jobs
+
+    def save_job(self, props):
+        self.graph.run("MERGE (j:Job {id: $props.id}) SET j += $props", props=props)
+
+    def get_job(self, job_id):
+        return self._single("MATCH (j:Job {id: $id}) RETURN j", id=job_id)
+
+    def prune_jobs(self, before):
+        query = """
+        MATCH (j:Job) WHERE j.finished_at < $before
+        DELETE j
+        RETURN count(j)
+        """
+        return self._count(query, before=before)
+
+    # Maintenance
+
+    def list_post_activity(self, since, after=None, batch_size=500):
+        # Les likes importés en masse n'ont pas d'horodatage: la date du post les remplace
+        query = ("MATCH (p:Post)" if after is None else "MATCH (p:Post) WHERE p.id > $after") + """
+        WITH p ORDER BY p.id LIMIT $batch_size
+        RETURN p.id AS id,
+               COLLECT {
+                   MATCH (:User)-[r:LIKES]->(p)
+                   WITH coalesce(r.created_at, p.created_at) AS at WHERE at >= $since
+                   RETURN at
+               } AS likes,
+               COLLECT {
+                   MATCH (p)-[:HAS_COMMENT]->(c:Comment) WHERE c.created_at >= $since
+                   RETURN c.created_at
+               } AS comments
+        """
+        return [{"id": record['id'], "likes": record['likes'], "comments": record['comments']}
+                for record in self.graph.run(query, since=since, after=after, batch_size=batch_size)]
+
+    def export_page(self, kind, after=None, batch_size=1000):
+        label, rows = EXPORT_QUERIES[kind]
+        query = (f"MATCH (u:{label})" if after is None else f"MATCH (u:{label}) WHERE u.id > $after") + f"""
+        WITH u ORDER BY u.id LIMIT $batch_size
+        RETURN u.id AS id, {rows} AS rows
+        """
+        page, last_id = [], None
+        for record in self.graph.run(query, after=after, batch_size=batch_size):
+            page.extend(dict(row) for row in record['rows'])
+            last_id = record['id']
+        return page, last_id
+
+    def reconcile_counters(self, label, after=None, batch_size=1000):
+        if label == "Post":
+            counts = """
+        WITH n, COUNT { (:User)-[:LIKES]->(n) } AS likes, COUNT { (n)-[:HAS_COMMENT]->(:Comment) } AS comments
+        WITH n, likes, comments,
+             coalesce(n.like_count, -1) <> likes OR coalesce(n.comment_count, -1) <> comments AS drifted
+        SET n.like_count = likes, n.comment_count = comments"""
+        else:
+            counts = """
+        WITH n, COUNT { (:User)-[:LIKES]->(n) } AS likes
+        WITH n, likes, coalesce(n.like_count, -1) <> likes AS drifted
+        SET n.like_count = likes"""
+        query = (f"MATCH (n:{label})" if after is None else f"MATCH (n:{label}) WHERE n.id > $after") + """
+        WITH n ORDER BY n.id LIMIT $batch_size""" + counts + """
+        RETURN count(n) AS checked, sum(CASE WHEN drifted THEN 1 ELSE 0 END) AS fixed, max(n.id) AS last_id
+        """
+        record = self._record(query, after=after, batch_size=batch_size)
+        if record is None:
+            return 0, 0, None
+        return record['checked'], record['fixed'], record['last_id']
+
+    def rebuild_suggestions(self, size, after=None, batch_size=500, user_id=None):
+        if user_id is not None:
+            users = "MATCH (u:User {id: $user_id})"
+        elif after is not None:
+            users = "MATCH (u:User) WHERE u.id > $after"
+        else:
+            users = "MATCH (u:User)"
+        query = users + """
+        WITH u ORDER BY u.id LIMIT $batch_size
+        CALL {
+            WITH u
+            OPTIONAL MATCH (u)-[old:SUGGESTED]->()
+            DELETE old
+        }
+        CALL {
+            WITH u
+            MATCH (u)-[:FRIENDS_WITH]-(:User)-[:FRIENDS_WITH]-(c:User)
+            WHERE c <> u AND NOT EXISTS { (u)-[:FRIENDS_WITH]-(c) }
+            WITH c, count(*) AS mutual ORDER BY mutual DESC, c.id LIMIT $size
+            CREATE (u)-[:SUGGESTED {mutual: mutual}]->(c)
+        }
+        RETURN count(u) AS rebuilt, max(u.id) AS last_id
+        """
+        record = self._record(query, after=after, batch_size=batch_size, user_id=user_id, size=size)
+        if record is None:
+            return 0, None
+        return record['rebuilt'], record['last_id']
+
+    def rebuild_timelines(self, fanout_max_friends, timeline_size, after=None, batch_size=500, user_id=None):
+        if user_id is not None:
+            users = "MATCH (u:User {id: $user_id})"
+        elif after is not None:
+            users = "MATCH (u:User) WHERE u.id > $after"
+        else:
+            users = "MATCH (u:User)"
+        query = users + """
+        WITH u ORDER BY u.id LIMIT $batch_size
+        CALL {
+            WITH u
+            OPTIONAL MATCH (u)-[:FRIENDS_WITH]-(f:User)-[:CREATED]->(p:Post)
+            WHERE COUNT { (f)-[:FRIENDS_WITH]-() } <= $fanout_max_friends
+            WITH DISTINCT p ORDER BY p.created_at DESC, p.id DESC LIMIT $timeline_size
+            RETURN collect(p.id) AS post_ids
+        }
+        MERGE (t:Timeline {user_id: u.id})
+        SET t.post_ids = post_ids
+        RETURN count(u) AS rebuilt, max(u.id) AS last_id
+        """
+        record = self._record(query, after=after, batch_size=batch_size, user_id=user_id,
+                              fanout_max_friends=fanout_max_friends, timeline_size=timeline_size)
+        if record is None:
+            return 0, None
+        return record['rebuilt'], record['last_id']
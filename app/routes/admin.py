@@ -0,0 +1,102 @@
+import threading
+import time
+from flask import Blueprint, jsonify, Response, current_app
+from app import repo
+from app.cache import entity_cache
+from app.friendships import friend_graph
+from app.search import search_index
+from app.trending import trending
+from app.like_buffer import like_buffer
+from app.changelog import changelog
+from app.admission import admission_control
+from app.profile import profile_loader
+from app.metrics import registry
+
+# Création d'un Blueprint Flask pour les routes d'exploitation (statistiques, supervision)
+admin_bp = Blueprint('admin', __name__)
+
+# Protège le dernier résultat de la sonde de disponibilité, partagé par les threads du processus
+_readiness_lock = threading.Lock()
+
+# Route pour consulter les statistiques du cache des entités (hits, misses, évictions)
+@admin_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    return jsonify(entity_cache.stats()), 200
+
+
+# Route pour consulter l'état de l'instantané des amitiés (taille, chargement, modifications en attente)
+@admin_bp.route('/friend-graph/stats', methods=['GET'])
+def friend_graph_stats():
+    return jsonify(friend_graph.stats()), 200
+
+
+# Route pour consulter l'état de l'index de recherche (documents et termes indexés)
+@admin_bp.route('/search/stats', methods=['GET'])
+def search_stats():
+    return jsonify(search_index.stats()), 200
+
+
+# Route pour consulter l'état des scores de tendance
+@admin_bp.route('/trending/stats', methods=['GET'])
+def trending_stats():
+    return jsonify(trending.stats()), 200
+
+
+# Route pour consulter l'état du tampon des likes différés (en attente, écrits, échecs)
+@admin_bp.route('/likes/stats', methods=['GET'])
+def like_buffer_stats():
+    return jsonify(like_buffer.stats()), 200
+
+
+# Route pour consulter l'état du journal des modifications (événements ajoutés et appliqués, offset de fin)
+@admin_bp.route('/changes/stats', methods=['GET'])
+def changelog_stats():
+    return jsonify(changelog.stats()), 200
+
+
+# Route pour consulter le contrôle d'admission (requêtes en cours, en attente, rejetées par classe de routes)
+@admin_bp.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    return jsonify(admission_control.stats()), 200
+
+
+# Route pour consulter le pool des profils agrégés (sections expirées ou en échec)
+@admin_bp.route('/profile/stats', methods=['GET'])
+def profile_stats():
+    return jsonify(profile_loader.stats()), 200
+
+
+# Route pour exporter les métriques (latence des routes et des requêtes au stockage) au format Prometheus
+@admin_bp.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Route de vivacité: le processus répond, sans interroger la base
+@admin_bp.route('/health/live', methods=['GET'])
+def liveness():
+    return jsonify({"status": "alive"}), 200
+
+
+# Route de disponibilité: le stockage répond. Le résultat est réutilisé pendant
+# READINESS_CACHE_SECONDS pour que les sondes fréquentes n'interrogent pas la base à chaque appel
+@admin_bp.route('/health/ready', methods=['GET'])
+def readiness():
+    now = time.monotonic()
+    with _readiness_lock:
+        # Instant du dernier contrôle et erreur éventuelle, propres à l'application
+        state = current_app.extensions.setdefault("readiness", {"checked_at": None, "error": None})
+        checked_at = state["checked_at"]
+        if checked_at is None or now - checked_at >= current_app.config["READINESS_CACHE_SECONDS"]:
+            try:
+                repo.ping()
+                state["error"] = None
+            except Exception as e:
+                state["error"] = str(e) or type(e).__name__
+            state["checked_at"] = checked_at = now
+        error = state["error"]
+
+    body = {"backend": current_app.config["GRAPH_BACKEND"], "checked_seconds_ago": round(now - checked_at, 3)}
+    if error:
+        return jsonify(dict(body, status="unavailable", error=error)), 503
+    return jsonify(dict(body, status="ready")), 200
@@ -0,0 +1,38 @@
+from flask import Blueprint, request, jsonify, current_app
+from app import repo
+from app.bulk import BULK_KINDS, MAX_BATCH_SIZE, iter_jsonl, load
+from app.admission import admission
+
+# Création d'un Blueprint Flask pour les routes d'import en masse
+bulk_bp = Blueprint('bulk', __name__)
+
+# Route pour importer en masse des utilisateurs, posts, commentaires, amitiés ou likes
+# Corps: tableau JSON, ou une ligne JSON par élément (Content-Type: application/x-ndjson)
+@bulk_bp.route('/bulk/<string:kind>', methods=['POST'])
+@admission("heavy")
+def bulk_import(kind):
+    if kind not in BULK_KINDS:
+        return jsonify({"error": "Unknown bulk type, expected one of: " + ", ".join(BULK_KINDS)}), 404
+
+    batch_size = request.args.get('batch_size', current_app.config["BULK_BATCH_SIZE"])
+    try:
+        batch_size = int(batch_size)
+    except ValueError:
+        return jsonify({"error": "batch_size must be an integer"}), 400
+    if batch_size < 1 or batch_size > MAX_BATCH_SIZE:
+        return jsonify({"error": f"batch_size must be between 1 and {MAX_BATCH_SIZE}"}), 400
+
+    if request.mimetype == 'application/x-ndjson':
+        # Le corps est lu ligne par ligne, sans être chargé entièrement en mémoire
+        rows = iter_jsonl(request.stream)
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, list):
+            return jsonify({"error": "Body must be a JSON array or NDJSON"}), 400
+        rows = enumerate(data)
+
+    try:
+        report = load(repo, kind, rows, batch_size=batch_size)
+        return jsonify(report), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,32 @@
+# Importer les modules nécessaires
+from flask import Blueprint, request, jsonify
+from app.changelog import changelog, ChangelogTruncated
+
+# Création d'un Blueprint Flask pour la lecture du journal des modifications
+changes_bp = Blueprint('changes', __name__)
+
+# Nombre d'événements par défaut et maximal d'une page du journal
+DEFAULT_CHANGES_LIMIT = 100
+MAX_CHANGES_LIMIT = 1000
+
+# Route pour lire le journal des modifications par offset: ?offset=&limit= (offset 0 = plus ancien
+# événement conservé; la page suivante commence à next_offset)
+@changes_bp.route('/changes', methods=['GET'])
+def list_changes():
+    if not changelog.enabled:
+        return jsonify({"error": "Change log is disabled"}), 404
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', DEFAULT_CHANGES_LIMIT))
+    except ValueError:
+        return jsonify({"error": "offset and limit must be integers"}), 400
+    if offset < 0:
+        return jsonify({"error": "offset must be positive"}), 400
+    if limit < 1 or limit > MAX_CHANGES_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_CHANGES_LIMIT}"}), 400
+    try:
+        events, next_offset = changelog.read(offset, limit)
+    except ChangelogTruncated:
+        # Les événements demandés ont été supprimés par la rotation: le consommateur doit se resynchroniser
+        return jsonify({"error": "Offset is older than the oldest retained change"}), 410
+    return jsonify({"events": events, "next_offset": next_offset}), 200
@@ -1,36 +1,52 @@
 from flask import Blueprint, request, jsonify
-from app import graph
+from app import repo
+from app.like_buffer import like_buffer
 from app.models import Comment
+from app.pagination import paginated_list
+from app.conditional import conditional
+from app.routes.jobs import job_accepted
+from app.validation import validate_comment_payload, validate_batch_ids
+from app.admission import admission
 
 # Création d'un Blueprint Flask pour les routes des commentaires
 comments_bp = Blueprint('comments', __name__)
 
-# Route pour récupérer tous les commentaires
+# Route pour récupérer les commentaires (paginée: ?limit=&after=, streaming: ?stream=ndjson|json)
 @comments_bp.route('/comments', methods=['GET'])
+@conditional("Comment")
 def get_comments():
-    query = "MATCH (c:Comment) RETURN c"
-    result = graph.run(query).data()
-    return jsonify([dict(comment['c']) for comment in result]), 200
+    return paginated_list(repo, "comments")
 
 
 # Route pour récupérer un commentaire spécifique par son ID
 @comments_bp.route('/comments/<string:comment_id>', methods=['GET'])
+@conditional("Comment")
 def get_comment(comment_id):
-    comment = Comment.find_by_id(graph, comment_id)
+    comment = Comment.find_by_id(repo, comment_id)
     if not comment:
         return jsonify({"error": "Comment not found"}), 404
     return jsonify(dict(comment)), 200
 
 
+# Route pour récupérer plusieurs commentaires par leurs ids en une requête: corps {"ids": [...]}.
+# Les résultats suivent l'ordre des ids (null pour un id inexistant, listé dans "missing")
+@comments_bp.route('/comments:batchGet', methods=['POST'])
+@admission("read")
+def batch_get_comments():
+    data = request.get_json(silent=True)
+    error = validate_batch_ids(data)
+    if error:
+        return jsonify({"error": error}), 400
+    results = Comment.find_many(repo, data['ids'])
+    missing = list(dict.fromkeys(comment_id for comment_id, item in zip(data['ids'], results) if item is None))
+    return jsonify({"results": results, "missing": missing}), 200
+
+
 # Route pour récupérer les commentaires d'un post spécifique
 @comments_bp.route('/posts/<string:post_id>/comments', methods=['GET'])
+@conditional("Comment")
 def get_post_comments(post_id):
-    query = """
-    MATCH (p:Post {id: $post_id})-[:HAS_COMMENT]->(c:Comment)
-    RETURN c
-    """
-    result = graph.run(query, post_id=post_id).data()
-    return jsonify([dict(comment['c']) for comment in result]), 200
+    return paginated_list(repo, "post_comments", post_id=post_id)
 
 
 # Route pour créer un nouveau commentaire sur un post
@@ -38,16 +54,13 @@ def get_post_comments(post_id):
 def create_comment(post_id):
     data = request.get_json() 
 
-    # Vérification des champs obligatoires
-    if not data or 'content' not in data or 'user_id' not in data:
-        return jsonify({"error": "Missing content or user_id"}), 400
-    
-    # Validation de la longueur du contenu
-    if len(data['content']) < 5 or len(data['content']) > 1000:
-        return jsonify({"error": "Content must be between 5 and 1000 characters"}), 400
+    # Champs obligatoires et longueur du contenu
+    error = validate_comment_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
     
     try: 
-        comment = Comment.create(graph, data['content'], data['user_id'], post_id)
+        comment = Comment.create(repo, data['content'], data['user_id'], post_id)
         if not comment:
             return jsonify({"error": "User or post not found"}), 404
         return jsonify(dict(comment)), 201
@@ -58,15 +71,12 @@ def create_comment(post_id):
 # Route pour supprimer un commentaire spécifique d'un post
 @comments_bp.route('/posts/<string:post_id>/comments/<string:comment_id>', methods=['DELETE'])
 def delete_post_comment(post_id, comment_id):
-    # Vérifier que le commentaire appartient bien au post
-    query = """
-    MATCH (p:Post {id: $post_id})-[:HAS_COMMENT]->(c:Comment {id: $comment_id})
-    DETACH DELETE c
-    RETURN COUNT(c) as deleted
-    """
-    result = graph.run(query, post_id=post_id, comment_id=comment_id).data()
-    if result[0]['deleted'] == 0:
+    # Le commentaire n'est supprimé que s'il appartient bien au post
+    deleted, job = Comment.delete(repo, comment_id, post_id=post_id)
+    if not deleted:
         return jsonify({"error": "Comment not found or doesn't belong to post"}), 404
+    if job:
+        return job_accepted(job, "Comment deletion accepted")
     return jsonify({"message": "Comment deleted"}), 200
 
 
@@ -74,18 +84,13 @@ def delete_post_comment(post_id, comment_id):
 @comments_bp.route('/comments/<string:comment_id>', methods=['PUT'])
 def update_comment(comment_id):
     data = request.get_json()
-
-    # Vérification que le commentaire existe
-    comment = Comment.find_by_id(graph, comment_id)
-    if not comment:
-        return jsonify({"error": "Comment not found"}), 404
     
     # Validation du contenu si présent
     if 'content' in data and (len(data['content']) < 5 or len(data['content']) > 1000):
         return jsonify({"error": "Content must be between 5 and 1000 characters"}), 400
     
     try:
-        comment = Comment.update(graph, comment_id, **data)
+        comment = Comment.update(repo, comment_id, **data)
         if not comment:
             return jsonify({"error": "Comment not found"}), 404
         return jsonify(dict(comment)), 200
@@ -96,8 +101,11 @@ def update_comment(comment_id):
 # Route pour supprimer un commentaire (version générale, sans vérification de post)
 @comments_bp.route('/comments/<string:comment_id>', methods=['DELETE'])
 def delete_comment(comment_id):
-    if not Comment.delete(graph, comment_id):
+    deleted, job = Comment.delete(repo, comment_id)
+    if not deleted:
         return jsonify({"error": "Comment not found"}), 404
+    if job:
+        return job_accepted(job, "Comment deletion accepted")
     return jsonify({"message": "Comment deleted"}), 200
 
 
@@ -108,9 +116,12 @@ def like_comment(comment_id):
     if not data or 'user_id' not in data:
         return jsonify({"error": "Missing user_id"}), 400
     
-    rel = Comment.add_like(graph, data['user_id'], comment_id)
+    rel = Comment.add_like(repo, data['user_id'], comment_id)
     if not rel:
         return jsonify({"error": "User or comment not found"}), 404
+    # Écriture différée (LIKE_WRITE_BEHIND): le like est accepté puis écrit par lot
+    if like_buffer.enabled:
+        return jsonify({"message": "Comment like accepted"}), 202
     return jsonify({"message": "Comment liked"}), 201
 
 
@@ -121,12 +132,8 @@ def unlike_comment(comment_id):
     if not data or 'user_id' not in data:
         return jsonify({"error": "Missing user_id"}), 400
     
-    query = """
-    MATCH (u:User {id: $user_id})-[r:LIKES]->(c:Comment {id: $comment_id})
-    DELETE r
-    RETURN COUNT(r) as deleted
-    """
-    result = graph.run(query, user_id=data['user_id'], comment_id=comment_id).data()
-    if result[0]['deleted'] == 0:
+    if not Comment.remove_like(repo, data['user_id'], comment_id):
         return jsonify({"error": "Like not found"}), 404
+    if like_buffer.enabled:
+        return jsonify({"message": "Like removal accepted"}), 202
     return jsonify({"message": "Like removed"}), 200
\ No newline at end of file
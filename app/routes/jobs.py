@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify, url_for
+from app.jobs import jobs
+
+# Création d'un Blueprint Flask pour le suivi des jobs d'arrière-plan
+jobs_bp = Blueprint('jobs', __name__)
+
+
+def job_accepted(job, message):
+    """Réponse 202 d'une opération confiée à un job: son id, son état et l'URL de suivi (Location)"""
+    response = jsonify({"message": message, "job_id": job["id"], "job": job})
+    response.headers["Location"] = url_for("jobs.get_job", job_id=job["id"])
+    return response, 202
+
+
+# Route pour suivre un job: statut (queued, running, succeeded, failed) et progression (done / total)
+@jobs_bp.route('/jobs/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    job = jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
@@ -1,55 +1,130 @@
 from flask import Blueprint, request, jsonify
-# Importer l'instance Neo4j depuis app
-from app import graph
-from app.models import Post
+# Importer le repository (Neo4j ou en mémoire) depuis app
+from app import repo
+from app.like_buffer import like_buffer
+from app.models import Post, Timeline
+from app.pagination import paginated_list, parse_page_args, encode_cursor, PaginationError, DEFAULT_LIMIT
+from app.projection import parse_fields, project, FieldsError
+from app.validation import validate_post_payload, validate_batch_ids
+from app.conditional import conditional
+from app.routes.jobs import job_accepted
+from app.trending import trending
+from app.admission import admission
 
 # Création d'un Blueprint Flask pour les routes des posts
 posts_bp = Blueprint('posts', __name__)
 
-# Route pour récupérer tous les posts
+# Sections de la réponse de /posts/<id>/full, sélectionnables avec ?fields=
+POST_DETAIL_SECTIONS = ("post", "author", "comments", "counts")
+
+# Route pour récupérer les posts (paginée: ?limit=&after=, streaming: ?stream=ndjson|json)
 @posts_bp.route('/posts', methods=['GET'])
+@conditional("Post")
 def get_posts():
-    query = "MATCH (p:Post) RETURN p"
-    result = graph.run(query).data()
-    return jsonify([dict(post['p']) for post in result]), 200
+    return paginated_list(repo, "posts")
+
+
+# Route pour récupérer les posts tendance (likes et commentaires récents, pondérés et décroissant
+# avec le temps), du plus tendance au moins tendance: ?limit= (20 par défaut, TRENDING_SIZE au plus)
+@posts_bp.route('/posts/trending', methods=['GET'])
+def get_trending_posts():
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1 or limit > trending.size:
+        return jsonify({"error": f"limit must be between 1 and {trending.size}"}), 400
+    if not trending.ready:
+        response = jsonify({"error": "Trending scores are loading"})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    top = trending.top(limit)
+    posts = Post.find_many(repo, [post_id for post_id, _ in top])
+    return jsonify([dict(post, trending_score=score) for (_, score), post in zip(top, posts) if post]), 200
 
 
 # Route pour récupérer un post spécifique par son ID
 @posts_bp.route('/posts/<string:post_id>', methods=['GET'])
+@conditional("Post")
 def get_post(post_id):
-    post = Post.find_by_id(graph, post_id)
+    post = Post.find_by_id(repo, post_id)
     if not post:
         return jsonify({"error": "Post not found"}), 404
     return jsonify(dict(post)), 200
 
 
+# Route pour récupérer plusieurs posts par leurs ids en une requête: corps {"ids": [...]}.
+# Les résultats suivent l'ordre des ids (null pour un id inexistant, listé dans "missing")
+@posts_bp.route('/posts:batchGet', methods=['POST'])
+@admission("read")
+def batch_get_posts():
+    data = request.get_json(silent=True)
+    error = validate_batch_ids(data)
+    if error:
+        return jsonify({"error": error}), 400
+    results = Post.find_many(repo, data['ids'])
+    missing = list(dict.fromkeys(post_id for post_id, item in zip(data['ids'], results) if item is None))
+    return jsonify({"results": results, "missing": missing}), 200
+
+
+# Route pour récupérer un post avec son auteur, une page de ses commentaires (avec leurs auteurs)
+# et ses compteurs en un seul aller-retour (commentaires paginés: ?limit=&after=, projection: ?fields=)
+@posts_bp.route('/posts/<string:post_id>/full', methods=['GET'])
+@admission("heavy")
+@conditional("Post", "Comment", "User")
+def get_post_full(post_id):
+    try:
+        page = parse_page_args(request.args)
+        fields = parse_fields(request.args.get("fields"), POST_DETAIL_SECTIONS)
+    except (PaginationError, FieldsError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Les commentaires ne sont pas lus s'ils ne sont pas demandés
+    limit = page["limit"] or DEFAULT_LIMIT
+    if fields is not None and "comments" not in fields:
+        limit = 0
+    detail, has_more = Post.detail(repo, post_id, comments_after=page["after"], comments_limit=limit)
+    if not detail:
+        return jsonify({"error": "Post not found"}), 404
+
+    body = project(detail, fields)
+    next_cursor = None
+    if has_more:
+        last = detail["comments"][-1]
+        next_cursor = body["next_cursor"] = encode_cursor(last.get("created_at"), last.get("id"))
+    response = jsonify(body)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response, 200
+
+
 # Route pour récupérer tous les posts d'un utilisateur spécifique
 @posts_bp.route('/users/<string:user_id>/posts', methods=['GET'])
+@conditional("Post")
 def get_user_posts(user_id):
-    query = """
-    MATCH (u:User {id: $user_id})-[:CREATED]->(p:Post)
-    RETURN p
-    """
-    result = graph.run(query, user_id=user_id).data()
-    return jsonify([dict(post['p']) for post in result]), 200
+    return paginated_list(repo, "user_posts", user_id=user_id)
+
+
+# Route pour récupérer le fil d'actualité d'un utilisateur: posts de ses amis, du plus récent
+# au plus ancien (paginée: ?limit=&after=, streaming: ?stream=ndjson|json)
+@posts_bp.route('/users/<string:user_id>/feed', methods=['GET'])
+@admission("heavy")
+@conditional("Post", "Friendship")
+def get_user_feed(user_id):
+    return paginated_list(repo, "feed", user_id=user_id, fanout_max_friends=Timeline.fanout_max_friends)
 
 
 # Route pour créer un nouveau post pour un utilisateur spécifique
 @posts_bp.route('/users/<string:user_id>/posts', methods=['POST'])
 def create_post(user_id):
     data = request.get_json()
-    if not data or 'title' not in data or 'content' not in data:
-        return jsonify({"error": "Missing title or content"}), 400
-    
-    # Validation de la longueur des champs
-    if len(data['title']) < 5 or len(data['title']) > 100:
-        return jsonify({"error": "Title must be between 5 and 100 characters"}), 400
-    
-    if len(data['content']) < 10 or len(data['content']) > 2000:
-        return jsonify({"error": "Content must be between 10 and 2000 characters"}), 400
+    # Présence des champs et validation de leur longueur
+    error = validate_post_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
         
     try:
-        post = Post.create(graph, data['title'], data['content'], user_id)
+        post = Post.create(repo, data['title'], data['content'], user_id)
         if not post:
             return jsonify({"error": "User not found"}), 404
         return jsonify(dict(post)), 201
@@ -61,9 +136,6 @@ def create_post(user_id):
 @posts_bp.route('/posts/<string:post_id>', methods=['PUT'])
 def update_post(post_id):
     data = request.get_json()
-    post = Post.find_by_id(graph, post_id)
-    if not post:
-        return jsonify({"error": "Post not found"}), 404
     
     # Validation des champs si présents
     if 'title' in data and (len(data['title']) < 5 or len(data['title']) > 100):
@@ -73,7 +145,9 @@ def update_post(post_id):
         return jsonify({"error": "Content must be between 10 and 2000 characters"}), 400
     
     try:
-        updated_post = Post.update(graph, post_id, **data)
+        updated_post = Post.update(repo, post_id, **data)
+        if not updated_post:
+            return jsonify({"error": "Post not found"}), 404
         return jsonify(dict(updated_post)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -82,8 +156,12 @@ def update_post(post_id):
 # Route pour supprimer un post
 @posts_bp.route('/posts/<string:post_id>', methods=['DELETE'])
 def delete_post(post_id):
-    if not Post.delete(graph, post_id):
+    # Un post très commenté ou aimé est supprimé en arrière-plan (202 et id du job)
+    deleted, job = Post.delete(repo, post_id)
+    if not deleted:
         return jsonify({"error": "Post not found"}), 404
+    if job:
+        return job_accepted(job, "Post deletion accepted")
     return jsonify({"message": "Post deleted"}), 200
 
 
@@ -94,9 +172,12 @@ def like_post(post_id):
     if not data or 'user_id' not in data:
         return jsonify({"error": "Missing user_id"}), 400
     
-    rel = Post.add_like(graph, data['user_id'], post_id)
+    rel = Post.add_like(repo, data['user_id'], post_id)
     if not rel:
         return jsonify({"error": "User or post not found"}), 404
+    # Écriture différée (LIKE_WRITE_BEHIND): le like est accepté puis écrit par lot
+    if like_buffer.enabled:
+        return jsonify({"message": "Post like accepted"}), 202
     return jsonify({"message": "Post liked"}), 201
 
 
@@ -107,12 +188,8 @@ def unlike_post(post_id):
     if not data or 'user_id' not in data:
         return jsonify({"error": "Missing user_id"}), 400
     
-    query = """
-    MATCH (u:User {id: $user_id})-[r:LIKES]->(p:Post {id: $post_id})
-    DELETE r
-    RETURN COUNT(r) as deleted
-    """
-    result = graph.run(query, user_id=data['user_id'], post_id=post_id).data()
-    if result[0]['deleted'] == 0:
+    if not Post.remove_like(repo, data['user_id'], post_id):
         return jsonify({"error": "Like not found"}), 404
+    if like_buffer.enabled:
+        return jsonify({"message": "Like removal accepted"}), 202
     return jsonify({"message": "Like removed"}), 200
\ No newline at end of file
@@ -0,0 +1,61 @@
+# Importer les modules nécessaires
+from urllib.parse import urlencode
+from flask import Blueprint, request, jsonify
+# Importer le repository (Neo4j ou en mémoire)
+from app import repo
+from app.models import Post, Comment
+from app.pagination import PaginationError, encode_cursor, decode_cursor
+from app.search import search_index, tokenize
+from app.admission import admission
+
+# Création d'un Blueprint Flask pour la recherche plein texte
+search_bp = Blueprint('search', __name__)
+
+# Modèle des documents renvoyés pour chaque type de recherche
+SEARCH_MODELS = {"posts": Post, "comments": Comment}
+
+# Nombre de résultats par défaut et maximal d'une page de recherche
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+# Route pour rechercher des posts ou des commentaires par mots-clés, classés par pertinence (BM25):
+# ?q=&type=posts|comments&limit=&after= (curseur X-Next-Cursor de la page précédente)
+@search_bp.route('/search', methods=['GET'])
+@admission("heavy")
+def search():
+    query = request.args.get('q', '')
+    if not tokenize(query):
+        return jsonify({"error": "q must contain at least one search term"}), 400
+    kind = request.args.get('type', 'posts')
+    if kind not in SEARCH_MODELS:
+        return jsonify({"error": "type must be one of: " + ", ".join(SEARCH_MODELS)}), 400
+    try:
+        limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1 or limit > MAX_SEARCH_LIMIT:
+        return jsonify({"error": f"limit must be between 1 and {MAX_SEARCH_LIMIT}"}), 400
+    try:
+        after = decode_cursor(request.args['after']) if request.args.get('after') else None
+    except PaginationError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not search_index.ready:
+        response = jsonify({"error": "Search index is loading"})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    # Un résultat de plus que limit est classé pour détecter la page suivante
+    ranked = search_index.search(kind, query, limit + 1, after=after)
+    page = ranked[:limit]
+    documents = SEARCH_MODELS[kind].find_many(repo, [doc_id for _, doc_id in page])
+    # Un document supprimé par un autre processus peut rester dans l'index jusqu'à sa reconstruction
+    items = [dict(document, score=score) for (score, _), document in zip(page, documents) if document]
+
+    response = jsonify(items)
+    if len(ranked) > limit:
+        next_cursor = encode_cursor(*page[-1])
+        response.headers["X-Next-Cursor"] = next_cursor
+        params = urlencode({"q": query, "type": kind, "limit": limit, "after": next_cursor})
+        response.headers["Link"] = f'<{request.base_url}?{params}>; rel="next"'
+    return response, 200
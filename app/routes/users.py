@@ -1,90 +1,122 @@
 # Importer les modules nécessaires
-from flask import Blueprint, request, jsonify
-# Importer l'instance Neo4j
-from app import graph
-from app.models import User
-# Importer le module NodeMatcher de py2neo pour les requêtes Neo4j
-from py2neo import NodeMatcher
-# Ajout pour la validation d' email
-import re
+from flask import Blueprint, request, jsonify, current_app
+# Importer le repository (Neo4j ou en mémoire)
+from app import repo
+from app.models import User, Suggestions, DuplicateEmailError
+from app.pagination import paginated_list
+from app.conditional import conditional
+from app.routes.jobs import job_accepted
+from app.validation import validate_email, validate_user_payload, validate_batch_ids
+from app.admission import admission, Overloaded
+from app.profile import profile_loader, PROFILE_SECTIONS
 
 # Création d'un Blueprint Flask pour les routes utilisateurs
 users_bp = Blueprint('users', __name__)
-# Initialisation du NodeMatcher pour interroger les noeuds dans Neo4j 
-matcher = NodeMatcher(graph)
 
-def validate_email(email):
-    # Valider le format d'un email
-    email_regex = r"[^@]+@[^@]+\.[^@]+"
-    return re.match(email_regex, email)
+# Nombre de lignes par défaut et maximal de chaque section du profil
+DEFAULT_PROFILE_LIMIT = 10
+MAX_PROFILE_LIMIT = 50
 
-# Route pour récupérer tous les utilisateurs
+# Route pour récupérer les utilisateurs (paginée: ?limit=&after=, streaming: ?stream=ndjson|json)
 @users_bp.route('/users', methods=['GET'])
+@conditional("User")
 def get_users():
-    query = "MATCH (u:User) RETURN u"
-    result = graph.run(query).data()
-    return jsonify([dict(user['u']) for user in result]), 200
+    return paginated_list(repo, "users")
 
 
 # Route pour créer un nouvel utilisateur
 @users_bp.route('/users', methods=['POST'])
 def create_user():
     data = request.get_json()
-    if not data or 'name' not in data or 'email' not in data:
-        return jsonify({"error": "Missing name or email"}), 400
-    
-    # Vérification du format de l'email
-    if not validate_email(data['email']):
-        return jsonify({"error": "Invalid email format"}), 400
-    
-    # Vérification de la longueur du nom
-    if len(data['name']) < 3 or len(data['name']) > 50:
-        return jsonify({"error": "Name must be between 3 and 50 characters"}), 400
-    
-    # Vérifier si l'email existe déjà
-    existing_user = graph.nodes.match("User", email=data['email']).first()
-    if existing_user:
-        return jsonify({"error": "Email already exists"}), 400
+    # Présence des champs, format de l'email et longueur du nom
+    error = validate_user_payload(data)
+    if error:
+        return jsonify({"error": error}), 400
     
+    # L'unicité de l'email est vérifiée dans la même requête que la création
     try:        
-        user = User.create(graph, data['name'], data['email'])
+        user = User.create(repo, data['name'], data['email'])
         return jsonify(dict(user)), 201
+    except DuplicateEmailError:
+        return jsonify({"error": "Email already exists"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 # Route pour récupérer un utilisateur par son ID
 @users_bp.route('/users/<string:user_id>', methods=['GET'])
+@conditional("User")
 def get_user(user_id):
-    user = User.find_by_id(graph, user_id)
+    user = User.find_by_id(repo, user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
     return jsonify(dict(user)), 200
 
+
+# Route pour récupérer le profil agrégé d'un utilisateur en une requête: ?include=friends,posts,comments
+# (toutes les sections par défaut) et ?<section>_limit= (10 par défaut). Les sections sont lues en
+# parallèle; une section en échec ou trop lente vaut null et son erreur est listée dans "errors"
+@users_bp.route('/users/<string:user_id>/profile', methods=['GET'])
+@admission("heavy")
+@conditional("User", "Friendship", "Post", "Comment")
+def get_user_profile(user_id):
+    include = [section for section in request.args.get('include', ",".join(PROFILE_SECTIONS)).split(",") if section]
+    unknown = [section for section in include if section not in PROFILE_SECTIONS]
+    if unknown:
+        return jsonify({"error": "include must be a list of: " + ", ".join(PROFILE_SECTIONS)}), 400
+    limits = {}
+    for section in include:
+        try:
+            limits[section] = int(request.args.get(f'{section}_limit', DEFAULT_PROFILE_LIMIT))
+        except ValueError:
+            return jsonify({"error": f"{section}_limit must be an integer"}), 400
+        if limits[section] < 1 or limits[section] > MAX_PROFILE_LIMIT:
+            return jsonify({"error": f"{section}_limit must be between 1 and {MAX_PROFILE_LIMIT}"}), 400
+    try:
+        profile = profile_loader.load(repo, user_id, list(dict.fromkeys(include)), limits)
+    except Overloaded:
+        # Pool saturé: 503 et Retry-After, comme un rejet du contrôle d'admission
+        raise
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    if profile is None:
+        return jsonify({"error": "User not found"}), 404
+    return jsonify(profile), 200
+
+
+# Route pour récupérer plusieurs utilisateurs par leurs ids en une requête: corps {"ids": [...]}.
+# Les résultats suivent l'ordre des ids (null pour un id inexistant, listé dans "missing")
+@users_bp.route('/users:batchGet', methods=['POST'])
+@admission("read")
+def batch_get_users():
+    data = request.get_json(silent=True)
+    error = validate_batch_ids(data)
+    if error:
+        return jsonify({"error": error}), 400
+    results = User.find_many(repo, data['ids'])
+    missing = list(dict.fromkeys(user_id for user_id, item in zip(data['ids'], results) if item is None))
+    return jsonify({"results": results, "missing": missing}), 200
+
 # Route pour mettre à jour un utilisateur
 @users_bp.route('/users/<string:user_id>', methods=['PUT'])
 def update_user(user_id):
     data = request.get_json()
 
-    user = User.find_by_id(graph, user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
     # Validation des champs si présents
-    if 'email' in data:
-        if not validate_email(data['email']):
-            return jsonify({"error": "Invalid email format"}), 400
-        # Vérifier que l'email n'est pas déjà utilisé par un autre utilisateur
-        existing = graph.nodes.match("User", email=data['email']).where(f"_.id <> '{user_id}'").first()
-        if existing:
-            return jsonify({"error": "Email already exists"}), 409
+    if 'email' in data and not validate_email(data['email']):
+        return jsonify({"error": "Invalid email format"}), 400
         
     if 'name' in data and (len(data['name']) < 3 or len(data['name']) > 50):
         return jsonify({"error": "Name must be between 3 and 50 characters"}), 409
     
+    # L'existence de l'utilisateur et l'unicité de l'email sont vérifiées par la mise à jour
     try:
-        update_user = User.update(graph, user_id, **data)
+        update_user = User.update(repo, user_id, **data)
+        if not update_user:
+            return jsonify({"error": "User not found"}), 404
         return jsonify(dict(update_user)), 200
+    except DuplicateEmailError:
+        return jsonify({"error": "Email already exists"}), 409
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     
@@ -92,20 +124,21 @@ def update_user(user_id):
 # Route pour supprimer un utilisateur
 @users_bp.route('/users/<string:user_id>', methods=['DELETE'])
 def delete_user(user_id):
-    if not User.delete(graph, user_id):
+    # Les utilisateurs les plus actifs sont supprimés en arrière-plan (202 et id du job)
+    deleted, job = User.delete(repo, user_id)
+    if not deleted:
         return jsonify({"error": "User not found"}), 404
+    if job:
+        return job_accepted(job, "User deletion accepted")
     return jsonify({"message": "User deleted"}), 200
 
 
 # Route pour récupérer les amis d'un utilisateur
 @users_bp.route('/users/<string:user_id>/friends', methods=['GET'])
+@admission("heavy")
+@conditional("User", "Friendship")
 def get_friends(user_id):
-    query = """
-    MATCH (u:User {id: $user_id})-[:FRIENDS_WITH]-(f:User)
-    RETURN f
-    """
-    result = graph.run(query, user_id=user_id).data()
-    return jsonify([dict(friend['f']) for friend in result]), 200
+    return jsonify(User.friends(repo, user_id)), 200
 
 
 # Route pour ajouter un ami
@@ -115,7 +148,7 @@ def add_friend(user_id):
     if not data or 'friend_id' not in data:
         return jsonify({"error": "Missing friend_id"}), 400
     
-    rel = User.add_friend(graph, user_id, data['friend_id'])
+    rel = User.add_friend(repo, user_id, data['friend_id'])
     if not rel:
         return jsonify({"error": "User or friend not found"}), 404
     return jsonify({"message": "Friend added"}), 201
@@ -124,15 +157,7 @@ def add_friend(user_id):
 # Route pour supprimer un ami
 @users_bp.route('/users/<string:user_id>/friends/<string:friend_id>', methods=['DELETE'])
 def remove_friend(user_id, friend_id):
-    query = """
-    MATCH (u:User {id: $user_id})-[r:FRIENDS_WITH]-(f:User {id: $friend_id})
-    WITH r
-    LIMIT 1
-    DELETE r
-    RETURN COUNT(r) AS deleted
-    """
-    result = graph.run(query, user_id=user_id, friend_id=friend_id).data()
-    if result and result[0]['deleted'] > 0:
+    if User.remove_friend(repo, user_id, friend_id):
         return jsonify({"message": "Friendship removed"}), 200
     else:
         return jsonify({"error": "Friendship not found"}), 404
@@ -140,20 +165,51 @@ def remove_friend(user_id, friend_id):
 # Route pour vérifier si deux utilisateurs sont amis
 @users_bp.route('/users/<string:user_id>/friends/<string:friend_id>', methods=['GET'])
 def check_friends(user_id, friend_id):
-    query = """
-    MATCH (u:User {id: $user_id})-[r:FRIENDS_WITH]-(f:User {id: $friend_id})
-    RETURN COUNT(r) > 0 as are_friends
-    """
-    result = graph.run(query, user_id=user_id, friend_id=friend_id).data()
-    return jsonify({"are_friends": result[0]['are_friends']}), 200
+    return jsonify({"are_friends": User.are_friends(repo, user_id, friend_id)}), 200
 
 
 # Route pour récupérer les amis communs entre deux utilisateurs
 @users_bp.route('/users/<string:user_id>/mutual-friends/<string:other_id>', methods=['GET'])
+@admission("heavy")
+@conditional("User", "Friendship")
 def get_mutual_friends(user_id, other_id):
-    query = """
-    MATCH (u1:User {id: $user_id})-[:FRIENDS_WITH]-(mutual:User)-[:FRIENDS_WITH]-(u2:User {id: $other_id})
-    RETURN mutual
-    """
-    result = graph.run(query, user_id=user_id, other_id=other_id).data()
-    return jsonify([dict(friend['mutual']) for friend in result]), 200
+    return jsonify(User.mutual_friends(repo, user_id, other_id)), 200
+
+
+# Route pour récupérer les suggestions d'amis d'un utilisateur (amis d'amis classés par nombre
+# d'amis communs, précalculés): ?limit= (20 par défaut)
+@users_bp.route('/users/<string:user_id>/suggestions', methods=['GET'])
+@conditional("User", "Friendship")
+def get_suggestions(user_id):
+    try:
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+    if limit < 1 or limit > Suggestions.size:
+        return jsonify({"error": f"limit must be between 1 and {Suggestions.size}"}), 400
+    if not User.find_by_id(repo, user_id):
+        return jsonify({"error": "User not found"}), 404
+    return jsonify(User.suggestions(repo, user_id, limit)), 200
+
+
+# Route pour trouver le plus court chemin d'amitiés entre deux utilisateurs (degrés de séparation):
+# ?max_depth= (FRIEND_PATH_MAX_DEPTH par défaut et au maximum)
+@users_bp.route('/users/<string:user_id>/path/<string:other_id>', methods=['GET'])
+@admission("heavy")
+def get_friend_path(user_id, other_id):
+    limit = current_app.config["FRIEND_PATH_MAX_DEPTH"]
+    try:
+        max_depth = int(request.args.get('max_depth', limit))
+    except ValueError:
+        return jsonify({"error": "max_depth must be an integer"}), 400
+    if max_depth < 1 or max_depth > limit:
+        return jsonify({"error": f"max_depth must be between 1 and {limit}"}), 400
+    if not all(User.find_many(repo, [user_id, other_id])):
+        return jsonify({"error": "User not found"}), 404
+    path = User.path(repo, user_id, other_id, max_depth)
+    if path is None:
+        return jsonify({"error": f"No path within {max_depth} degrees"}), 404
+    users = User.find_many(repo, path)
+    return jsonify({"degrees": len(path) - 1,
+                    "path": [{"id": user["id"], "name": user.get("name")} if user else {"id": node_id}
+                             for node_id, user in zip(path, users)]}), 200
@@ -0,0 +1,48 @@
+# Schéma Neo4j: contraintes d'unicité et index, déclarés de façon idempotente (IF NOT EXISTS)
+
+# (nom, label, propriété) des contraintes d'unicité; chacune crée aussi un index sur la propriété
+CONSTRAINTS = [
+    ("user_id_unique", "User", "id"),
+    ("user_email_unique", "User", "email"),
+    ("post_id_unique", "Post", "id"),
+    ("comment_id_unique", "Comment", "id"),
+    ("timeline_user_unique", "Timeline", "user_id"),
+    ("job_id_unique", "Job", "id"),
+]
+
+# (nom, label, propriété) des index range, utilisés par la pagination triée par created_at
+INDEXES = [
+    ("user_created_at", "User", "created_at"),
+    ("post_created_at", "Post", "created_at"),
+    ("comment_created_at", "Comment", "created_at"),
+]
+
+
+def schema_statements():
+    """Renvoie les requêtes Cypher (syntaxe Neo4j 5) qui déclarent le schéma"""
+    statements = []
+    for name, label, prop in CONSTRAINTS:
+        statements.append(f"CREATE CONSTRAINT {name} IF NOT EXISTS "
+                          f"FOR (n:{label}) REQUIRE n.{prop} IS UNIQUE")
+    for name, label, prop in INDEXES:
+        statements.append(f"CREATE RANGE INDEX {name} IF NOT EXISTS "
+                          f"FOR (n:{label}) ON (n.{prop})")
+    return statements
+
+
+def ensure_schema(graph):
+    """ Crée les contraintes et index manquants; sans effet s'ils existent déjà.
+    Renvoie la liste des requêtes exécutées """
+    statements = schema_statements()
+    for statement in statements:
+        graph.run(statement)
+    return statements
+
+
+def is_unique_violation(error, prop=None):
+    """ Indique si une erreur py2neo est une violation de contrainte d'unicité
+    (éventuellement sur une propriété donnée) """
+    if getattr(error, "code", None) != "Neo.ClientError.Schema.ConstraintValidationFailed":
+        return False
+    # Message Neo4j: "Node(..) already exists with label `User` and property `email` = '...'"
+    return prop is None or f"property `{prop}`" in str(error)
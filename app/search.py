@@ -0,0 +1,346 @@
+# Recherche plein texte dans les posts et les commentaires: index inversé en mémoire (terme ->
+# {id: fréquence}) classé par BM25. L'index est tenu à jour par les écritures des modèles, sauvegardé
+# périodiquement dans un fichier (termes déjà extraits) avec la position du journal des modifications,
+# et rechargé au démarrage: seuls les documents créés, modifiés ou supprimés depuis cette position sont
+# alors relus. Si le journal ne couvre plus cette période, l'index est reconstruit depuis le stockage.
+import atexit
+import gzip
+import heapq
+import json
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from app.changelog import changelog, ChangelogTruncated
+
+logger = logging.getLogger("app.search")
+
+# Types de documents indexés: kind de list_page et texte indexé de chaque document
+SEARCH_KINDS = {
+    "posts": lambda doc: f"{doc.get('title') or ''} {doc.get('content') or ''}",
+    "comments": lambda doc: doc.get("content") or "",
+}
+# Label des nœuds (et des événements du journal) de chaque type de documents
+SEARCH_LABELS = {"posts": "Post", "comments": "Comment"}
+
+# Paramètres BM25: saturation de la fréquence d'un terme et normalisation par la longueur
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+FORMAT_VERSION = 1
+
+TOKEN_RE = re.compile(r"\w+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+au aux ce ces dans de des du elle en est et il ils je la le les leur lui mais ne nous on ou par pas pour
+qu que qui sa se ses son sur ta te tu un une vos votre vous
+""".split())
+
+
+def tokenize(text):
+    """Termes d'un texte: minuscules, sans accents, mots vides et lettres isolées retirés"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return [token for token in TOKEN_RE.findall(text) if len(token) > 1 and token not in STOPWORDS]
+
+
+class InvertedIndex:
+    """Index d'un type de documents: listes de postings et termes de chaque document"""
+
+    def __init__(self):
+        self.postings = {}
+        self.terms = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def add(self, doc_id, counts):
+        """Indexe (ou réindexe) un document à partir de {terme: fréquence}"""
+        self.remove(doc_id)
+        for term, count in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = count
+        self.terms[doc_id] = tuple(counts)
+        length = sum(counts.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+
+    def remove(self, doc_id):
+        for term in self.terms.pop(doc_id, ()):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(doc_id, 0)
+
+    def scores(self, terms):
+        """Score BM25 de chaque document contenant au moins un des termes"""
+        count = len(self.lengths)
+        if not count:
+            return {}
+        average = self.total_length / count or 1
+        scores = {}
+        for term in set(terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+        return scores
+
+    def to_dict(self):
+        return {"docs": {doc_id: {term: self.postings[term][doc_id] for term in terms}
+                         for doc_id, terms in self.terms.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        index = cls()
+        for doc_id, counts in data["docs"].items():
+            index.add(doc_id, counts)
+        return index
+
+
+class SearchIndex:
+    """ Index de chaque type de documents, chargé en arrière-plan à la première recherche du processus
+    (depuis le fichier de sauvegarde complété des modifications journalisées depuis, ou depuis le stockage) """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._repo = None
+        self.path = None
+        self.enabled = False
+        self.load_wait_seconds = 2.0
+        self.save_seconds = 300.0
+        self._reset()
+        atexit.register(self._save_if_dirty)
+
+    def _reset(self):
+        self._indexes = None
+        self._pending = None
+        self._started = False
+        self._loaded = threading.Event()
+        self._dirty = False
+        self._generation = getattr(self, "_generation", 0) + 1
+
+    def configure(self, repo, path=None, enabled=True, load_wait_seconds=2.0, save_seconds=300.0):
+        """ repo sert à lire les documents (list_page, get_many); path est le fichier de sauvegarde
+        (None: aucun), écrit toutes les save_seconds secondes s'il a changé (0: seulement à l'arrêt).
+        La première recherche attend le chargement au plus load_wait_seconds secondes """
+        with self._lock:
+            self._repo = repo
+            self.path = path
+            self.enabled = enabled
+            self.load_wait_seconds = load_wait_seconds
+            self.save_seconds = save_seconds
+            self._reset()
+
+    @property
+    def ready(self):
+        """ Vrai si l'index est chargé; sinon lance son chargement en arrière-plan et l'attend au plus
+        load_wait_seconds secondes (un petit index est ainsi prêt dès la première recherche) """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._pending = []
+                threading.Thread(target=self._load, args=(self._generation, self._loaded),
+                                 name="search-index", daemon=True).start()
+            if self._indexes is not None:
+                return True
+            loaded = self._loaded
+        loaded.wait(self.load_wait_seconds)
+        return self._indexes is not None
+
+    # Chargement et sauvegarde
+
+    def _load(self, generation, loaded):
+        started = time.perf_counter()
+        try:
+            # Le suivi du journal démarre avant la lecture: les modifications des autres processus reçues
+            # pendant le chargement sont mises en attente (_pending) puis appliquées
+            changelog.start()
+            indexes, offset = self._read()
+            replayed = self._replay(indexes, offset) if indexes is not None else None
+            if replayed is None:
+                # Index construit depuis le stockage: sauvegardé pour le prochain démarrage
+                indexes, replayed = self._build(), True
+            else:
+                logger.info("Search index read from %s, %d documents replayed", self.path, replayed)
+        except Exception as e:
+            logger.error("Search index load failed: %s", e)
+            with self._lock:
+                if generation == self._generation:
+                    self._started = False
+            loaded.set()
+            return
+        with self._lock:
+            if generation != self._generation:
+                return
+            pending, self._pending = self._pending or [], None
+            self._indexes = indexes
+            for kind, doc_id, doc in pending:
+                self._apply(kind, doc_id, doc)
+            self._dirty = bool(pending or replayed)
+        loaded.set()
+        logger.info("Search index loaded: %s in %.2fs",
+                    ", ".join(f"{len(index.lengths)} {kind}" for kind, index in indexes.items()),
+                    time.perf_counter() - started)
+        self._save_periodically(generation)
+
+    def _save_periodically(self, generation):
+        if not self.path or self.save_seconds <= 0:
+            return
+        while True:
+            time.sleep(self.save_seconds)
+            with self._lock:
+                if generation != self._generation:
+                    return
+            self._save_if_dirty()
+
+    def _read(self):
+        """(index sauvegardés, position du journal à la sauvegarde), ou (None, None)"""
+        if not self.path or not os.path.exists(self.path):
+            return None, None
+        with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+            data = json.load(handle)
+        if data.get("version") != FORMAT_VERSION:
+            logger.warning("Ignoring search index %s (format version %s)", self.path, data.get("version"))
+            return None, None
+        indexes = {kind: InvertedIndex.from_dict(data["indexes"].get(kind, {"docs": {}})) for kind in SEARCH_KINDS}
+        return indexes, data.get("changelog_offset")
+
+    def _build(self):
+        """Index complet construit en parcourant tous les posts et commentaires"""
+        indexes = {kind: InvertedIndex() for kind in SEARCH_KINDS}
+        for kind, text in SEARCH_KINDS.items():
+            for doc in self._repo.list_page(kind):
+                indexes[kind].add(doc["id"], Counter(tokenize(text(doc))))
+        return indexes
+
+    def _replay(self, indexes, offset):
+        """ Relit les documents créés, modifiés ou supprimés (par tous les processus) depuis la position
+        offset du journal. Renvoie le nombre de documents relus, ou None si le journal ne couvre pas
+        cette période (désactivé, position inconnue ou segments supprimés depuis): l'index est alors
+        reconstruit """
+        if offset is None or not changelog.enabled:
+            return None
+        changed = {kind: set() for kind in SEARCH_KINDS}
+        kinds = {label: kind for kind, label in SEARCH_LABELS.items()}
+        try:
+            for event in changelog.since(offset):
+                if event["type"] in kinds and event["op"] in ("create", "update", "delete"):
+                    changed[kinds[event["type"]]].add(event["id"])
+        except ChangelogTruncated:
+            logger.warning("Change log truncated since the search index was saved: rebuilding it")
+            return None
+        for kind, ids in changed.items():
+            ids = sorted(ids)
+            for start in range(0, len(ids), 1000):
+                batch = ids[start:start + 1000]
+                docs = self._repo.get_many(SEARCH_LABELS[kind], batch)
+                for doc_id in batch:
+                    doc = docs.get(doc_id)
+                    if doc is None:
+                        indexes[kind].remove(doc_id)
+                    else:
+                        indexes[kind].add(doc_id, Counter(tokenize(SEARCH_KINDS[kind](doc))))
+        return sum(len(ids) for ids in changed.values())
+
+    def rebuild(self):
+        """Reconstruit l'index depuis le stockage (de façon synchrone) puis le sauvegarde"""
+        changelog.start()
+        with self._lock:
+            generation = self._generation
+            self._started = True
+            self._pending = []
+        indexes = self._build()
+        with self._lock:
+            if generation == self._generation:
+                pending, self._pending = self._pending or [], None
+                self._indexes = indexes
+                for kind, doc_id, doc in pending:
+                    self._apply(kind, doc_id, doc)
+                self._dirty = True
+        self.save()
+        return {kind: len(index.lengths) for kind, index in indexes.items()}
+
+    def save(self):
+        """Écrit l'index dans un fichier temporaire puis le renomme (le fichier reste toujours lisible)"""
+        with self._lock:
+            if not self.path or self._indexes is None:
+                return False
+            # Position du journal jusqu'à laquelle les modifications sont dans l'index: point de
+            # départ de la relecture au prochain chargement
+            data = {"version": FORMAT_VERSION, "saved_at": time.time(), "changelog_offset": changelog.position,
+                    "indexes": {kind: index.to_dict() for kind, index in self._indexes.items()}}
+            self._dirty = False
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(temporary, self.path)
+        return True
+
+    def _save_if_dirty(self):
+        if self._dirty:
+            try:
+                self.save()
+            except Exception as e:
+                logger.error("Search index save failed: %s", e)
+
+    # Mise à jour incrémentale
+
+    def add(self, kind, doc):
+        self._record(kind, doc["id"], doc)
+
+    def remove(self, kind, doc_id):
+        self._record(kind, doc_id, None)
+
+    def _record(self, kind, doc_id, doc):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((kind, doc_id, doc))
+            if self._indexes is not None:
+                self._apply(kind, doc_id, doc)
+                self._dirty = True
+
+    def _apply(self, kind, doc_id, doc):
+        index = self._indexes[kind]
+        if doc is None:
+            index.remove(doc_id)
+        else:
+            index.add(doc_id, Counter(tokenize(SEARCH_KINDS[kind](doc))))
+
+    # Recherche
+
+    def search(self, kind, query, limit, after=None):
+        """ Ids des documents les mieux classés: liste de (score, id) triée par score décroissant puis id,
+        limitée à limit éléments situés après la position after (score, id) """
+        terms = tokenize(query)
+        with self._lock:
+            scores = self._indexes[kind].scores(terms)
+        ranked = ((round(score, 6), doc_id) for doc_id, score in scores.items())
+        if after is not None:
+            after_score, after_id = after
+            ranked = (item for item in ranked
+                      if item[0] < after_score or (item[0] == after_score and item[1] > after_id))
+        return heapq.nsmallest(limit, ranked, key=lambda item: (-item[0], item[1]))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "loaded": self._indexes is not None,
+                "path": self.path,
+                "indexes": {kind: {"documents": len(index.lengths), "terms": len(index.postings)}
+                            for kind, index in (self._indexes or {}).items()},
+            }
+
+
+# Instance partagée par les modèles et la route de recherche, configurée par create_app
+search_index = SearchIndex()
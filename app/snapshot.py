@@ -0,0 +1,380 @@
+# Instantanés binaires du graphe social: export, rechargement et lecture en mémoire projetée.
+#
+# Format: en-tête (magic, version), blocs de lignes section par section (users, posts, comments,
+# friendships, likes), index des blocs puis trailer (position de l'index, nombre de blocs, magic). Chaque
+# bloc est colonnaire: entiers en tableaux little-endian (int32 pour les références, int64 pour les dates),
+# textes en table de chaînes (offsets uint32 puis octets UTF-8). Les nœuds sont renumérotés: le n-ième
+# utilisateur (post, commentaire) exporté a l'entier n; les sections de nœuds gardent leur id d'origine
+# dans la colonne id et les relations ne portent que ces entiers (-1: nœud absent).
+#
+# L'export lit le graphe par lots (export_page, nœuds ordonnés par id) et n'écrit qu'un bloc à la fois.
+# Les nœuds étant numérotés dans l'ordre de leurs ids, le numéro d'un nœud référencé est retrouvé par
+# dichotomie: sur le premier id de chaque bloc déjà écrit, puis dans la colonne id du bloc relue dans le
+# fichier. La mémoire ne dépend que de la taille des blocs (et de leur nombre), pas de celle du graphe. Ce
+# n'est pas une lecture transactionnelle: une écriture concurrente peut n'y figurer qu'en partie.
+# Snapshot projette le fichier en mémoire et lit les colonnes numériques sans copie;
+# friend_graph_from_snapshot en construit l'instantané des amitiés.
+import array
+import bisect
+import mmap
+import os
+import struct
+import sys
+import time
+from app.friendships import CSRGraph
+from app.models import User, Post, Comment
+
+MAGIC = b"GSNP"
+VERSION = 1
+# En-tête: magic, version (complété à 8 octets)
+HEADER = struct.Struct("<4sH2x")
+# Bloc: section, nombre de lignes, taille des colonnes
+CHUNK = struct.Struct("<B3xIQ")
+# Colonne: type, taille des données (complétées à un multiple de 8 octets)
+COLUMN = struct.Struct("<B7xQ")
+# Entrée de l'index: section, nombre de lignes, position du bloc
+INDEX_ENTRY = struct.Struct("<B3xIQ")
+TRAILER = struct.Struct("<QI4s")
+
+INT32, INT64, STRING = 1, 2, 3
+TYPECODES = {INT32: "i", INT64: "q"}
+# Date absente
+NULL_TIME = -2 ** 63
+
+# Colonnes de chaque section: (nom, type, champ de export_page, section référencée ou None)
+SECTIONS = {
+    "users": (("id", STRING, "id", None), ("name", STRING, "name", None), ("email", STRING, "email", None),
+              ("created_at", INT64, "created_at", None)),
+    "posts": (("id", STRING, "id", None), ("user", INT32, "user_id", "users"), ("title", STRING, "title", None),
+              ("content", STRING, "content", None), ("created_at", INT64, "created_at", None)),
+    "comments": (("id", STRING, "id", None), ("user", INT32, "user_id", "users"),
+                 ("post", INT32, "post_id", "posts"), ("content", STRING, "content", None),
+                 ("created_at", INT64, "created_at", None)),
+    "friendships": (("user", INT32, "user_id", "users"), ("friend", INT32, "friend_id", "users")),
+    "likes": (("user", INT32, "user_id", "users"), ("post", INT32, "post_id", "posts"),
+              ("comment", INT32, "comment_id", "comments"), ("created_at", INT64, "created_at", None)),
+}
+SECTION_CODES = {section: code for code, section in enumerate(SECTIONS)}
+# Sections de nœuds, renumérotés dans l'ordre d'export
+NODE_SECTIONS = ("users", "posts", "comments")
+
+DEFAULT_CHUNK_ROWS = 10000
+
+
+class SnapshotError(Exception):
+    """Fichier qui n'est pas un instantané lisible"""
+
+
+def _pack_column(kind, values):
+    if kind == STRING:
+        encoded = [(value or "").encode("utf-8") for value in values]
+        offsets = array.array("I", [0])
+        for item in encoded:
+            offsets.append(offsets[-1] + len(item))
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        data = offsets.tobytes() + b"".join(encoded)
+    else:
+        numbers = array.array(TYPECODES[kind], values)
+        if sys.byteorder == "big":
+            numbers.byteswap()
+        data = numbers.tobytes()
+    return COLUMN.pack(kind, len(data)) + data + b"\0" * (-len(data) % 8)
+
+
+def _numbers(view, typecode):
+    # Lecture sans copie sur les machines little-endian
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    numbers = array.array(typecode)
+    numbers.frombytes(view)
+    numbers.byteswap()
+    return numbers
+
+
+class _Strings:
+    """Colonne de textes d'un bloc, décodés à la lecture"""
+
+    def __init__(self, offsets, data):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return bytes(self._data[self._offsets[index]:self._offsets[index + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+
+class _Writer:
+    """Écriture d'un instantané bloc par bloc, sous un nom temporaire renommé à la fin"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(f"{path}.tmp", "w+b")
+        self._file.write(HEADER.pack(MAGIC, VERSION))
+        self._index = []
+
+    def write(self, section, rows, values):
+        """ Écrit un bloc de lignes; values(row, colonne) donne la valeur d'une colonne.
+        Renvoie la position du bloc """
+        payload = b"".join(_pack_column(column[1], [values(row, column) for row in rows])
+                           for column in SECTIONS[section])
+        offset = self._file.tell()
+        self._index.append((SECTION_CODES[section], len(rows), offset))
+        self._file.write(CHUNK.pack(SECTION_CODES[section], len(rows), len(payload)))
+        self._file.write(payload)
+        return offset
+
+    def read_ids(self, offset, rows):
+        """Colonne id (la première) d'un bloc de nœuds déjà écrit"""
+        end = self._file.tell()
+        self._file.seek(offset + CHUNK.size)
+        _, size = COLUMN.unpack(self._file.read(COLUMN.size))
+        data = memoryview(self._file.read(size))
+        self._file.seek(end)
+        offsets_size = (rows + 1) * 4
+        return list(_Strings(_numbers(data[:offsets_size], "I"), data[offsets_size:]))
+
+    def close(self):
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(INDEX_ENTRY.pack(*entry))
+        self._file.write(TRAILER.pack(index_offset, len(self._index), MAGIC))
+        self._file.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(f"{self.path}.tmp")
+
+
+class _Numbering:
+    """ Numéros des nœuds d'une section déjà écrite. Seuls le premier id, la position et le premier
+    numéro de chaque bloc restent en mémoire; les ids d'un bloc sont relus dans le fichier """
+
+    def __init__(self, writer):
+        self._writer = writer
+        self._first_ids = []
+        self._chunks = []
+        self._last_id = None
+        self.count = 0
+
+    def add(self, offset, ids):
+        """Enregistre un bloc écrit à offset; ses ids doivent suivre, croissants, ceux des blocs précédents"""
+        if (self._last_id is not None and ids[0] <= self._last_id) or any(
+                before >= node_id for before, node_id in zip(ids, ids[1:])):
+            raise SnapshotError("Exported nodes are not ordered by id")
+        self._first_ids.append(ids[0])
+        self._chunks.append((offset, len(ids), self.count))
+        self._last_id = ids[-1]
+        self.count += len(ids)
+
+    def resolve(self, ids):
+        """{id: numéro} des ids donnés (-1: nœud absent de l'export), parcourus dans l'ordre"""
+        resolved, cached, chunk_ids = {}, None, []
+        for node_id in sorted(ids):
+            position = bisect.bisect_right(self._first_ids, node_id) - 1
+            if position < 0:
+                resolved[node_id] = -1
+                continue
+            offset, rows, base = self._chunks[position]
+            if cached != position:
+                cached, chunk_ids = position, self._writer.read_ids(offset, rows)
+            index = bisect.bisect_left(chunk_ids, node_id)
+            resolved[node_id] = base + index if index < rows and chunk_ids[index] == node_id else -1
+        return resolved
+
+
+def export_snapshot(repo, path, chunk_rows=DEFAULT_CHUNK_ROWS, on_chunk=None):
+    """ Exporte tout le graphe dans path, par blocs d'au plus chunk_rows lignes.
+    on_chunk(section, lignes) est appelé après chaque bloc. Renvoie {section: lignes écrites} """
+    counts = {}
+    writer = _Writer(path)
+    numbering = {section: _Numbering(writer) for section in NODE_SECTIONS}
+
+    def flush(section, rows):
+        # Numéros des nœuds référencés par le bloc, par champ
+        resolved = {field: numbering[ref].resolve({row[field] for row in rows if row.get(field) is not None})
+                    for _, _, field, ref in SECTIONS[section] if ref is not None}
+
+        def value(row, column):
+            _, kind, field, ref = column
+            if ref is not None:
+                return resolved[field].get(row.get(field), -1)
+            if kind == INT64:
+                return NULL_TIME if row.get(field) is None else int(row[field])
+            return row.get(field)
+
+        offset = writer.write(section, rows, value)
+        if section in numbering:
+            numbering[section].add(offset, [row["id"] for row in rows])
+        counts[section] += len(rows)
+        if on_chunk:
+            on_chunk(section, counts[section])
+
+    try:
+        for section in SECTIONS:
+            counts[section] = 0
+            buffer, after = [], None
+            while True:
+                rows, after = repo.export_page(section, after=after, batch_size=chunk_rows)
+                for row in rows:
+                    buffer.append(row)
+                    if len(buffer) >= chunk_rows:
+                        flush(section, buffer)
+                        buffer = []
+                if after is None:
+                    break
+            if buffer:
+                flush(section, buffer)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    return counts
+
+
+class Snapshot:
+    """ Instantané projeté en mémoire (lecture seule). Les colonnes renvoyées par chunks() restent
+    valides jusqu'à close() """
+
+    def __init__(self, path):
+        with open(path, "rb") as handle:
+            if os.fstat(handle.fileno()).st_size < HEADER.size + TRAILER.size:
+                raise SnapshotError(f"{path} is not a graph snapshot")
+            self._mm = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        magic, version = HEADER.unpack_from(self._mm)
+        index_offset, count, trailer_magic = TRAILER.unpack_from(self._mm, len(self._mm) - TRAILER.size)
+        if magic != MAGIC or trailer_magic != MAGIC:
+            raise SnapshotError(f"{path} is not a complete graph snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {version}")
+        self._index = [INDEX_ENTRY.unpack_from(self._mm, index_offset + position * INDEX_ENTRY.size)
+                       for position in range(count)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def count(self, section):
+        code = SECTION_CODES[section]
+        return sum(rows for entry_code, rows, _ in self._index if entry_code == code)
+
+    def stats(self):
+        return {"bytes": len(self._mm), "chunks": len(self._index),
+                "rows": {section: self.count(section) for section in SECTIONS}}
+
+    def chunks(self, section):
+        """Blocs d'une section: {colonne: valeurs} (memoryview d'entiers ou textes décodés à la lecture)"""
+        code = SECTION_CODES[section]
+        for entry_code, rows, offset in self._index:
+            if entry_code != code:
+                continue
+            position = offset + CHUNK.size
+            columns = {}
+            for name, _, _, _ in SECTIONS[section]:
+                kind, size = COLUMN.unpack_from(self._mm, position)
+                data = self._view[position + COLUMN.size:position + COLUMN.size + size]
+                if kind == STRING:
+                    offsets_size = (rows + 1) * 4
+                    columns[name] = _Strings(_numbers(data[:offsets_size], "I"), data[offsets_size:])
+                else:
+                    columns[name] = _numbers(data, TYPECODES[kind])
+                position += COLUMN.size + size + (-size % 8)
+            yield columns
+
+    def ids(self, section):
+        """Ids d'origine des nœuds d'une section, dans l'ordre de leur numérotation"""
+        return [node_id for chunk in self.chunks(section) for node_id in chunk["id"]]
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mm.close()
+        except BufferError:
+            # Des colonnes sont encore référencées: la projection est libérée avec elles
+            pass
+
+
+def friend_graph_from_snapshot(path, max_age=None):
+    """ Instantané CSR des amitiés lu dans le fichier path, sans passer par la base. None si le fichier
+    n'existe pas ou a été écrit il y a plus de max_age secondes """
+    if not path or not os.path.exists(path):
+        return None
+    if max_age is not None and time.time() - os.path.getmtime(path) > max_age:
+        return None
+    with Snapshot(path) as snapshot:
+        ids = snapshot.ids("users")
+        users, friends = array.array("i"), array.array("i")
+        for chunk in snapshot.chunks("friendships"):
+            # Les colonnes sont déjà des numéros d'utilisateurs (-1: utilisateur absent de l'export)
+            for user, friend in zip(chunk["user"], chunk["friend"]):
+                if user >= 0 and friend >= 0 and user != friend:
+                    users.append(user)
+                    friends.append(friend)
+    return CSRGraph.from_indexes(ids, users, friends)
+
+
+# Écriture de chaque section au rechargement, via les modèles (cache, journal, recherche, tendances)
+LOADERS = {
+    "users": User.bulk_create,
+    "posts": Post.bulk_create,
+    "comments": Comment.bulk_create,
+    "friendships": User.bulk_add_friends,
+    "likes": User.set_likes,
+}
+
+
+def load_snapshot(repo, path, batch_size=500, on_batch=None):
+    """ Recharge un instantané par lots UNWIND de batch_size lignes (les nœuds existants sont conservés).
+    on_batch(section, lues, écrites) est appelé après chaque lot. Renvoie {section: {rows, written}} """
+    report = {section: {"rows": 0, "written": 0} for section in SECTIONS}
+
+    def flush(section, batch):
+        written = LOADERS[section](repo, batch)
+        report[section]["rows"] += len(batch)
+        report[section]["written"] += len(written)
+        if on_batch:
+            on_batch(section, report[section]["rows"], report[section]["written"])
+
+    with Snapshot(path) as snapshot:
+        # Colonnes id des blocs de chaque section de nœuds (projetées, non copiées) et numéro de leur
+        # premier nœud: l'id d'origine d'un numéro est lu dans son bloc
+        ids = {section: [] for section in NODE_SECTIONS}
+        bases = {section: [] for section in NODE_SECTIONS}
+
+        def node_id(section, number):
+            position = bisect.bisect_right(bases[section], number) - 1
+            return ids[section][position][number - bases[section][position]]
+
+        for section, columns in SECTIONS.items():
+            batch = []
+            for chunk in snapshot.chunks(section):
+                if section in ids:
+                    bases[section].append(bases[section][-1] + len(ids[section][-1]) if ids[section] else 0)
+                    ids[section].append(chunk["id"])
+                for index in range(len(chunk[columns[0][0]])):
+                    row = {"i": len(batch)}
+                    for name, kind, field, ref in columns:
+                        value = chunk[name][index]
+                        if ref is not None:
+                            value = node_id(ref, value) if value >= 0 else None
+                        elif kind == INT64 and value == NULL_TIME:
+                            value = None
+                        row[field] = value
+                    if section == "likes":
+                        row["liked"] = True
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        flush(section, batch)
+                        batch = []
+            if batch:
+                flush(section, batch)
+    return report
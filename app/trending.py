@@ -0,0 +1,349 @@
+# Posts tendance: score de chaque post = somme des likes et commentaires pondérés, chacun décroissant
+# de moitié toutes les half_life secondes. Les scores sont mis à jour à chaque like, retrait de like et
+# commentaire, sauvegardés périodiquement (checkpoint) avec la position du journal des modifications, et
+# rechargés au démarrage complétés des événements journalisés depuis; sans checkpoint utilisable (ou si le
+# journal ne couvre plus cette période), ils sont recalculés par lots depuis le graphe.
+#
+# Le score d'un événement de l'instant t vaut weight * 2 ** ((t - now) / half_life). Il est stocké sous
+# la forme weight * 2 ** ((t - origin) / half_life), avec une origine fixe: le facteur 2 ** ((origin - now)
+# / half_life) est commun à tous les posts, l'ordre des scores stockés ne change donc pas avec le temps et
+# un événement ne modifie que le score de son post.
+import atexit
+import bisect
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from app.changelog import changelog, ChangelogTruncated
+
+logger = logging.getLogger("app.trending")
+
+FORMAT_VERSION = 1
+
+# Âge (en demi-vies) au-delà duquel un événement est ignoré: son poids est inférieur à 1/1000
+MAX_AGE_HALF_LIVES = 10
+# Les scores stockés sont ramenés à une nouvelle origine avant que leurs exposants ne deviennent trop grands
+REBASE_HALF_LIVES = 64
+
+
+class TrendingPosts:
+    """ Scores de tendance des posts et classement des meilleurs, recalculé au plus toutes les
+    refresh_seconds secondes. Le chargement (checkpoint ou recalcul) se fait en arrière-plan """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._repo = None
+        self.enabled = False
+        self.half_life = 6 * 3600.0
+        self.like_weight = 1.0
+        self.comment_weight = 3.0
+        self.size = 100
+        self.refresh_seconds = 5.0
+        self.path = None
+        self.checkpoint_seconds = 60.0
+        self.rebuild_seconds = 0.0
+        self.load_wait_seconds = 2.0
+        self._reset()
+        atexit.register(self._checkpoint_at_exit)
+
+    def _reset(self):
+        self._scores = None
+        self._origin = time.time()
+        self._pending = None
+        self._started = False
+        self._loaded = threading.Event()
+        self._dirty = False
+        self._top = None
+        self._top_at = 0.0
+        self._generation = getattr(self, "_generation", 0) + 1
+
+    def configure(self, repo, enabled=True, half_life_hours=6.0, like_weight=1.0, comment_weight=3.0,
+                  size=100, refresh_seconds=5.0, path=None, checkpoint_seconds=60.0, rebuild_seconds=0.0,
+                  load_wait_seconds=2.0):
+        """ La première lecture attend le chargement des scores au plus load_wait_seconds secondes """
+        with self._lock:
+            self._repo = repo
+            self.enabled = enabled
+            self.half_life = half_life_hours * 3600
+            self.like_weight = like_weight
+            self.comment_weight = comment_weight
+            self.size = size
+            self.refresh_seconds = refresh_seconds
+            self.path = path
+            self.checkpoint_seconds = checkpoint_seconds
+            self.rebuild_seconds = rebuild_seconds
+            self.load_wait_seconds = load_wait_seconds
+            self._reset()
+
+    @property
+    def ready(self):
+        """ Vrai si les scores sont chargés; sinon lance leur chargement en arrière-plan et l'attend au plus
+        load_wait_seconds secondes """
+        if not self.enabled:
+            return False
+        with self._lock:
+            if not self._started:
+                self._started = True
+                self._pending = []
+                threading.Thread(target=self._run, args=(self._generation, self._loaded, self._log_positions()),
+                                 name="trending", daemon=True).start()
+            if self._scores is not None:
+                return True
+            loaded = self._loaded
+        loaded.wait(self.load_wait_seconds)
+        return self._scores is not None
+
+    @staticmethod
+    def _log_positions():
+        """ Positions du journal quand les événements commencent à être mis en attente (_pending): fin du
+        suivi (événements des autres processus) et fin du journal (événements de ce processus). Les
+        événements antérieurs n'ont pas été comptés par ce processus, les suivants arrivent dans _pending """
+        if not changelog.enabled:
+            return None
+        changelog.start()
+        return changelog.position, changelog.end_offset()
+
+    def _boost(self, at):
+        return 2 ** ((at - self._origin) / self.half_life)
+
+    # Événements
+
+    def like(self, post_id, at=None):
+        self._record(post_id, self.like_weight, at)
+
+    def unlike(self, post_id, at=None):
+        """ at: instant du like retiré, pour retirer exactement le poids qu'il avait apporté (sans lui, un
+        like de maintenant est retiré, score borné à zéro) """
+        self._record(post_id, -self.like_weight, at)
+
+    def comment(self, post_id, at=None):
+        self._record(post_id, self.comment_weight, at)
+
+    def uncomment(self, post_id, at=None):
+        """at: instant de création du commentaire retiré (voir unlike)"""
+        self._record(post_id, -self.comment_weight, at)
+
+    def remove(self, post_id):
+        self._record(post_id, None, None)
+
+    def _record(self, post_id, weight, at):
+        with self._lock:
+            event = (post_id, weight, time.time() if at is None else at)
+            if self._pending is not None:
+                self._pending.append(event)
+            if self._scores is not None:
+                self._apply(self._scores, *event)
+                self._dirty = True
+
+    def _apply(self, scores, post_id, weight, at):
+        if weight is None:
+            scores.pop(post_id, None)
+            return
+        if time.time() - at > MAX_AGE_HALF_LIVES * self.half_life:
+            return
+        if (at - self._origin) / self.half_life > REBASE_HALF_LIVES:
+            self._rebase(at)
+        score = scores.get(post_id, 0.0) + weight * self._boost(at)
+        if score > 0:
+            scores[post_id] = score
+        else:
+            scores.pop(post_id, None)
+
+    def _rebase(self, origin):
+        factor = 2 ** ((self._origin - origin) / self.half_life)
+        for post_id in self._scores:
+            self._scores[post_id] *= factor
+        self._origin = origin
+
+    # Classement
+
+    def top(self, limit):
+        """[(post_id, score actuel)] des limit posts les plus tendance (limit <= size)"""
+        now = time.time()
+        with self._lock:
+            if self._top is None or now - self._top_at >= self.refresh_seconds:
+                decay = 2 ** ((self._origin - now) / self.half_life)
+                # Les posts dont le score est devenu négligeable sont oubliés
+                threshold = self.like_weight * 2 ** -MAX_AGE_HALF_LIVES / decay
+                for post_id in [post_id for post_id, score in self._scores.items() if score < threshold]:
+                    del self._scores[post_id]
+                best = heapq.nlargest(self.size, self._scores.items(), key=lambda item: (item[1], item[0]))
+                self._top = [(post_id, round(score * decay, 4)) for post_id, score in best]
+                self._top_at = now
+            return self._top[:limit]
+
+    # Chargement, recalcul et sauvegarde
+
+    def _run(self, generation, loaded, positions):
+        try:
+            if not self._read(generation, positions):
+                self.rebuild(generation)
+        except Exception as e:
+            logger.error("Trending scores load failed: %s", e)
+            with self._lock:
+                if generation == self._generation:
+                    self._started = False
+            loaded.set()
+            return
+        loaded.set()
+        # Sauvegardes périodiques et, si demandé, recalculs complets (écritures des autres processus)
+        interval = min(seconds for seconds in (self.checkpoint_seconds if self.path else 0, self.rebuild_seconds,
+                                               float("inf")) if seconds)
+        if interval == float("inf"):
+            return
+        rebuilt_at = time.time()
+        while True:
+            time.sleep(interval)
+            if generation != self._generation:
+                return
+            try:
+                if self.rebuild_seconds and time.time() - rebuilt_at >= self.rebuild_seconds:
+                    self.rebuild(generation)
+                    rebuilt_at = time.time()
+                if self.path and self._dirty:
+                    self.checkpoint()
+            except Exception as e:
+                logger.error("Trending checkpoint or rebuild failed: %s", e)
+
+    def _install(self, generation, scores, origin, replayed=(), scanned=None):
+        """ Installe les scores, complétés des événements replayed (antérieurs) puis de ceux reçus pendant
+        le chargement. scanned: (dernier id de chaque lot relu, position de _pending au début de la lecture
+        de chaque lot puis de la dernière lecture, vide), pour ne pas recompter un événement qu'un lot a lu """
+        with self._lock:
+            if generation != self._generation:
+                return False
+            pending, self._pending = self._pending or [], None
+            if scanned is not None:
+                last_ids, starts = scanned
+                pending = [event for position, event in enumerate(pending)
+                           if position >= starts[bisect.bisect_left(last_ids, event[0])]]
+            self._origin = origin
+            self._scores = scores
+            for event in list(replayed) + pending:
+                self._apply(scores, *event)
+            self._top = None
+            self._dirty = bool(pending or replayed)
+            return True
+
+    def _read(self, generation, positions):
+        if not self.path or not os.path.exists(self.path):
+            return False
+        with gzip.open(self.path, "rt", encoding="utf-8") as handle:
+            data = json.load(handle)
+        settings = [self.half_life, self.like_weight, self.comment_weight]
+        if data.get("version") != FORMAT_VERSION or data.get("settings") != settings:
+            logger.warning("Ignoring trending checkpoint %s (other version or settings)", self.path)
+            return False
+        # Sans le journal depuis la sauvegarde, les likes et commentaires reçus depuis seraient perdus
+        if data.get("changelog") is None or positions is None:
+            logger.info("Trending checkpoint %s cannot be completed from the change log", self.path)
+            return False
+        try:
+            replayed = self._replay(data["changelog"], positions)
+        except ChangelogTruncated:
+            logger.warning("Change log truncated since the trending checkpoint was saved")
+            return False
+        self._install(generation, data["scores"], data["origin"], replayed)
+        logger.info("Trending scores loaded from %s (%d posts, saved %.0fs ago, %d events replayed)", self.path,
+                    len(data["scores"]), time.time() - data["saved_at"], len(replayed))
+        return True
+
+    def _replay(self, saved, positions):
+        """ Événements (post_id, poids, instant) journalisés depuis le checkpoint et pas encore comptés: ni
+        déjà dans le checkpoint (écrits par son processus avant la sauvegarde), ni attendus dans _pending """
+        tailed, end = positions
+        pid = os.getpid()
+        replayed = []
+        for event in changelog.since(saved["position"]):
+            if event["offset"] >= end:
+                break
+            if event["pid"] == saved["pid"] and event["offset"] < saved["end"]:
+                continue
+            if event["pid"] != pid and event["offset"] >= tailed:
+                continue
+            entity_type, op = event["type"], event["op"]
+            if entity_type == "Comment" and op == "create":
+                replayed.append((event["ref"], self.comment_weight, event["at"]))
+            elif entity_type == "Post" and op in ("like", "unlike", "uncomment", "delete"):
+                weight = {"like": self.like_weight, "unlike": -self.like_weight,
+                          "uncomment": -self.comment_weight, "delete": None}[op]
+                # Un retrait compte à l'instant du like ou du commentaire retiré
+                replayed.append((event["id"], weight, event.get("created_at") or event["at"]))
+        return replayed
+
+    def rebuild(self, generation=None, batch_size=500):
+        """ Recalcule les scores depuis le graphe, par lots de posts ordonnés par id. Les événements reçus
+        pendant le recalcul sont rejoués ensuite, sauf ceux reçus avant la lecture du lot de leur post:
+        l'écriture précède l'événement, le lot l'a donc déjà compté """
+        changelog.start()
+        with self._lock:
+            generation = self._generation if generation is None else generation
+            self._started = True
+            if self._pending is None:
+                self._pending = []
+        started = time.time()
+        since = started - MAX_AGE_HALF_LIVES * self.half_life
+        scores, after, posts = {}, None, 0
+        last_ids, starts = [], []
+        while True:
+            with self._lock:
+                starts.append(len(self._pending or ()))
+            rows = self._repo.list_post_activity(since, after=after, batch_size=batch_size)
+            if not rows:
+                break
+            for row in rows:
+                score = sum(self.like_weight * 2 ** ((at - started) / self.half_life) for at in row["likes"])
+                score += sum(self.comment_weight * 2 ** ((at - started) / self.half_life) for at in row["comments"])
+                if score > 0:
+                    scores[row["id"]] = score
+            posts += len(rows)
+            after = rows[-1]["id"]
+            last_ids.append(after)
+        self._install(generation, scores, started, scanned=(last_ids, starts))
+        logger.info("Trending scores rebuilt: %d posts scanned, %d scored in %.2fs",
+                    posts, len(scores), time.time() - started)
+        return posts, len(scores)
+
+    def checkpoint(self):
+        """ Écrit les scores dans un fichier temporaire puis le renomme. Le checkpoint porte la position
+        jusqu'à laquelle le journal a été suivi et la fin du journal (les événements de ce processus
+        jusque-là sont comptés), point de départ de la relecture au prochain chargement """
+        with self._lock:
+            if not self.path or self._scores is None:
+                return False
+            position = changelog.position if changelog.enabled else None
+            data = {"version": FORMAT_VERSION, "saved_at": time.time(), "origin": self._origin,
+                    "settings": [self.half_life, self.like_weight, self.comment_weight],
+                    "changelog": None if position is None else {"pid": os.getpid(), "position": position,
+                                                                 "end": changelog.end_offset()},
+                    "scores": dict(self._scores)}
+            self._dirty = False
+        temporary = f"{self.path}.{os.getpid()}.tmp"
+        with gzip.open(temporary, "wt", encoding="utf-8") as handle:
+            json.dump(data, handle, separators=(",", ":"))
+        os.replace(temporary, self.path)
+        return True
+
+    def _checkpoint_at_exit(self):
+        if self._dirty:
+            try:
+                self.checkpoint()
+            except Exception as e:
+                logger.error("Trending checkpoint failed: %s", e)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "loaded": self._scores is not None,
+                "posts": len(self._scores or {}),
+                "half_life_hours": self.half_life / 3600,
+                "checkpoint_path": self.path,
+            }
+
+
+# Instance partagée par les modèles et la route des tendances, configurée par create_app
+trending = TrendingPosts()
@@ -0,0 +1,64 @@
+# Validations partagées par les routes unitaires et l'import en masse
+import re
+
+EMAIL_REGEX = r"[^@]+@[^@]+\.[^@]+"
+
+
+def _length_between(value, low, high):
+    return isinstance(value, str) and low <= len(value) <= high
+
+
+def validate_email(email):
+    # Valider le format d'un email
+    return isinstance(email, str) and re.match(EMAIL_REGEX, email)
+
+
+# Nombre maximal d'ids par requête batchGet
+MAX_BATCH_GET_IDS = 1000
+
+
+def validate_batch_ids(data):
+    """Renvoie le message d'erreur d'un corps batchGet {"ids": [...]}, ou None s'il est valide"""
+    if not data or not isinstance(data.get('ids'), list):
+        return "Missing ids list"
+    if len(data['ids']) > MAX_BATCH_GET_IDS:
+        return f"At most {MAX_BATCH_GET_IDS} ids per request"
+    if not all(isinstance(entity_id, str) for entity_id in data['ids']):
+        return "ids must be strings"
+    return None
+
+
+def validate_user_payload(data):
+    """Renvoie le message d'erreur de validation d'un utilisateur, ou None s'il est valide"""
+    if not data or 'name' not in data or 'email' not in data:
+        return "Missing name or email"
+    # Vérification du format de l'email
+    if not validate_email(data['email']):
+        return "Invalid email format"
+    # Vérification de la longueur du nom
+    if not _length_between(data['name'], 3, 50):
+        return "Name must be between 3 and 50 characters"
+    return None
+
+
+def validate_post_payload(data):
+    """Renvoie le message d'erreur de validation d'un post, ou None s'il est valide"""
+    if not data or 'title' not in data or 'content' not in data:
+        return "Missing title or content"
+    # Validation de la longueur des champs
+    if not _length_between(data['title'], 5, 100):
+        return "Title must be between 5 and 100 characters"
+    if not _length_between(data['content'], 10, 2000):
+        return "Content must be between 10 and 2000 characters"
+    return None
+
+
+def validate_comment_payload(data):
+    """Renvoie le message d'erreur de validation d'un commentaire, ou None s'il est valide"""
+    # Vérification des champs obligatoires
+    if not data or 'content' not in data or 'user_id' not in data:
+        return "Missing content or user_id"
+    # Validation de la longueur du contenu
+    if not _length_between(data['content'], 5, 1000):
+        return "Content must be between 5 and 1000 characters"
+    return None
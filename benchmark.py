@@ -0,0 +1,535 @@
+# Banc de mesure de l'API: génère un graphe social synthétique, puis rejoue un mélange réaliste
+# de lectures et d'écritures sur toutes les routes (utilisateurs, posts, commentaires).
+# Exemple: python benchmark.py --users 5000 --requests 20000 --output results.json --compare base.json
+import argparse
+import json
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from dotenv import load_dotenv
+
+# Charge les variables d'environnement depuis .env
+load_dotenv()
+
+# Le banc tourne par défaut sur le graphe en mémoire; --backend neo4j écrit dans la base configurée
+DEFAULT_BACKEND = "memory"
+
+# Mélange des opérations: (route, poids). Les routes reprennent les règles des blueprints.
+ROUTE_MIX = [
+    ("GET /api/users", 3),
+    ("POST /api/users", 2),
+    ("GET /api/users/<user_id>", 10),
+    ("POST /api/users:batchGet", 2),
+    ("PUT /api/users/<user_id>", 1),
+    ("DELETE /api/users/<user_id>", 1),
+    ("GET /api/users/<user_id>/friends", 6),
+    ("POST /api/users/<user_id>/friends", 2),
+    ("DELETE /api/users/<user_id>/friends/<friend_id>", 1),
+    ("GET /api/users/<user_id>/friends/<friend_id>", 3),
+    ("GET /api/users/<user_id>/mutual-friends/<other_id>", 3),
+    ("GET /api/users/<user_id>/suggestions", 3),
+    ("GET /api/users/<user_id>/path/<other_id>", 2),
+    ("GET /api/posts", 3),
+    ("GET /api/posts/<post_id>", 12),
+    ("GET /api/posts/<post_id>/full", 4),
+    ("GET /api/posts/trending", 3),
+    ("POST /api/posts:batchGet", 2),
+    ("GET /api/users/<user_id>/posts", 5),
+    ("GET /api/users/<user_id>/feed", 10),
+    ("POST /api/users/<user_id>/posts", 3),
+    ("PUT /api/posts/<post_id>", 1),
+    ("DELETE /api/posts/<post_id>", 1),
+    ("POST /api/posts/<post_id>/like", 6),
+    ("DELETE /api/posts/<post_id>/like", 2),
+    ("GET /api/search", 3),
+    ("GET /api/comments", 2),
+    ("GET /api/comments/<comment_id>", 5),
+    ("POST /api/comments:batchGet", 1),
+    ("GET /api/posts/<post_id>/comments", 8),
+    ("POST /api/posts/<post_id>/comments", 4),
+    ("DELETE /api/posts/<post_id>/comments/<comment_id>", 1),
+    ("PUT /api/comments/<comment_id>", 1),
+    ("DELETE /api/comments/<comment_id>", 1),
+    ("POST /api/comments/<comment_id>/like", 3),
+    ("DELETE /api/comments/<comment_id>/like", 1),
+]
+
+WORDS = ("graph", "friend", "coffee", "neo4j", "python", "weekend", "travel", "music", "photo",
+         "project", "flask", "garden", "recipe", "football", "concert", "startup", "book", "movie")
+
+
+def _text(rng, low, high):
+    """Phrase aléatoire dont la longueur est comprise entre low et high caractères"""
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 12)))
+    while len(text) < low:
+        text += " " + rng.choice(WORDS)
+    return text[:high]
+
+
+def _skewed(rng, items, skew=2.0):
+    """Élément tiré avec une popularité décroissante: les premiers éléments sont les plus demandés"""
+    return items[int(len(items) * rng.random() ** skew)]
+
+
+class SyntheticGraph:
+    """ Graphe social synthétique: amitiés en loi de puissance (attachement préférentiel),
+    nombre de posts par utilisateur en loi de Pareto, commentaires et likes concentrés
+    sur les posts populaires """
+
+    def __init__(self, users, friends_per_user, posts_per_user, comments_per_post, likes_per_post,
+                 days=30, seed=0):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.friends_per_user = friends_per_user
+        self.posts_per_user = posts_per_user
+        self.comments_per_post = comments_per_post
+        self.likes_per_post = likes_per_post
+        self.now = int(datetime.now().timestamp())
+        self.span = days * 86400
+        self.user_ids = []
+        self.post_ids = []
+        self.comment_ids = []
+
+    def _created_at(self):
+        return self.now - self.rng.randrange(self.span)
+
+    def user_rows(self):
+        for index in range(self.users):
+            user_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+            self.user_ids.append(user_id)
+            yield {"id": user_id, "name": f"user {index}", "email": f"user{index}@bench.example",
+                   "created_at": self._created_at()}
+
+    def friend_rows(self):
+        # Attachement préférentiel (Barabási-Albert): chaque nouvel utilisateur se lie à m
+        # utilisateurs existants choisis proportionnellement à leur nombre d'amis
+        m = min(self.friends_per_user, len(self.user_ids) - 1)
+        if m < 1:
+            return
+        endpoints = []
+        for index in range(m + 1):
+            for other in range(index):
+                endpoints += [index, other]
+                yield {"user_id": self.user_ids[index], "friend_id": self.user_ids[other]}
+        for index in range(m + 1, len(self.user_ids)):
+            targets = set()
+            while len(targets) < m:
+                targets.add(self.rng.choice(endpoints))
+            for other in targets:
+                endpoints += [index, other]
+                yield {"user_id": self.user_ids[index], "friend_id": self.user_ids[other]}
+
+    def post_rows(self):
+        # Pareto(1.5) a une moyenne de 3: le facteur ramène la moyenne à posts_per_user
+        for user_id in self.user_ids:
+            count = min(int(self.rng.paretovariate(1.5) * self.posts_per_user / 3), 50 * self.posts_per_user)
+            for _ in range(count):
+                post_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+                self.post_ids.append(post_id)
+                yield {"id": post_id, "user_id": user_id, "title": _text(self.rng, 5, 100),
+                       "content": _text(self.rng, 10, 2000), "created_at": self._created_at()}
+
+    def comment_rows(self):
+        for _ in range(int(len(self.post_ids) * self.comments_per_post)):
+            comment_id = str(uuid.UUID(int=self.rng.getrandbits(128)))
+            self.comment_ids.append(comment_id)
+            yield {"id": comment_id, "user_id": _skewed(self.rng, self.user_ids, 1.0),
+                   "post_id": _skewed(self.rng, self.post_ids), "content": _text(self.rng, 5, 1000),
+                   "created_at": self._created_at()}
+
+    def like_rows(self):
+        for _ in range(int(len(self.post_ids) * self.likes_per_post)):
+            user_id = _skewed(self.rng, self.user_ids, 1.0)
+            if self.comment_ids and self.rng.random() < 0.3:
+                yield {"user_id": user_id, "comment_id": _skewed(self.rng, self.comment_ids)}
+            else:
+                yield {"user_id": user_id, "post_id": _skewed(self.rng, self.post_ids)}
+
+
+def seed_graph(repo, synthetic, batch_size):
+    """Charge le graphe synthétique par l'import en masse puis calcule les timelines"""
+    from app.bulk import load
+    from app.models import Timeline, Suggestions
+
+    report = {}
+    for kind, rows in (("users", synthetic.user_rows), ("friends", synthetic.friend_rows),
+                       ("posts", synthetic.post_rows), ("comments", synthetic.comment_rows),
+                       ("likes", synthetic.like_rows)):
+        result = load(repo, kind, enumerate(rows()), batch_size=batch_size)
+        report[kind] = {"written": result["written"], "rejected": result["rejected"],
+                        "seconds": result["seconds"], "rows_per_sec": result["rows_per_sec"]}
+        print(f"seed {kind}: {result['written']} written, {result['rejected']} rejected "
+              f"in {result['seconds']}s", file=sys.stderr)
+
+    started = time.perf_counter()
+    total, after = 0, None
+    while True:
+        rebuilt, after = Timeline.rebuild(repo, after=after, batch_size=batch_size)
+        if not rebuilt:
+            break
+        total += rebuilt
+    report["timelines"] = {"written": total, "seconds": round(time.perf_counter() - started, 3)}
+
+    started = time.perf_counter()
+    total, after = 0, None
+    while True:
+        rebuilt, after = Suggestions.rebuild(repo, after=after, batch_size=batch_size)
+        if not rebuilt:
+            break
+        total += rebuilt
+    report["suggestions"] = {"written": total, "seconds": round(time.perf_counter() - started, 3)}
+    return report
+
+
+class Workload:
+    """ Génère les requêtes du mélange à partir des entités du graphe.
+    Les suppressions portent sur des entités créées pendant la mesure, pour garder le graphe
+    de départ stable; les entités partagées entre threads sont protégées par un verrou """
+
+    def __init__(self, synthetic, seed):
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.users = list(synthetic.user_ids)
+        self.posts = list(synthetic.post_ids)
+        self.comments = list(synthetic.comment_ids)
+        self.comment_posts = {}
+        self.created_users = []
+        self.created_posts = []
+        self.created_comments = []
+        self.friendships = []
+        self.post_likes = []
+        self.comment_likes = []
+        self.cursors = {}
+        self.counter = 0
+
+    def _user(self):
+        return _skewed(self.rng, self.users, 1.5)
+
+    def _post(self):
+        return _skewed(self.rng, self.posts)
+
+    def _comment(self):
+        return _skewed(self.rng, self.comments) if self.comments else None
+
+    def _list(self, url):
+        # Les listes suivent le curseur de la page précédente, puis repartent du début
+        cursor = self.cursors.pop(url, None)
+        return url + "?limit=20" + (f"&after={cursor}" if cursor else "")
+
+    def next_cursor(self, url, cursor):
+        with self.lock:
+            if cursor:
+                self.cursors[url.split("?")[0]] = cursor
+
+    def request(self, route):
+        """Renvoie (méthode, url, corps JSON) pour la route, ou None si elle ne s'applique pas"""
+        with self.lock:
+            return self._request(route)
+
+    def _request(self, route):
+        rng = self.rng
+        method, rule = route.split(" ", 1)
+        self.counter += 1
+
+        if route == "GET /api/users":
+            return method, self._list("/api/users"), None
+        if route == "POST /api/users":
+            return method, "/api/users", {"name": f"bench {self.counter}",
+                                          "email": f"bench{self.counter}.{rng.getrandbits(32)}@bench.example"}
+        if route == "GET /api/users/<user_id>":
+            return method, f"/api/users/{self._user()}", None
+        if route == "POST /api/users:batchGet":
+            return method, "/api/users:batchGet", {"ids": [self._user() for _ in range(50)]}
+        if route == "PUT /api/users/<user_id>":
+            return method, f"/api/users/{self._user()}", {"name": f"renamed {self.counter}"}
+        if route == "DELETE /api/users/<user_id>":
+            return (method, f"/api/users/{self.created_users.pop()}", None) if self.created_users else None
+        if route == "GET /api/users/<user_id>/friends":
+            return method, f"/api/users/{self._user()}/friends", None
+        if route == "POST /api/users/<user_id>/friends":
+            user_id, friend_id = self._user(), rng.choice(self.users)
+            if user_id == friend_id:
+                return None
+            self.friendships.append((user_id, friend_id))
+            return method, f"/api/users/{user_id}/friends", {"friend_id": friend_id}
+        if route == "DELETE /api/users/<user_id>/friends/<friend_id>":
+            if not self.friendships:
+                return None
+            user_id, friend_id = self.friendships.pop()
+            return method, f"/api/users/{user_id}/friends/{friend_id}", None
+        if route == "GET /api/users/<user_id>/friends/<friend_id>":
+            return method, f"/api/users/{self._user()}/friends/{self._user()}", None
+        if route == "GET /api/users/<user_id>/mutual-friends/<other_id>":
+            return method, f"/api/users/{self._user()}/mutual-friends/{self._user()}", None
+        if route == "GET /api/users/<user_id>/suggestions":
+            return method, f"/api/users/{self._user()}/suggestions", None
+        if route == "GET /api/users/<user_id>/path/<other_id>":
+            return method, f"/api/users/{self._user()}/path/{self._user()}", None
+
+        if route == "GET /api/posts":
+            return method, self._list("/api/posts"), None
+        if route == "GET /api/posts/<post_id>":
+            return method, f"/api/posts/{self._post()}", None
+        if route == "GET /api/posts/trending":
+            return method, "/api/posts/trending?limit=20", None
+        if route == "GET /api/search":
+            kind = rng.choice(("posts", "comments"))
+            return method, f"/api/search?q={rng.choice(WORDS)}&type={kind}&limit=20", None
+        if route == "GET /api/posts/<post_id>/full":
+            return method, f"/api/posts/{self._post()}/full?limit=20", None
+        if route == "POST /api/posts:batchGet":
+            return method, "/api/posts:batchGet", {"ids": [self._post() for _ in range(50)]}
+        if route == "GET /api/users/<user_id>/posts":
+            return method, self._list(f"/api/users/{self._user()}/posts"), None
+        if route == "GET /api/users/<user_id>/feed":
+            return method, f"/api/users/{self._user()}/feed?limit=20", None
+        if route == "POST /api/users/<user_id>/posts":
+            return method, f"/api/users/{self._user()}/posts", {"title": _text(rng, 5, 100),
+                                                                "content": _text(rng, 10, 2000)}
+        if route == "PUT /api/posts/<post_id>":
+            return method, f"/api/posts/{self._post()}", {"title": _text(rng, 5, 100)}
+        if route == "DELETE /api/posts/<post_id>":
+            return (method, f"/api/posts/{self.created_posts.pop()}", None) if self.created_posts else None
+        if route == "POST /api/posts/<post_id>/like":
+            user_id, post_id = rng.choice(self.users), self._post()
+            self.post_likes.append((user_id, post_id))
+            return method, f"/api/posts/{post_id}/like", {"user_id": user_id}
+        if route == "DELETE /api/posts/<post_id>/like":
+            if not self.post_likes:
+                return None
+            user_id, post_id = self.post_likes.pop()
+            return method, f"/api/posts/{post_id}/like", {"user_id": user_id}
+
+        if route == "GET /api/comments":
+            return method, self._list("/api/comments"), None
+        if route == "GET /api/comments/<comment_id>":
+            comment_id = self._comment()
+            return (method, f"/api/comments/{comment_id}", None) if comment_id else None
+        if route == "POST /api/comments:batchGet":
+            return (method, "/api/comments:batchGet", {"ids": [self._comment() for _ in range(50)]}) if self.comments else None
+        if route == "GET /api/posts/<post_id>/comments":
+            return method, self._list(f"/api/posts/{self._post()}/comments"), None
+        if route == "POST /api/posts/<post_id>/comments":
+            return method, f"/api/posts/{self._post()}/comments", {"user_id": rng.choice(self.users),
+                                                                   "content": _text(rng, 5, 1000)}
+        if route == "DELETE /api/posts/<post_id>/comments/<comment_id>":
+            if not self.created_comments:
+                return None
+            comment_id = self.created_comments.pop()
+            return method, f"/api/posts/{self.comment_posts.pop(comment_id)}/comments/{comment_id}", None
+        if route == "PUT /api/comments/<comment_id>":
+            comment_id = self._comment()
+            return (method, f"/api/comments/{comment_id}", {"content": _text(rng, 5, 1000)}) if comment_id else None
+        if route == "DELETE /api/comments/<comment_id>":
+            if not self.created_comments:
+                return None
+            comment_id = self.created_comments.pop(0)
+            self.comment_posts.pop(comment_id, None)
+            return method, f"/api/comments/{comment_id}", None
+        if route == "POST /api/comments/<comment_id>/like":
+            comment_id = self._comment()
+            if not comment_id:
+                return None
+            user_id = rng.choice(self.users)
+            self.comment_likes.append((user_id, comment_id))
+            return method, f"/api/comments/{comment_id}/like", {"user_id": user_id}
+        if route == "DELETE /api/comments/<comment_id>/like":
+            if not self.comment_likes:
+                return None
+            user_id, comment_id = self.comment_likes.pop()
+            return method, f"/api/comments/{comment_id}/like", {"user_id": user_id}
+        raise ValueError(f"Unknown route {route}")
+
+    def created(self, route, url, body):
+        """Enregistre l'entité créée par une requête réussie pour les suppressions à venir"""
+        with self.lock:
+            if route == "POST /api/users":
+                self.created_users.append(body["id"])
+            elif route == "POST /api/users/<user_id>/posts":
+                self.created_posts.append(body["id"])
+            elif route == "POST /api/posts/<post_id>/comments":
+                self.created_comments.append(body["id"])
+                self.comment_posts[body["id"]] = url.split("/")[3]
+
+
+def _percentile(sorted_values, percent):
+    """Percentile par rang le plus proche d'une liste triée"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, int(round(percent / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[rank]
+
+
+class RouteStats:
+    """Latences, codes HTTP et allers-retours vers le stockage observés pour une route"""
+
+    def __init__(self):
+        self.latencies = []
+        self.round_trips = []
+        self.statuses = {}
+        self.errors = 0
+
+    def record(self, seconds, status, round_trips):
+        self.latencies.append(seconds)
+        self.round_trips.append(round_trips)
+        self.statuses[str(status)] = self.statuses.get(str(status), 0) + 1
+        if status >= 500:
+            self.errors += 1
+
+    def to_dict(self):
+        latencies = sorted(self.latencies)
+        busy = sum(latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "statuses": self.statuses,
+            "throughput_rps": round(len(latencies) / busy, 1) if busy else None,
+            "latency_ms": {
+                "mean": round(busy / len(latencies) * 1000, 3),
+                "p50": round(_percentile(latencies, 50) * 1000, 3),
+                "p95": round(_percentile(latencies, 95) * 1000, 3),
+                "p99": round(_percentile(latencies, 99) * 1000, 3),
+                "max": round(latencies[-1] * 1000, 3),
+            },
+            "round_trips": {
+                "mean": round(sum(self.round_trips) / len(self.round_trips), 2),
+                "max": max(self.round_trips),
+            },
+        }
+
+
+def run_workload(app, workload, requests, concurrency, seed):
+    """ Rejoue `requests` requêtes tirées du mélange, réparties sur `concurrency` threads
+    (un client de test Flask par thread). Renvoie (statistiques par route, durée totale) """
+    routes = [route for route, _ in ROUTE_MIX]
+    weights = [weight for _, weight in ROUTE_MIX]
+    stats = {route: RouteStats() for route in routes}
+    stats_lock = threading.Lock()
+    remaining = [requests]
+
+    def worker(index):
+        rng = random.Random(seed * 1000 + index)
+        client = app.test_client()
+        while True:
+            with stats_lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            request = None
+            while request is None:
+                route = rng.choices(routes, weights)[0]
+                request = workload.request(route)
+            method, url, payload = request
+
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=payload)
+            response.get_data()
+            seconds = time.perf_counter() - started
+
+            if response.status_code == 201 and method == "POST":
+                workload.created(route, url, response.get_json())
+            if method == "GET":
+                workload.next_cursor(url, response.headers.get("X-Next-Cursor"))
+            with stats_lock:
+                stats[route].record(seconds, response.status_code,
+                                    int(response.headers.get("X-DB-Round-Trips", 0)))
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.perf_counter() - started
+
+
+def compare(results, baseline):
+    """Affiche l'évolution du débit, du p95 et des allers-retours par rapport à un résultat précédent"""
+    print(f"\n{'route':<56} {'p95 ms':>18} {'rps':>18} {'round trips':>14}")
+    for route, current in results["routes"].items():
+        previous = baseline.get("routes", {}).get(route)
+        if not current or not previous:
+            continue
+        p95, old_p95 = current["latency_ms"]["p95"], previous["latency_ms"]["p95"]
+        rps, old_rps = current["throughput_rps"], previous["throughput_rps"]
+        trips, old_trips = current["round_trips"]["mean"], previous["round_trips"]["mean"]
+        delta = f"{(p95 - old_p95) / old_p95 * 100:+.0f}%" if old_p95 else ""
+        print(f"{route:<56} {old_p95:>8} -> {p95:<8}{delta:>5} {old_rps:>8} -> {rps:<8} {old_trips:>5} -> {trips:<5}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mesure le débit, les latences et les allers-retours de chaque route")
+    parser.add_argument("--backend", choices=("memory", "neo4j"), default=DEFAULT_BACKEND,
+                        help="Backend de stockage (neo4j écrit dans la base configurée)")
+    parser.add_argument("--users", type=int, default=2000, help="Nombre d'utilisateurs générés")
+    parser.add_argument("--friends-per-user", type=int, default=5,
+                        help="Amitiés créées par nouvel utilisateur (attachement préférentiel)")
+    parser.add_argument("--posts-per-user", type=float, default=5, help="Nombre moyen de posts par utilisateur")
+    parser.add_argument("--comments-per-post", type=float, default=2, help="Nombre moyen de commentaires par post")
+    parser.add_argument("--likes-per-post", type=float, default=3, help="Nombre moyen de likes par post")
+    parser.add_argument("--requests", type=int, default=5000, help="Nombre de requêtes mesurées")
+    parser.add_argument("--warmup", type=int, default=500, help="Requêtes jouées avant la mesure")
+    parser.add_argument("--concurrency", type=int, default=1, help="Nombre de clients simultanés")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Taille des lots de l'import du graphe")
+    parser.add_argument("--seed", type=int, default=42, help="Graine du générateur aléatoire")
+    parser.add_argument("--output", default="benchmark-results.json", help="Fichier JSON des résultats")
+    parser.add_argument("--compare", help="Résultats JSON d'un passage précédent à comparer")
+    parser.add_argument("--like-write-behind", action="store_true",
+                        help="Likes écrits en différé, par lots (LIKE_WRITE_BEHIND), journal dans un dossier temporaire")
+    args = parser.parse_args()
+
+    from app import create_app, repo
+    config = {"GRAPH_BACKEND": args.backend}
+    if args.like_write_behind:
+        config.update(LIKE_WRITE_BEHIND=True, LIKE_JOURNAL_DIR=tempfile.mkdtemp(prefix="like-journal-"))
+    app = create_app(config)
+
+    synthetic = SyntheticGraph(args.users, args.friends_per_user, args.posts_per_user,
+                               args.comments_per_post, args.likes_per_post, seed=args.seed)
+    with app.app_context():
+        seed_report = seed_graph(repo, synthetic, args.batch_size)
+    if not synthetic.post_ids:
+        parser.error("the synthetic graph has no posts: increase --users or --posts-per-user")
+
+    workload = Workload(synthetic, args.seed)
+    if args.warmup:
+        run_workload(app, workload, args.warmup, args.concurrency, args.seed + 1)
+    stats, seconds = run_workload(app, workload, args.requests, args.concurrency, args.seed)
+
+    routes = {route: route_stats.to_dict() for route, route_stats in stats.items() if route_stats.latencies}
+    results = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": vars(args),
+        "seed": seed_report,
+        "summary": {
+            "requests": args.requests,
+            "errors": sum(route["errors"] for route in routes.values()),
+            "seconds": round(seconds, 3),
+            "throughput_rps": round(args.requests / seconds, 1) if seconds else None,
+        },
+        "routes": routes,
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(results, output, indent=2)
+
+    print(f"\n{'route':<56} {'n':>6} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'trips':>6}")
+    for route, route_stats in routes.items():
+        latency = route_stats["latency_ms"]
+        print(f"{route:<56} {route_stats['requests']:>6} {route_stats['throughput_rps']:>9} {latency['p50']:>8} "
+              f"{latency['p95']:>8} {latency['p99']:>8} {route_stats['round_trips']['mean']:>6}")
+    summary = results["summary"]
+    print(f"\n{summary['requests']} requests in {summary['seconds']}s ({summary['throughput_rps']} req/s), "
+          f"{summary['errors']} errors -> {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            compare(results, json.load(baseline))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+# Import en masse d'un fichier JSONL dans Neo4j, par lots UNWIND
+# Exemple: python load_jsonl.py users data/users.jsonl --batch-size 1000 --rejects rejects.jsonl
+import argparse
+import json
+import sys
+from dotenv import load_dotenv
+
+# Charge les variables d'environnement depuis .env
+load_dotenv()
+
+from app import create_app, repo
+from app.bulk import BULK_KINDS, MAX_BATCH_SIZE, iter_jsonl, load
+
+
+def main():
+    app = create_app()
+    parser = argparse.ArgumentParser(description="Importe un fichier JSONL (un objet par ligne) dans Neo4j")
+    parser.add_argument("kind", choices=sorted(BULK_KINDS), help="Type des lignes du fichier")
+    parser.add_argument("path", help="Fichier JSONL à importer ('-' pour l'entrée standard)")
+    parser.add_argument("--batch-size", type=int, default=app.config["BULK_BATCH_SIZE"],
+                        help="Nombre de lignes par requête UNWIND")
+    parser.add_argument("--rejects", help="Fichier JSONL où écrire les lignes rejetées")
+    args = parser.parse_args()
+
+    if args.batch_size < 1 or args.batch_size > MAX_BATCH_SIZE:
+        parser.error(f"--batch-size must be between 1 and {MAX_BATCH_SIZE}")
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    rejects = open(args.rejects, "w", encoding="utf-8") if args.rejects else None
+
+    def on_batch(stats):
+        print(f"batch {stats['batch']}: {stats['rows']} rows, {stats['written']} written, "
+              f"{stats['seconds']}s ({stats['rows_per_sec']} rows/s)")
+
+    def on_reject(lineno, row, error):
+        if rejects:
+            rejects.write(json.dumps({"line": lineno, "error": error, "row": row}) + "\n")
+
+    try:
+        with app.app_context():
+            report = load(repo, args.kind, iter_jsonl(source), batch_size=args.batch_size,
+                          on_batch=on_batch, on_reject=on_reject)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if rejects:
+            rejects.close()
+
+    print(f"{report['kind']}: {report['received']} received, {report['written']} written, "
+          f"{report['rejected']} rejected in {report['seconds']}s ({report['rows_per_sec']} rows/s)")
+    for rejected in report["rejected_rows"]:
+        print(f"  line {rejected['row']}: {rejected['error']}", file=sys.stderr)
+    return 1 if report["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
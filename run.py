@@ -1,14 +1,52 @@
-from app import app
+import argparse
+import multiprocessing
 import os
 from dotenv import load_dotenv
+from app import create_app
+from app.like_buffer import like_buffer
 
 # Charge les variables d'environnement depuis .env
-load_dotenv()  
+load_dotenv()
+
+
+def run_production(host, port):
+    """ Lance l'API avec gunicorn: plusieurs processus (WEB_WORKERS), chacun avec plusieurs
+    threads (WEB_THREADS). Chaque worker crée sa propre application et son pool Neo4j """
+    from gunicorn.app.base import BaseApplication
+
+    class Server(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", int(os.getenv("WEB_WORKERS", str(multiprocessing.cpu_count() * 2 + 1))))
+            self.cfg.set("threads", int(os.getenv("WEB_THREADS", "4")))
+            self.cfg.set("worker_class", "gthread")
+            # Durée maximale d'une requête avant le redémarrage du worker, et délai d'arrêt propre
+            self.cfg.set("timeout", int(os.getenv("WEB_TIMEOUT", "30")))
+            self.cfg.set("graceful_timeout", int(os.getenv("WEB_GRACEFUL_TIMEOUT", "30")))
+            self.cfg.set("accesslog", "-")
+            # Écrit les likes encore en attente (LIKE_WRITE_BEHIND) avant la fin de chaque worker
+            self.cfg.set("worker_exit", lambda server, worker: like_buffer.close())
+
+        def load(self):
+            return create_app()
+
+    Server().run()
+
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lance l'API (serveur de développement Flask ou gunicorn)")
+    parser.add_argument("--production", action="store_true",
+                        default=os.getenv("SERVER_MODE", "development").lower() == "production",
+                        help="Plusieurs processus et threads avec gunicorn (ou SERVER_MODE=production)")
+    args = parser.parse_args()
+
     # Configuration avec valeurs par défaut ou depuis .env
     host = os.getenv("FLASK_HOST", "0.0.0.0")
     port = int(os.getenv("FLASK_PORT", "5000"))
-    debug = os.getenv("FLASK_DEBUG", "1").lower() in ("1", "true", "yes")
-    
-    app.run(host=host, port=port, debug=debug)
\ No newline at end of file
+
+    if args.production:
+        run_production(host, port)
+    else:
+        # Serveur de développement: mode debug seulement si FLASK_DEBUG est activé
+        debug = os.getenv("FLASK_DEBUG", "0").lower() in ("1", "true", "yes")
+        create_app().run(host=host, port=port, debug=debug)
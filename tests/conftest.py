@@ -0,0 +1,71 @@
+# Fixtures partagées: application sur le backend en mémoire (sans Neo4j) et client de test Flask
+import pytest
+from app import create_app
+
+
+@pytest.fixture
+def app():
+    """ Application neuve à chaque test: graphe en mémoire vide, caches et compteurs réinitialisés.
+    L'instantané des amitiés n'est pas chargé en arrière-plan (les tests le chargent eux-mêmes).
+    Aucun contexte d'application n'est gardé ouvert: chaque requête du client de test a le sien (et son g) """
+    app = create_app({
+        "TESTING": True,
+        "GRAPH_BACKEND": "memory",
+        "FRIEND_GRAPH_SNAPSHOT": False,
+        "LIKE_WRITE_BEHIND": False,
+    })
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def memory(app):
+    """MemoryRepository sous-jacent (sans l'instrumentation), pour vérifier l'état du graphe"""
+    return app.extensions["repository"]._repo
+
+
+@pytest.fixture
+def make_user(client):
+    """Crée un utilisateur par l'API et renvoie son dict"""
+    counter = iter(range(1, 10 ** 6))
+
+    def make(name=None):
+        n = next(counter)
+        response = client.post("/api/users", json={"name": name or f"user{n:04d}", "email": f"user{n}@example.com"})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return make
+
+
+@pytest.fixture
+def make_post(client):
+    """Crée un post par l'API et renvoie son dict"""
+    def make(user_id, title="Titre du post", content="Contenu suffisamment long"):
+        response = client.post(f"/api/users/{user_id}/posts", json={"title": title, "content": content})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return make
+
+
+@pytest.fixture
+def make_comment(client):
+    """Crée un commentaire par l'API et renvoie son dict"""
+    def make(post_id, user_id, content="Un commentaire"):
+        response = client.post(f"/api/posts/{post_id}/comments", json={"content": content, "user_id": user_id})
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+    return make
+
+
+@pytest.fixture
+def befriend(client):
+    """Crée des amitiés par l'API: befriend((a, b), (b, c), ...)"""
+    def make(*pairs):
+        for user_id, friend_id in pairs:
+            response = client.post(f"/api/users/{user_id}/friends", json={"friend_id": friend_id})
+            assert response.status_code == 201, response.get_json()
+    return make
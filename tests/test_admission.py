@@ -0,0 +1,97 @@
+# Contrôle d'admission: rejet 503 (file pleine ou attente trop longue) et routes exemptées
+import pytest
+from app import create_app
+from app.admission import admission_control
+
+
+@pytest.fixture
+def app():
+    """Une seule requête lourde à la fois, sans file d'attente; une lecture en attente au plus (50 ms)"""
+    app = create_app({
+        "TESTING": True,
+        "GRAPH_BACKEND": "memory",
+        "FRIEND_GRAPH_SNAPSHOT": False,
+        "ADMISSION_HEAVY_LIMIT": 1,
+        "ADMISSION_HEAVY_QUEUE": 0,
+        "ADMISSION_READ_LIMIT": 1,
+        "ADMISSION_READ_QUEUE": 1,
+        "ADMISSION_QUEUE_TIMEOUT": 0.05,
+        "ADMISSION_RETRY_AFTER": 7,
+    })
+    return app
+
+
+def test_queue_full_is_rejected(client, make_user):
+    user = make_user()
+    admission_control.acquire("heavy")
+    try:
+        response = client.get(f"/api/users/{user['id']}/friends")
+    finally:
+        admission_control.release("heavy")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.get_json()["route_class"] == "heavy"
+    assert admission_control.stats()["classes"]["heavy"]["rejected"]["queue_full"] == 1
+    assert client.get(f"/api/users/{user['id']}/friends").status_code == 200
+
+
+def test_queue_timeout_is_rejected(client, make_user):
+    user = make_user()
+    admission_control.acquire("read")
+    try:
+        response = client.get(f"/api/users/{user['id']}")
+    finally:
+        admission_control.release("read")
+    assert response.status_code == 503
+    assert admission_control.stats()["classes"]["read"]["rejected"]["timeout"] == 1
+
+
+def test_other_classes_and_admin_routes_stay_available(client, make_user):
+    admission_control.acquire("heavy")
+    try:
+        assert client.get("/api/health/live").status_code == 200
+        assert client.get("/api/admission/stats").get_json()["classes"]["heavy"]["active"] == 1
+        make_user()
+    finally:
+        admission_control.release("heavy")
+
+
+def test_slots_are_released(client, make_user):
+    user = make_user()
+    for _ in range(3):
+        assert client.get(f"/api/users/{user['id']}/friends").status_code == 200
+    classes = admission_control.stats()["classes"]
+    assert all(budget["active"] == 0 for budget in classes.values())
+
+
+def test_stream_is_heavy_and_holds_its_slot_until_sent(client, make_user, app, monkeypatch):
+    make_user()
+    memory = app.extensions["repository"]._repo
+    list_page = memory.list_page
+    seen = []
+
+    def lazy_page(*args, **kwargs):
+        def rows():
+            for row in list_page(*args, **kwargs):
+                seen.append({route_class: budget["active"]
+                             for route_class, budget in admission_control.stats()["classes"].items()})
+                yield row
+        return rows()
+
+    monkeypatch.setattr(memory, "list_page", lazy_page)
+    response = client.get("/api/users?stream=ndjson")
+    assert len(response.get_data(as_text=True).splitlines()) == 1
+    response.close()
+    # Pendant l'envoi du corps, la requête occupe une place de la classe heavy
+    assert seen == [{"read": 0, "write": 0, "heavy": 1}]
+    assert admission_control.stats()["classes"]["heavy"]["active"] == 0
+
+
+def test_stream_rejected_when_heavy_budget_is_full(client, make_user):
+    make_user()
+    admission_control.acquire("heavy")
+    try:
+        assert client.get("/api/users", headers={"Accept": "application/x-ndjson"}).status_code == 503
+        assert client.get("/api/users").status_code == 200
+    finally:
+        admission_control.release("heavy")
@@ -0,0 +1,64 @@
+# Lectures groupées par ids (batchGet): ordre des ids, absences explicites et une seule requête
+import pytest
+from app.validation import MAX_BATCH_GET_IDS
+
+
+@pytest.fixture
+def get_many_calls(memory, monkeypatch):
+    """Ids demandés au repository à chaque lecture groupée"""
+    calls = []
+    get_many = memory.get_many
+
+    def recording(label, ids):
+        ids = list(ids)
+        calls.append((label, ids))
+        return get_many(label, ids)
+
+    monkeypatch.setattr(memory, "get_many", recording)
+    return calls
+
+
+def test_results_follow_input_order(client, make_user, get_many_calls):
+    users = [make_user() for _ in range(3)]
+    ids = [users[2]["id"], "missing", users[0]["id"], users[2]["id"]]
+    response = client.post("/api/users:batchGet", json={"ids": ids})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [user and user["id"] for user in body["results"]] == [users[2]["id"], None, users[0]["id"], users[2]["id"]]
+    assert body["missing"] == ["missing"]
+    # Une requête pour tous les ids, sans doublon
+    assert get_many_calls == [("User", [users[2]["id"], "missing", users[0]["id"]])]
+
+
+def test_cached_entities_are_not_reloaded(client, make_user, get_many_calls):
+    cached, other = make_user(), make_user()
+    client.get(f"/api/users/{cached['id']}")
+    client.post("/api/users:batchGet", json={"ids": [cached["id"], other["id"]]})
+    assert get_many_calls == [("User", [other["id"]])]
+    # Les entités chargées (et l'absence) sont ensuite servies par le cache
+    client.post("/api/users:batchGet", json={"ids": [other["id"], cached["id"]]})
+    client.post("/api/users:batchGet", json={"ids": ["missing"]})
+    client.post("/api/users:batchGet", json={"ids": ["missing"]})
+    assert get_many_calls == [("User", [other["id"]]), ("User", ["missing"])]
+
+
+def test_posts_and_comments(client, make_user, make_post, make_comment):
+    user = make_user()
+    post = make_post(user["id"])
+    comment = make_comment(post["id"], user["id"])
+    posts = client.post("/api/posts:batchGet", json={"ids": ["missing", post["id"]]}).get_json()
+    assert [item and item["id"] for item in posts["results"]] == [None, post["id"]]
+    comments = client.post("/api/comments:batchGet", json={"ids": [comment["id"]]}).get_json()
+    assert comments == {"results": [comment], "missing": []}
+
+
+@pytest.mark.parametrize("body, error", [
+    (None, "Missing ids list"),
+    ({"ids": "abc"}, "Missing ids list"),
+    ({"ids": [1, 2]}, "ids must be strings"),
+    ({"ids": ["x"] * (MAX_BATCH_GET_IDS + 1)}, f"At most {MAX_BATCH_GET_IDS} ids per request"),
+])
+def test_invalid_body(client, body, error):
+    response = client.post("/api/users:batchGet", json=body)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
@@ -0,0 +1,57 @@
+# Import en masse: lignes écrites, rejetées (avec leur position et la raison) et lots
+import json
+
+
+def test_bulk_users_reports_rejected_rows(client):
+    rows = [
+        {"name": "alice", "email": "alice@example.com"},
+        {"name": "al", "email": "short@example.com"},
+        {"name": "bob", "email": "not-an-email"},
+        {"name": "alice bis", "email": "alice@example.com"},
+        "not an object",
+    ]
+    report = client.post("/api/bulk/users?batch_size=2", json=rows).get_json()
+    assert report["received"] == 5
+    assert report["written"] == 1
+    assert report["rejected"] == 4
+    assert {row["row"]: row["error"] for row in report["rejected_rows"]} == {
+        1: "Name must be between 3 and 50 characters",
+        2: "Invalid email format",
+        3: "Email already exists",
+        4: "Row must be a JSON object",
+    }
+    assert len(report["batches"]) == 1
+
+
+def test_bulk_ndjson_reports_line_numbers(client):
+    lines = [json.dumps({"id": "u1", "name": "alice", "email": "alice@example.com"}),
+             "",
+             "{broken",
+             json.dumps({"id": "u2", "name": "bobby", "email": "bob@example.com"})]
+    response = client.post("/api/bulk/users", data="\n".join(lines), content_type="application/x-ndjson")
+    report = response.get_json()
+    assert report["written"] == 2
+    assert [row["row"] for row in report["rejected_rows"]] == [3]
+    assert report["rejected_rows"][0]["error"].startswith("Invalid JSON")
+
+
+def test_bulk_relations_reject_missing_endpoints(client):
+    client.post("/api/bulk/users", json=[{"id": "u1", "name": "alice", "email": "a@example.com"},
+                                         {"id": "u2", "name": "bobby", "email": "b@example.com"}])
+    report = client.post("/api/bulk/friends", json=[{"user_id": "u1", "friend_id": "u2"},
+                                                    {"user_id": "u1", "friend_id": "ghost"},
+                                                    {"user_id": "u1"}]).get_json()
+    assert report["written"] == 1
+    assert {row["row"]: row["error"] for row in report["rejected_rows"]} == {
+        1: "User or friend not found", 2: "Missing user_id or friend_id"}
+    report = client.post("/api/bulk/likes", json=[{"user_id": "u1", "post_id": "p1", "comment_id": "c1"},
+                                                  {"user_id": "u1", "post_id": "ghost"}]).get_json()
+    assert report["written"] == 0
+    assert [row["error"] for row in report["rejected_rows"]] == [
+        "Exactly one of post_id or comment_id is required", "User or target not found"]
+
+
+def test_bulk_rejects_unknown_kind_and_bad_body(client):
+    assert client.post("/api/bulk/groups", json=[]).status_code == 404
+    assert client.post("/api/bulk/users", json={"name": "alice"}).status_code == 400
+    assert client.post("/api/bulk/users?batch_size=0", json=[]).status_code == 400
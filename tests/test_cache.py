@@ -0,0 +1,108 @@
+# Cache des entités: LRU, expiration, cache négatif et invalidation par les écritures
+import pytest
+from app import cache as cache_module
+from app.cache import EntityCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Horloge monotone contrôlée par le test"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def loads(memory, monkeypatch):
+    """Compte les lectures d'utilisateur qui atteignent le repository"""
+    calls = []
+    get_user = memory.get_user
+
+    def counting(user_id):
+        calls.append(user_id)
+        return get_user(user_id)
+
+    monkeypatch.setattr(memory, "get_user", counting)
+    return calls
+
+
+def test_lru_evicts_least_recently_used():
+    cache = EntityCache(max_size=2)
+    for key in ("a", "b"):
+        cache.get_or_load(("User", key), lambda: {"id": key})
+    # "a" est relu: "b" devient la plus ancienne entrée
+    cache.get_or_load(("User", "a"), lambda: pytest.fail("a should be cached"))
+    cache.get_or_load(("User", "c"), lambda: {"id": "c"})
+    assert cache.get_or_load(("User", "b"), lambda: {"id": "b", "reloaded": True})["reloaded"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = EntityCache(ttl=10, negative_ttl=2)
+    cache.get_or_load(("User", "a"), lambda: {"id": "a", "name": "before"})
+    cache.get_or_load(("User", "x"), lambda: None)
+    clock[0] += 5
+    assert cache.get_or_load(("User", "a"), lambda: {"id": "a", "name": "after"})["name"] == "before"
+    # L'absence est oubliée plus vite que l'entité
+    assert cache.get_or_load(("User", "x"), lambda: {"id": "x"}) == {"id": "x"}
+    clock[0] += 6
+    assert cache.get_or_load(("User", "a"), lambda: {"id": "a", "name": "after"})["name"] == "after"
+    assert cache.stats()["expirations"] == 2
+
+
+def test_cached_value_is_a_copy():
+    cache = EntityCache()
+    cache.get_or_load(("User", "a"), lambda: {"id": "a", "name": "alice"})
+    cache.get_or_load(("User", "a"), lambda: None)["name"] = "changed"
+    assert cache.get_or_load(("User", "a"), lambda: None)["name"] == "alice"
+
+
+def test_load_started_before_invalidation_is_not_cached():
+    cache = EntityCache()
+
+    def stale_load():
+        # Écriture concurrente pendant la lecture: la valeur lue est peut-être déjà périmée
+        cache.invalidate(("User", "a"))
+        return {"id": "a", "name": "stale"}
+
+    assert cache.get_or_load(("User", "a"), stale_load)["name"] == "stale"
+    assert cache.get_or_load(("User", "a"), lambda: {"id": "a", "name": "fresh"})["name"] == "fresh"
+
+
+def test_reads_are_served_from_cache(client, make_user, loads):
+    user = make_user()
+    for _ in range(3):
+        assert client.get(f"/api/users/{user['id']}").status_code == 200
+    assert loads == [user["id"]]
+
+
+def test_missing_user_is_cached_negatively(client, loads):
+    before = client.get("/api/cache/stats").get_json()["negative_hits"]
+    for _ in range(3):
+        assert client.get("/api/users/nobody").status_code == 404
+    assert loads == ["nobody"]
+    assert client.get("/api/cache/stats").get_json()["negative_hits"] - before == 2
+
+
+def test_update_invalidates_the_user(client, make_user, loads):
+    user = make_user()
+    client.get(f"/api/users/{user['id']}")
+    response = client.put(f"/api/users/{user['id']}", json={"name": "renamed"})
+    assert response.status_code == 200
+    assert client.get(f"/api/users/{user['id']}").get_json()["name"] == "renamed"
+    assert loads == [user["id"], user["id"]]
+
+
+def test_delete_invalidates_the_user(client, make_user):
+    user = make_user()
+    client.get(f"/api/users/{user['id']}")
+    assert client.delete(f"/api/users/{user['id']}").status_code == 200
+    assert client.get(f"/api/users/{user['id']}").status_code == 404
+
+
+def test_like_invalidates_the_post(client, make_user, make_post):
+    user = make_user()
+    post = make_post(user["id"])
+    assert client.get(f"/api/posts/{post['id']}").get_json()["like_count"] == 0
+    assert client.post(f"/api/posts/{post['id']}/like", json={"user_id": user["id"]}).status_code == 201
+    assert client.get(f"/api/posts/{post['id']}").get_json()["like_count"] == 1
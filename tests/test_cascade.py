@@ -0,0 +1,104 @@
+# Suppressions en cascade (synchrones et confiées à un job)
+import time
+from app.models import Cascade
+
+
+def _wait_for_job(client, location):
+    for _ in range(200):
+        job = client.get(location).get_json()
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job still {job['status']}")
+
+
+def test_delete_user_removes_content_and_fixes_counters(client, memory, make_user, make_post, make_comment):
+    author, other = make_user(), make_user()
+    own_post = make_post(author["id"])
+    other_post = make_post(other["id"])
+    comment_on_own = make_comment(own_post["id"], other["id"])
+    make_comment(other_post["id"], author["id"])
+    client.post(f"/api/posts/{other_post['id']}/like", json={"user_id": author["id"]})
+    client.post(f"/api/comments/{comment_on_own['id']}/like", json={"user_id": author["id"]})
+
+    assert client.delete(f"/api/users/{author['id']}").status_code == 200
+
+    assert client.get(f"/api/users/{author['id']}").status_code == 404
+    assert client.get(f"/api/posts/{own_post['id']}").status_code == 404
+    # Le commentaire de l'autre utilisateur disparaît avec le post de l'auteur supprimé
+    assert client.get(f"/api/comments/{comment_on_own['id']}").status_code == 404
+    remaining = client.get(f"/api/posts/{other_post['id']}").get_json()
+    assert remaining["like_count"] == 0
+    assert remaining["comment_count"] == 0
+    assert author["id"] not in memory.users_by_email.values()
+
+
+def test_delete_user_removes_friendships(client, make_user, befriend):
+    a, b = make_user(), make_user()
+    befriend((a["id"], b["id"]))
+    client.delete(f"/api/users/{a['id']}")
+    assert client.get(f"/api/users/{b['id']}/friends").get_json() == []
+
+
+def test_delete_post_removes_comments_and_likes(client, memory, make_user, make_post, make_comment):
+    user = make_user()
+    post = make_post(user["id"])
+    comment = make_comment(post["id"], user["id"])
+    client.post(f"/api/comments/{comment['id']}/like", json={"user_id": user["id"]})
+    assert client.delete(f"/api/posts/{post['id']}").status_code == 200
+    assert client.get(f"/api/comments/{comment['id']}").status_code == 404
+    assert not memory.likes_comments.targets(user["id"])
+
+
+def test_delete_comment_checks_its_post(client, make_user, make_post, make_comment):
+    user = make_user()
+    post, other_post = make_post(user["id"]), make_post(user["id"])
+    comment = make_comment(post["id"], user["id"])
+    assert client.delete(f"/api/posts/{other_post['id']}/comments/{comment['id']}").status_code == 404
+    assert client.delete(f"/api/posts/{post['id']}/comments/{comment['id']}").status_code == 200
+    assert client.get(f"/api/posts/{post['id']}").get_json()["comment_count"] == 0
+
+
+def test_large_delete_runs_as_job(client, monkeypatch, make_user, make_post, make_comment):
+    monkeypatch.setattr(Cascade, "job_threshold", 3)
+    monkeypatch.setattr(Cascade, "batch_size", 2)
+    user = make_user()
+    post = make_post(user["id"])
+    for _ in range(5):
+        make_comment(post["id"], user["id"])
+
+    response = client.delete(f"/api/posts/{post['id']}")
+    assert response.status_code == 202
+    job = _wait_for_job(client, response.headers["Location"])
+    assert job["status"] == "succeeded"
+    assert job["done"] == job["total"] == 6
+    assert client.get(f"/api/posts/{post['id']}").status_code == 404
+    assert client.get(f"/api/users/{user['id']}/posts").get_json() == []
+
+
+def test_deleted_user_leaves_other_suggestions(client, memory, make_user, befriend):
+    a, b, c = (make_user()["id"] for _ in range(3))
+    befriend((a, b), (b, c))
+    assert memory.suggestions[a] == {c: 1}
+    assert client.delete(f"/api/users/{c}").status_code == 200
+    assert all(c not in candidates for candidates in memory.suggestions.values())
+    assert client.get(f"/api/users/{a}/suggestions").get_json() == []
+
+
+def test_children_created_during_cascade_are_deleted(client, memory, monkeypatch, make_user, make_post, make_comment):
+    user = make_user()
+    post = make_post(user["id"])
+    late = []
+    delete_batch = memory.delete_batch
+
+    def commenting(label, node_id, stage, batch_size):
+        # Commentaire écrit après l'étape des commentaires, avant la suppression du post
+        if stage == "node" and not late:
+            late.append(make_comment(post["id"], user["id"]))
+        return delete_batch(label, node_id, stage, batch_size)
+
+    monkeypatch.setattr(memory, "delete_batch", commenting)
+    assert client.delete(f"/api/posts/{post['id']}").status_code == 200
+    assert client.get(f"/api/posts/{post['id']}").status_code == 404
+    assert late[0]["id"] not in memory.comments
+    assert not memory.created_comments.targets(user["id"])
@@ -0,0 +1,115 @@
+# Journal des modifications: segments projetés en mémoire, rotation, suivi des autres processus et lecture par offset
+import os
+import subprocess
+import sys
+import time
+import pytest
+from app.changelog import ChangeLog, ChangelogTruncated, changelog, HEADER_SIZE
+from app.models import Changes
+
+
+@pytest.fixture
+def log(tmp_path):
+    """Journal à petits segments (quelques événements chacun), deux segments conservés"""
+    log = ChangeLog()
+    log.configure(str(tmp_path), segment_bytes=512, max_segments=2, poll_seconds=0.01)
+    yield log
+    log.configure()
+
+
+@pytest.fixture
+def shared_log(app, tmp_path):
+    """Journal partagé de l'application (désactivé pour le backend memory), relié aux modèles"""
+    repository = app.extensions["repository"]
+    changelog.configure(str(tmp_path), poll_seconds=0.01, apply=lambda events: Changes.apply(repository, events))
+    yield changelog
+    changelog.configure()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_events_are_read_by_offset(log):
+    first = log.append([("User", "u1", "create", None)])
+    last = log.append([("Post", "p1", "create", "u1"), ("Post", "p1", "like", "u1")])
+    events, next_offset = log.read(0)
+    assert [(event["type"], event["id"], event["op"], event["ref"]) for event in events] == [
+        ("User", "u1", "create", None), ("Post", "p1", "create", "u1"), ("Post", "p1", "like", "u1")]
+    assert events[0]["offset"] == first and events[-1]["offset"] == last
+    assert next_offset == log.end_offset()
+    # Lecture par pages: la suivante commence à l'offset renvoyé
+    page, offset = log.read(0, limit=2)
+    rest, _ = log.read(offset, limit=2)
+    assert page + rest == events
+    assert log.read(next_offset) == ([], next_offset)
+
+
+def test_removal_keeps_creation_time(log):
+    log.append([("Post", "p1", "like", "u1"), ("Post", "p1", "unlike", "u1", 1000)])
+    events, _ = log.read(0)
+    assert "created_at" not in events[0]
+    assert events[1]["created_at"] == 1000
+
+
+def test_rotation_drops_oldest_segments(log):
+    for n in range(40):
+        log.append([("User", f"user-{n:02d}", "update", None)])
+    events, _ = log.read(0, limit=1000)
+    # Seuls les deux derniers segments sont conservés, sans trou jusqu'au dernier événement
+    assert 0 < len(events) < 40
+    assert events[-1]["id"] == "user-39"
+    ids = [int(event["id"][5:]) for event in events]
+    assert ids == list(range(ids[0], 40))
+    with pytest.raises(ChangelogTruncated):
+        log.read(HEADER_SIZE)
+    with pytest.raises(ChangelogTruncated):
+        list(log.since(0))
+    assert list(log.since(events[0]["offset"], batch_size=3)) == events
+
+
+def test_other_process_events_are_applied(tmp_path):
+    applied = []
+    log = ChangeLog()
+    log.configure(str(tmp_path), poll_seconds=0.01, apply=applied.extend)
+    try:
+        log.append([("User", "local", "update", None)])
+        script = ("import sys; from app.changelog import ChangeLog; log = ChangeLog(); "
+                  "log.configure(sys.argv[1]); log.append([('User', 'remote', 'delete', None)])")
+        subprocess.run([sys.executable, "-c", script, str(tmp_path)], check=True,
+                       cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        wait_for(lambda: applied)
+        # Les événements du processus lui-même ne sont pas réappliqués
+        assert [(event["id"], event["op"]) for event in applied] == [("remote", "delete")]
+        wait_for(lambda: log.position == log.end_offset())
+    finally:
+        log.configure()
+
+
+def test_remote_update_invalidates_cached_entity(client, make_user, memory, shared_log):
+    user = make_user()
+    assert client.get(f"/api/users/{user['id']}").get_json()["name"] == user["name"]
+    # Écriture d'un autre processus: le cache local n'est plus à jour jusqu'à l'application de l'événement
+    memory.users[user["id"]]["name"] = "renamed"
+    assert client.get(f"/api/users/{user['id']}").get_json()["name"] == user["name"]
+    Changes.apply(memory, [{"type": "User", "id": user["id"], "op": "update", "ref": None, "at": time.time()}])
+    assert client.get(f"/api/users/{user['id']}").get_json()["name"] == "renamed"
+
+
+def test_changes_route(client, make_user, make_post, shared_log):
+    user = make_user()
+    post = make_post(user["id"])
+    body = client.get("/api/changes", query_string={"offset": 0}).get_json()
+    assert [(event["type"], event["id"], event["op"]) for event in body["events"]] == [
+        ("User", user["id"], "create"), ("Post", post["id"], "create")]
+    assert body["events"][1]["ref"] == user["id"]
+    assert client.get("/api/changes", query_string={"offset": body["next_offset"]}).get_json()["events"] == []
+    assert client.get("/api/changes?limit=0").status_code == 400
+    assert client.get("/api/changes?offset=abc").status_code == 400
+
+
+def test_changes_route_is_disabled_without_log(client):
+    assert client.get("/api/changes").status_code == 404
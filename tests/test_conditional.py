@@ -0,0 +1,74 @@
+# Réponses conditionnelles (ETag, Last-Modified, 304) et compression des routes de lecture
+import gzip
+import time
+from types import SimpleNamespace
+from app import conditional
+
+
+def test_etag_and_not_modified(client, make_user):
+    user = make_user()
+    response = client.get(f"/api/users/{user['id']}")
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert "Last-Modified" in response.headers
+
+    response = client.get(f"/api/users/{user['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.get_data() == b""
+
+
+def test_write_changes_etag(client, make_user):
+    user = make_user()
+    etag = client.get(f"/api/users/{user['id']}").headers["ETag"]
+    client.put(f"/api/users/{user['id']}", json={"name": "nouveau nom"})
+    response = client.get(f"/api/users/{user['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["name"] == "nouveau nom"
+
+
+def test_if_modified_since(client, make_user):
+    user = make_user()
+    last_modified = client.get(f"/api/users/{user['id']}").headers["Last-Modified"]
+    response = client.get(f"/api/users/{user['id']}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_if_modified_since_within_the_same_second(client, make_user, monkeypatch):
+    monkeypatch.setattr(conditional, "time", SimpleNamespace(time=lambda: 1_700_000_000.5, monotonic=time.monotonic))
+    user = make_user()
+    last_modified = client.get(f"/api/users/{user['id']}").headers["Last-Modified"]
+    client.put(f"/api/users/{user['id']}", json={"name": "nouveau nom"})
+    # Même seconde, donc même Last-Modified: la date ne suffit plus à valider la réponse
+    response = client.get(f"/api/users/{user['id']}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"] == last_modified
+    assert response.get_json()["name"] == "nouveau nom"
+    response = client.get(f"/api/users/{user['id']}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 200
+    assert client.get(f"/api/users/{user['id']}", headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_not_modified_skips_storage(client, make_user):
+    user = make_user()
+    etag = client.get(f"/api/users/{user['id']}").headers["ETag"]
+    response = client.get(f"/api/users/{user['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["X-DB-Round-Trips"] == "0"
+
+
+def test_list_etag_follows_collection_writes(client, make_user):
+    make_user()
+    etag = client.get("/api/users").headers["ETag"]
+    assert client.get("/api/users", headers={"If-None-Match": etag}).status_code == 304
+    make_user()
+    assert client.get("/api/users", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_gzip_compression(client):
+    client.post("/api/bulk/users", json=[{"name": f"user{n:04d}", "email": f"u{n}@example.com"} for n in range(50)])
+    response = client.get("/api/users?limit=50", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(gzip.decompress(response.get_data())) > len(response.get_data())
+    assert "Accept-Encoding" in response.headers["Vary"]
@@ -0,0 +1,82 @@
+# Fil d'actualité: timelines matérialisées à l'écriture, fan-out à la lecture et recalcul
+import itertools
+import pytest
+from app import models
+from app.commands import rebuild_timelines
+
+
+@pytest.fixture(autouse=True)
+def ticks(monkeypatch):
+    """Dates de création distinctes et croissantes: l'ordre du fil est l'ordre de création"""
+    counter = itertools.count(1000)
+    monkeypatch.setattr(models, "_now", lambda: next(counter))
+
+
+@pytest.fixture
+def feed(client):
+    def read(user_id, **args):
+        response = client.get(f"/api/users/{user_id}/feed", query_string=args)
+        assert response.status_code == 200
+        return [post["id"] for post in response.get_json()], response.headers.get("X-Next-Cursor")
+    return read
+
+
+def test_feed_lists_friends_posts_newest_first(make_user, make_post, befriend, feed):
+    me, friend, other, stranger = make_user(), make_user(), make_user(), make_user()
+    befriend((me["id"], friend["id"]), (other["id"], me["id"]))
+    posts = [make_post(author["id"])["id"] for author in (friend, stranger, other, friend, me)]
+    ids, _ = feed(me["id"])
+    # Ni les posts d'un inconnu ni les siens
+    assert ids == [posts[3], posts[2], posts[0]]
+
+
+def test_feed_pages_follow_cursor(make_user, make_post, befriend, feed):
+    me, friend = make_user(), make_user()
+    befriend((me["id"], friend["id"]))
+    posts = [make_post(friend["id"])["id"] for _ in range(5)]
+    seen, after = [], None
+    while True:
+        ids, after = feed(me["id"], limit=2, **({"after": after} if after else {}))
+        seen.extend(ids)
+        if not after:
+            break
+    assert seen == posts[::-1]
+
+
+def test_timeline_is_bounded(make_user, make_post, befriend, feed, memory, monkeypatch):
+    monkeypatch.setattr(models.Timeline, "size", 2)
+    me, friend = make_user(), make_user()
+    befriend((me["id"], friend["id"]))
+    posts = [make_post(friend["id"])["id"] for _ in range(3)]
+    assert memory.timelines[me["id"]] == posts[:0:-1]
+    assert feed(me["id"])[0] == posts[:0:-1]
+
+
+def test_popular_author_is_read_on_demand(make_user, make_post, befriend, feed, memory, monkeypatch):
+    monkeypatch.setattr(models.Timeline, "fanout_max_friends", 1)
+    me, star, fan = make_user(), make_user(), make_user()
+    befriend((me["id"], star["id"]), (fan["id"], star["id"]))
+    post = make_post(star["id"])["id"]
+    # Deux amis: le post n'est pas recopié dans les timelines mais lu à la demande
+    assert post not in memory.timelines.get(me["id"], [])
+    assert feed(me["id"])[0] == [post]
+    assert feed(fan["id"])[0] == [post]
+
+
+def test_rebuild_adds_posts_of_new_friends(app, make_user, make_post, befriend, feed):
+    me, friend = make_user(), make_user()
+    post = make_post(friend["id"])["id"]
+    befriend((me["id"], friend["id"]))
+    # Le post écrit avant l'amitié n'a pas été recopié
+    assert feed(me["id"])[0] == []
+    result = app.test_cli_runner().invoke(rebuild_timelines, ["--user-id", me["id"]])
+    assert result.exit_code == 0, result.output
+    assert feed(me["id"])[0] == [post]
+
+
+def test_deleted_post_leaves_the_feed(client, make_user, make_post, befriend, feed):
+    me, friend = make_user(), make_user()
+    befriend((me["id"], friend["id"]))
+    first, second = make_post(friend["id"])["id"], make_post(friend["id"])["id"]
+    assert client.delete(f"/api/posts/{second}").status_code == 200
+    assert feed(me["id"])[0] == [first]
@@ -0,0 +1,100 @@
+# Amitiés: chemins (BFS bidirectionnel), amis communs et instantané CSR
+import os
+import pytest
+from app.conditional import collection_versions
+from app.friendships import bidirectional_bfs, friend_graph
+from app.snapshot import export_snapshot, friend_graph_from_snapshot
+
+GRAPH = {"a": ["b", "e"], "b": ["a", "c"], "c": ["b", "d"], "d": ["c", "f"], "e": ["a"], "f": ["d"], "z": []}
+
+
+@pytest.mark.parametrize("source, target, max_depth, expected", [
+    ("a", "a", 1, ["a"]),
+    ("a", "b", 1, ["a", "b"]),
+    ("a", "d", 3, ["a", "b", "c", "d"]),
+    ("e", "f", 5, ["e", "a", "b", "c", "d", "f"]),
+    ("e", "f", 4, None),
+    ("a", "z", 6, None),
+])
+def test_bidirectional_bfs(source, target, max_depth, expected):
+    assert bidirectional_bfs(source, target, GRAPH.__getitem__, max_depth) == expected
+
+
+@pytest.fixture
+def chain(make_user, befriend):
+    """Utilisateurs reliés en chaîne a - b - c - d"""
+    users = [make_user() for _ in range(4)]
+    befriend(*[(users[n]["id"], users[n + 1]["id"]) for n in range(3)])
+    return [user["id"] for user in users]
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_friend_path(client, chain, snapshot):
+    if snapshot:
+        friend_graph.enabled = True
+        friend_graph.load()
+    response = client.get(f"/api/users/{chain[0]}/path/{chain[3]}")
+    assert response.status_code == 200
+    assert response.get_json()["degrees"] == 3
+    assert [step["id"] for step in response.get_json()["path"]] == chain
+    assert client.get(f"/api/users/{chain[0]}/path/{chain[3]}?max_depth=2").status_code == 404
+    assert client.get(f"/api/users/{chain[0]}/path/ghost").status_code == 404
+    assert client.get(f"/api/users/{chain[0]}/path/{chain[3]}?max_depth=99").status_code == 400
+
+
+def test_snapshot_applies_local_writes(client, chain):
+    friend_graph.enabled = True
+    friend_graph.load()
+    client.delete(f"/api/users/{chain[1]}/friends/{chain[2]}")
+    assert client.get(f"/api/users/{chain[0]}/path/{chain[3]}").status_code == 404
+    client.post(f"/api/users/{chain[0]}/friends", json={"friend_id": chain[3]})
+    assert client.get(f"/api/users/{chain[0]}/path/{chain[3]}").get_json()["degrees"] == 1
+    assert client.get(f"/api/users/{chain[0]}/friends/{chain[3]}").get_json() == {"are_friends": True}
+
+
+def test_mutual_friends_and_suggestions(client, chain):
+    mutual = client.get(f"/api/users/{chain[0]}/mutual-friends/{chain[2]}").get_json()
+    assert [user["id"] for user in mutual] == [chain[1]]
+    suggestions = client.get(f"/api/users/{chain[0]}/suggestions").get_json()
+    assert [(user["id"], user["mutual_friends"]) for user in suggestions] == [(chain[2], 1)]
+
+
+def test_existing_friendship_is_not_added_again(client, chain):
+    version = collection_versions.stats()["versions"]["Friendship"]
+    assert client.post(f"/api/users/{chain[1]}/friends", json={"friend_id": chain[0]}).status_code == 201
+    # Amitié déjà présente: ni version de Friendship incrémentée, ni suggestions recalculées
+    assert collection_versions.stats()["versions"]["Friendship"] == version
+    assert client.post(f"/api/users/{chain[0]}/friends", json={"friend_id": "ghost"}).status_code == 404
+
+
+def test_user_deleted_during_first_load(client, chain):
+    def stale_read():
+        # L'utilisateur est supprimé après la lecture des amitiés, avant l'installation de l'instantané
+        edges = [(chain[n], chain[n + 1]) for n in range(3)]
+        assert client.delete(f"/api/users/{chain[1]}").status_code == 200
+        return edges
+
+    friend_graph.configure(stale_read, refresh_seconds=0)
+    friend_graph.load()
+    assert not friend_graph.are_friends(chain[0], chain[1])
+    assert not friend_graph.are_friends(chain[2], chain[1])
+    assert friend_graph.are_friends(chain[2], chain[3])
+    assert client.get(f"/api/users/{chain[0]}/path/{chain[3]}").status_code == 404
+
+
+def test_first_load_reads_the_snapshot_file(app, client, chain, tmp_path):
+    path = str(tmp_path / "graph.snap")
+    export_snapshot(app.extensions["repository"], path, chunk_rows=2)
+
+    def database():
+        raise AssertionError("the database should not be read")
+
+    friend_graph.configure(database, refresh_seconds=0,
+                           initial_loader=lambda: friend_graph_from_snapshot(path, max_age=60))
+    friend_graph.load()
+    assert client.get(f"/api/users/{chain[0]}/path/{chain[3]}").get_json()["degrees"] == 3
+    # Fichier trop ancien ou absent: le premier chargement lit la base
+    written_at = os.path.getmtime(path) - 120
+    os.utime(path, (written_at, written_at))
+    assert friend_graph_from_snapshot(path, max_age=60) is None
+    assert friend_graph_from_snapshot(str(tmp_path / "missing.snap")) is None
@@ -0,0 +1,103 @@
+# Likes idempotents et compteurs dénormalisés (like_count, comment_count)
+import pytest
+from app.conditional import collection_versions
+from app.like_buffer import like_buffer
+from app.models import User
+
+
+def test_post_like_is_idempotent(client, make_user, make_post):
+    author, fan = make_user(), make_user()
+    post = make_post(author["id"])
+    for _ in range(2):
+        assert client.post(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]}).status_code == 201
+    assert client.get(f"/api/posts/{post['id']}").get_json()["like_count"] == 1
+
+
+def test_post_unlike_decrements_once(client, make_user, make_post):
+    author, fan = make_user(), make_user()
+    post = make_post(author["id"])
+    client.post(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]})
+    assert client.delete(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]}).status_code == 200
+    assert client.delete(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]}).status_code == 404
+    assert client.get(f"/api/posts/{post['id']}").get_json()["like_count"] == 0
+
+
+def test_like_unknown_post_or_user(client, make_user, make_post):
+    user = make_user()
+    post = make_post(user["id"])
+    assert client.post("/api/posts/missing/like", json={"user_id": user["id"]}).status_code == 404
+    assert client.post(f"/api/posts/{post['id']}/like", json={"user_id": "missing"}).status_code == 404
+    assert client.post(f"/api/posts/{post['id']}/like", json={}).status_code == 400
+
+
+def test_comment_like_is_idempotent(client, make_user, make_post, make_comment):
+    author, fan = make_user(), make_user()
+    comment = make_comment(make_post(author["id"])["id"], author["id"])
+    for _ in range(2):
+        assert client.post(f"/api/comments/{comment['id']}/like", json={"user_id": fan["id"]}).status_code == 201
+    assert client.get(f"/api/comments/{comment['id']}").get_json()["like_count"] == 1
+    assert client.delete(f"/api/comments/{comment['id']}/like", json={"user_id": fan["id"]}).status_code == 200
+    assert client.delete(f"/api/comments/{comment['id']}/like", json={"user_id": fan["id"]}).status_code == 404
+    assert client.get(f"/api/comments/{comment['id']}").get_json()["like_count"] == 0
+
+
+@pytest.mark.parametrize("label", ["Post", "Comment"])
+def test_unchanged_counter_invalidates_nothing(client, make_user, make_post, make_comment, label):
+    author, fan = make_user(), make_user()
+    post = make_post(author["id"])
+    url = (f"/api/posts/{post['id']}/like" if label == "Post"
+           else f"/api/comments/{make_comment(post['id'], author['id'])['id']}/like")
+    client.post(url, json={"user_id": fan["id"]})
+    version = collection_versions.stats()["versions"][label]
+    # Like répété, like d'un inconnu et retrait d'un like absent: le compteur ne change pas
+    assert client.post(url, json={"user_id": fan["id"]}).status_code == 201
+    assert client.post(url, json={"user_id": "ghost"}).status_code == 404
+    assert client.delete(url, json={"user_id": author["id"]}).status_code == 404
+    assert collection_versions.stats()["versions"][label] == version
+    assert client.delete(url, json={"user_id": fan["id"]}).status_code == 200
+    assert collection_versions.stats()["versions"][label] > version
+
+
+def test_comment_count_follows_comments(client, make_user, make_post, make_comment):
+    user = make_user()
+    post = make_post(user["id"])
+    first = make_comment(post["id"], user["id"])
+    make_comment(post["id"], user["id"])
+    assert client.get(f"/api/posts/{post['id']}").get_json()["comment_count"] == 2
+    assert client.delete(f"/api/comments/{first['id']}").status_code == 200
+    assert client.get(f"/api/posts/{post['id']}").get_json()["comment_count"] == 1
+
+
+def test_counters_cannot_be_overwritten(client, make_user, make_post):
+    post = make_post(make_user()["id"])
+    response = client.put(f"/api/posts/{post['id']}", json={"like_count": 42, "title": "Nouveau titre"})
+    assert response.get_json()["like_count"] == 0
+    assert response.get_json()["title"] == "Nouveau titre"
+
+
+@pytest.fixture
+def write_behind(app):
+    """Likes différés sans journal, vidés à la demande (flush)"""
+    like_buffer.configure(lambda rows: User.set_likes(app.extensions["repository"], rows),
+                          enabled=True, flush_seconds=3600)
+    yield like_buffer
+    like_buffer.configure(None)
+
+
+def test_buffered_unlike_requires_a_like(client, make_user, make_post, write_behind):
+    author, fan = make_user(), make_user()
+    post = make_post(author["id"])
+
+    def unlike():
+        return client.delete(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]}).status_code
+
+    assert unlike() == 404
+    # Like en attente d'écriture, puis écrit dans le stockage
+    assert client.post(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]}).status_code == 202
+    assert unlike() == 202
+    assert unlike() == 404
+    client.post(f"/api/posts/{post['id']}/like", json={"user_id": fan["id"]})
+    write_behind.flush()
+    assert unlike() == 202
+    write_behind.flush()
+    assert client.get(f"/api/posts/{post['id']}").get_json()["like_count"] == 0
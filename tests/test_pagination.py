@@ -0,0 +1,150 @@
+# Pagination par curseur (keyset) et streaming des routes de liste
+import json
+import pytest
+from app.pagination import encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def users(client):
+    """Dix utilisateurs importés avec des dates de création distinctes (deux à la même seconde)"""
+    rows = [{"id": f"u{n:02d}", "name": f"user{n:02d}", "email": f"u{n}@example.com", "created_at": 1000 + n}
+            for n in range(10)]
+    rows[9]["created_at"] = rows[8]["created_at"]
+    response = client.post("/api/bulk/users", json=rows)
+    assert response.get_json()["written"] == 10
+    return rows
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(1234, "abc")) == (1234, "abc")
+
+
+def test_pages_follow_cursor_without_gaps(client, users):
+    seen, after = [], None
+    while True:
+        response = client.get("/api/users", query_string={"limit": 3, **({"after": after} if after else {})})
+        assert response.status_code == 200
+        seen.extend(user["id"] for user in response.get_json())
+        after = response.headers.get("X-Next-Cursor")
+        if not after:
+            break
+        assert 'rel="next"' in response.headers["Link"]
+    # Du plus récent au plus ancien, l'id départage les dates égales
+    assert seen == ["u09", "u08", "u07", "u06", "u05", "u04", "u03", "u02", "u01", "u00"]
+
+
+def test_last_page_has_no_cursor(client, users):
+    response = client.get("/api/users", query_string={"limit": 10})
+    assert len(response.get_json()) == 10
+    assert "X-Next-Cursor" not in response.headers
+
+
+@pytest.mark.parametrize("query, error", [
+    ({"limit": "abc"}, "limit must be an integer"),
+    ({"limit": 0}, "limit must be between"),
+    ({"after": "!!!"}, "Invalid cursor"),
+    ({"stream": "csv"}, "stream must be one of"),
+])
+def test_invalid_page_arguments(client, users, query, error):
+    response = client.get("/api/users", query_string=query)
+    assert response.status_code == 400
+    assert error in response.get_json()["error"]
+
+
+def test_stream_ndjson_sends_every_row(client, users):
+    response = client.get("/api/users?stream=ndjson")
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)["id"] for line in lines][:2] == ["u09", "u08"]
+    assert len(lines) == 10
+
+
+def test_stream_json_array_respects_limit(client, users):
+    response = client.get("/api/users?stream=json&limit=4")
+    assert [user["id"] for user in json.loads(response.get_data(as_text=True))] == ["u09", "u08", "u07", "u06"]
+
+
+def test_stream_selected_by_accept_header(client, users):
+    response = client.get("/api/users", headers={"Accept": "application/x-ndjson"})
+    assert response.mimetype == "application/x-ndjson"
+    assert len(response.get_data(as_text=True).splitlines()) == 10
+
+
+def test_scoped_list_pages(client, make_user, make_post):
+    author = make_user()
+    other = make_user()
+    for _ in range(3):
+        make_post(author["id"])
+    make_post(other["id"])
+    response = client.get(f"/api/users/{author['id']}/posts?limit=2")
+    assert len(response.get_json()) == 2
+    response = client.get(f"/api/users/{author['id']}/posts", query_string={"limit": 2,
+                                                                           "after": response.headers["X-Next-Cursor"]})
+    assert len(response.get_json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_link_keeps_query_parameters(client, users):
+    response = client.get("/api/users?limit=3&lang=fr")
+    link = response.headers["Link"]
+    assert "lang=fr" in link
+    assert "limit=3" in link
+    assert f"after={response.headers['X-Next-Cursor']}" in link
+
+
+def test_stream_runs_in_request_context(client, memory, users, monkeypatch):
+    """ Les lignes d'un corps en streaming sont lues dans le contexte de la requête, après le retour de la
+    vue: leurs allers-retours sont comptés dans les métriques de la route une fois le corps envoyé """
+    from flask import has_request_context
+    from app.db import count_round_trip
+    from app.metrics import http_request_round_trips
+
+    list_page = memory.list_page
+
+    def lazy_page(*args, **kwargs):
+        def rows():
+            for row in list_page(*args, **kwargs):
+                assert has_request_context()
+                # Comme un curseur py2neo qui relit des enregistrements au fil de l'eau
+                count_round_trip()
+                yield row
+        return rows()
+
+    monkeypatch.setattr(memory, "list_page", lazy_page)
+    key = ("GET", "/api/users")
+    before = http_request_round_trips._values.get(key, 0)
+    response = client.get("/api/users?stream=ndjson")
+    assert len(response.get_data(as_text=True).splitlines()) == 10
+    response.close()
+    # La requête elle-même et une relecture par ligne
+    assert http_request_round_trips._values[key] - before == 11
+
+
+class FakeCursor:
+    """Curseur py2neo 2021.2 (pas de close()): les enregistrements restants doivent être lus"""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+
+    def __iter__(self):
+        while self.rows:
+            yield self.rows.pop(0)
+
+    def forward(self, amount=1):
+        moved = min(amount, len(self.rows))
+        del self.rows[:moved]
+        return moved
+
+
+def test_neo4j_page_cursor_is_released(app, users):
+    from app.repository.neo4j import Neo4jRepository
+
+    cursor = FakeCursor({"u": user} for user in users)
+    graph = type("Graph", (), {"run": lambda self, query, **params: cursor})()
+    repo = Neo4jRepository(graph)
+    app.extensions["repository"]._repo = repo
+    response = app.test_client().get("/api/users", query_string={"limit": 3})
+    assert len(response.get_json()) == 3
+    # Page complète: la ligne de plus a été lue et le reste du curseur abandonné
+    assert cursor.rows == []
@@ -0,0 +1,80 @@
+# Détail d'un post: post, auteur, commentaires avec leurs auteurs et compteurs en un aller-retour
+import itertools
+import pytest
+from app import models
+from app.metrics import http_request_round_trips
+
+
+@pytest.fixture(autouse=True)
+def ticks(monkeypatch):
+    """Dates de création distinctes: les commentaires sont lus du plus récent au plus ancien"""
+    counter = itertools.count(1000)
+    monkeypatch.setattr(models, "_now", lambda: next(counter))
+
+
+@pytest.fixture
+def post(client, make_user, make_post, make_comment):
+    author, alice, bob = make_user("author"), make_user("alice"), make_user("bob")
+    post = make_post(author["id"])
+    comments = [make_comment(post["id"], commenter["id"], f"Commentaire {n}")
+                for n, commenter in enumerate((alice, bob, alice))]
+    assert client.post(f"/api/posts/{post['id']}/like", json={"user_id": bob["id"]}).status_code == 201
+    return {"post": post, "author": author, "comments": comments}
+
+
+def test_detail_embeds_authors_and_counts(client, post):
+    response = client.get(f"/api/posts/{post['post']['id']}/full")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["post"]["id"] == post["post"]["id"]
+    assert body["author"] == {"id": post["author"]["id"], "name": "author"}
+    assert [comment["id"] for comment in body["comments"]] == [comment["id"] for comment in post["comments"][::-1]]
+    assert [comment["author"]["name"] for comment in body["comments"]] == ["alice", "bob", "alice"]
+    assert body["counts"] == {"likes": 1, "comments": 3}
+    assert "next_cursor" not in body
+
+
+def test_detail_is_one_round_trip(client, post):
+    key = ("GET", "/api/posts/<string:post_id>/full")
+    before = http_request_round_trips._values.get(key, 0)
+    assert client.get(f"/api/posts/{post['post']['id']}/full").status_code == 200
+    assert http_request_round_trips._values[key] - before == 1
+
+
+def test_comments_are_paginated(client, post):
+    url = f"/api/posts/{post['post']['id']}/full"
+    first = client.get(url, query_string={"limit": 2})
+    body = first.get_json()
+    assert len(body["comments"]) == 2
+    assert first.headers["X-Next-Cursor"] == body["next_cursor"]
+    rest = client.get(url, query_string={"limit": 2, "after": body["next_cursor"]}).get_json()
+    assert [comment["id"] for comment in rest["comments"]] == [post["comments"][0]["id"]]
+    assert "next_cursor" not in rest
+
+
+def test_fields_trim_the_response(client, post):
+    response = client.get(f"/api/posts/{post['post']['id']}/full",
+                          query_string={"fields": "post.title,author.name,counts"})
+    assert response.get_json() == {"post": {"title": post["post"]["title"]},
+                                   "author": {"name": "author"},
+                                   "counts": {"likes": 1, "comments": 3}}
+
+
+def test_comments_are_not_read_unless_requested(client, post, memory, monkeypatch):
+    limits = []
+    get_post_detail = memory.get_post_detail
+
+    def recording(post_id, comments_after=None, comments_limit=None):
+        limits.append(comments_limit)
+        return get_post_detail(post_id, comments_after=comments_after, comments_limit=comments_limit)
+
+    monkeypatch.setattr(memory, "get_post_detail", recording)
+    assert client.get(f"/api/posts/{post['post']['id']}/full?fields=post").status_code == 200
+    assert limits == [0]
+
+
+def test_unknown_post_or_field(client, post):
+    assert client.get("/api/posts/missing/full").status_code == 404
+    response = client.get(f"/api/posts/{post['post']['id']}/full?fields=likes")
+    assert response.status_code == 400
+    assert "Unknown field" in response.get_json()["error"]
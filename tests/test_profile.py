@@ -0,0 +1,116 @@
+# Profil agrégé: sections lues en parallèle, limites, délai propre à chaque section et pool borné
+import threading
+import time
+import pytest
+from app.profile import profile_loader
+
+
+@pytest.fixture
+def profile(client, make_user, make_post, make_comment, befriend):
+    """Utilisateur avec trois amis, deux posts et un commentaire"""
+    user = make_user()
+    friends = [make_user() for _ in range(3)]
+    befriend(*((user["id"], friend["id"]) for friend in friends))
+    posts = [make_post(user["id"]) for _ in range(2)]
+    comment = make_comment(posts[0]["id"], user["id"])
+    return {"user": user, "friends": friends, "posts": posts, "comment": comment}
+
+
+@pytest.fixture
+def blocked_posts(memory, monkeypatch):
+    """La section posts attend que le test libère l'événement renvoyé"""
+    release = threading.Event()
+    list_page = memory.list_page
+
+    def blocking(kind, *args, **kwargs):
+        if kind == "user_posts":
+            release.wait(5)
+        return list_page(kind, *args, **kwargs)
+
+    monkeypatch.setattr(memory, "list_page", blocking)
+    yield release
+    release.set()
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.01)
+
+
+def test_profile_has_every_section(client, profile):
+    response = client.get(f"/api/users/{profile['user']['id']}/profile")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["user"]["id"] == profile["user"]["id"]
+    assert body["friend_count"] == 3
+    assert {friend["id"] for friend in body["friends"]["items"]} == {friend["id"] for friend in profile["friends"]}
+    assert {post["id"] for post in body["posts"]["items"]} == {post["id"] for post in profile["posts"]}
+    assert [comment["id"] for comment in body["comments"]["items"]] == [profile["comment"]["id"]]
+    assert body["errors"] == {}
+
+
+def test_include_and_limits(client, profile):
+    body = client.get(f"/api/users/{profile['user']['id']}/profile",
+                      query_string={"include": "friends,posts", "friends_limit": 2, "posts_limit": 1}).get_json()
+    assert set(body) == {"user", "friend_count", "friends", "posts", "errors"}
+    assert len(body["friends"]["items"]) == 2
+    assert len(body["posts"]["items"]) == 1
+    # La suite de la section se lit sur la route de la liste
+    next_page = client.get(f"/api/users/{profile['user']['id']}/posts",
+                           query_string={"after": body["posts"]["next_cursor"]}).get_json()
+    assert {post["id"] for post in body["posts"]["items"] + next_page} == {post["id"] for post in profile["posts"]}
+
+
+@pytest.mark.parametrize("args", [{"include": "likes"}, {"posts_limit": 0}, {"posts_limit": "x"}])
+def test_invalid_arguments(client, profile, args):
+    assert client.get(f"/api/users/{profile['user']['id']}/profile", query_string=args).status_code == 400
+
+
+def test_unknown_user(client):
+    assert client.get("/api/users/nobody/profile").status_code == 404
+
+
+def test_failed_section_is_reported(client, profile, memory, monkeypatch):
+    def failing(user_id):
+        raise RuntimeError("count failed")
+
+    monkeypatch.setattr(memory, "count_friends", failing)
+    body = client.get(f"/api/users/{profile['user']['id']}/profile").get_json()
+    assert body["friend_count"] is None
+    assert body["errors"] == {"friend_count": "count failed"}
+    assert len(body["friends"]["items"]) == 3
+    assert profile_loader.stats()["failures"] == 1
+
+
+def test_each_section_has_its_own_deadline(client, profile, blocked_posts):
+    profile_loader.configure(workers=8, queue=0, timeout=5, section_timeouts={"posts": 0.05})
+    started = time.monotonic()
+    body = client.get(f"/api/users/{profile['user']['id']}/profile").get_json()
+    # Seule la section lente expire, à son propre délai et non à celui des autres sections
+    assert time.monotonic() - started < 2
+    assert body["posts"] is None
+    assert body["errors"] == {"posts": "Timed out after 0.05s"}
+    assert len(body["friends"]["items"]) == 3
+    stats = profile_loader.stats()
+    assert stats["timeouts"] == 1
+    # La section expirée garde son thread jusqu'à la fin de sa requête
+    assert stats["in_flight"] == 1
+    blocked_posts.set()
+    wait_for(lambda: profile_loader.stats()["in_flight"] == 0)
+
+
+def test_saturated_pool_rejects_profiles(client, profile, blocked_posts):
+    profile_loader.configure(workers=2, queue=0, timeout=5, section_timeouts={"posts": 0.05})
+    url = f"/api/users/{profile['user']['id']}/profile"
+    assert client.get(url, query_string={"include": "posts"}).get_json()["errors"] == {
+        "posts": "Timed out after 0.05s"}
+    # Un thread est encore pris par la section expirée: pas de place pour user et posts
+    response = client.get(url, query_string={"include": "posts"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"]
+    assert profile_loader.stats()["rejected"] == 1
+    blocked_posts.set()
+    wait_for(lambda: profile_loader.stats()["in_flight"] == 0)
+    assert client.get(url, query_string={"include": "posts"}).get_json()["errors"] == {}
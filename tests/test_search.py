@@ -0,0 +1,57 @@
+# Recherche plein texte: premier chargement de l'index, relecture du journal après une sauvegarde
+import logging
+import os
+import time
+import pytest
+from app.changelog import changelog
+from app.search import search_index
+
+
+def search(client, query):
+    response = client.get("/api/search", query_string={"q": query})
+    assert response.status_code == 200, response.get_json()
+    return [post["id"] for post in response.get_json()]
+
+
+def test_first_search_waits_for_a_small_index(client, make_user, make_post):
+    post = make_post(make_user()["id"], title="Recette du gratin", content="Pommes de terre et fromage")
+    assert search(client, "gratin") == [post["id"]]
+
+
+@pytest.fixture
+def saved_index(app, tmp_path):
+    """Journal des modifications et fichier de sauvegarde de l'index (comme avec Neo4j)"""
+    changelog.configure(directory=str(tmp_path / "changelog"))
+    search_index.configure(app.extensions["repository"], path=str(tmp_path / "search_index.json.gz"),
+                           save_seconds=0)
+    yield search_index
+    changelog.configure()
+
+
+def test_changes_made_while_unloaded_are_replayed(client, make_user, make_post, saved_index, caplog):
+    user = make_user()
+    edited = make_post(user["id"], title="Alpha", content="Premier brouillon")
+    deleted = make_post(user["id"], title="Bravo", content="Post bientôt supprimé")
+    assert search(client, "alpha") == [edited["id"]]
+    assert saved_index.save()
+    # Index déchargé (processus arrêté): les écritures ne sont visibles que dans le journal et le stockage
+    saved_index.configure(saved_index._repo, path=saved_index.path, save_seconds=0)
+    client.put(f"/api/posts/{edited['id']}", json={"title": "Charlie", "content": "Version finale"})
+    client.delete(f"/api/posts/{deleted['id']}")
+    created = make_post(user["id"], title="Delta", content="Post créé pendant l'arrêt")
+    caplog.set_level(logging.INFO, logger="app.search")
+    assert search(client, "charlie") == [edited["id"]]
+    assert search(client, "alpha") == []
+    assert search(client, "bravo") == []
+    assert search(client, "delta") == [created["id"]]
+    assert "3 documents replayed" in caplog.text
+
+
+def test_index_is_saved_periodically(client, make_user, make_post, saved_index):
+    saved_index.configure(saved_index._repo, path=saved_index.path, save_seconds=0.05)
+    make_post(make_user()["id"], title="Echo du matin")
+    search(client, "echo")
+    deadline = time.monotonic() + 2
+    while not os.path.exists(saved_index.path) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert os.path.exists(saved_index.path)
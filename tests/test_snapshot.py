@@ -0,0 +1,52 @@
+# Instantanés binaires: export par blocs, rechargement dans un graphe vide et ordre des nœuds exportés
+import os
+import pytest
+from app import create_app
+from app.snapshot import SECTIONS, Snapshot, SnapshotError, export_snapshot, load_snapshot
+
+
+def graph(memory):
+    """Contenu complet du graphe, section par section, tel que le lit l'export"""
+    return {section: memory.export_page(section, batch_size=10 ** 6)[0] for section in SECTIONS}
+
+
+@pytest.fixture
+def populated(client, make_user, make_post, make_comment, befriend):
+    users = [make_user()["id"] for _ in range(5)]
+    befriend((users[0], users[1]), (users[2], users[0]), (users[3], users[4]))
+    posts = [make_post(users[n % 3])["id"] for n in range(4)]
+    for n, post_id in enumerate(posts):
+        make_comment(post_id, users[(n + 1) % 5])
+        make_comment(post_id, users[(n + 2) % 5])
+        assert client.post(f"/api/posts/{post_id}/like", json={"user_id": users[n]}).status_code == 201
+    return users
+
+
+def test_round_trip(app, memory, populated, tmp_path):
+    path = str(tmp_path / "graph.snap")
+    # Petits blocs: les références sont retrouvées dans plusieurs blocs déjà écrits
+    counts = export_snapshot(app.extensions["repository"], path, chunk_rows=2)
+    assert counts == {"users": 5, "posts": 4, "comments": 8, "friendships": 3, "likes": 4}
+    with Snapshot(path) as snapshot:
+        assert snapshot.stats()["rows"] == counts
+        assert snapshot.ids("users") == sorted(populated)
+
+    target = create_app({"TESTING": True, "GRAPH_BACKEND": "memory", "FRIEND_GRAPH_SNAPSHOT": False,
+                         "LIKE_WRITE_BEHIND": False})
+    report = load_snapshot(target.extensions["repository"], path, batch_size=3)
+    assert {section: result["written"] for section, result in report.items()} == counts
+    assert graph(target.extensions["repository"]._repo) == graph(memory)
+
+
+def test_unordered_export_is_rejected(app, memory, populated, monkeypatch, tmp_path):
+    export_page = memory.export_page
+
+    def unordered(kind, after=None, batch_size=1000):
+        rows, last_id = export_page(kind, after=after, batch_size=batch_size)
+        return rows[::-1], last_id
+
+    monkeypatch.setattr(memory, "export_page", unordered)
+    path = str(tmp_path / "graph.snap")
+    with pytest.raises(SnapshotError):
+        export_snapshot(app.extensions["repository"], path, chunk_rows=2)
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,87 @@
+# Posts tendance: premier chargement et reprise d'un checkpoint complétée par le journal des modifications
+import logging
+import pytest
+from app.changelog import changelog
+from app.trending import trending
+
+
+def ranking(client):
+    response = client.get("/api/posts/trending")
+    assert response.status_code == 200, response.get_json()
+    return [(post["id"], round(post["trending_score"])) for post in response.get_json()]
+
+
+def like(client, post, user):
+    assert client.post(f"/api/posts/{post['id']}/like", json={"user_id": user["id"]}).status_code == 201
+
+
+def test_first_read_waits_for_the_scores(client, make_user, make_post):
+    user = make_user()
+    post = make_post(user["id"])
+    like(client, post, user)
+    assert ranking(client) == [(post["id"], 1)]
+
+
+@pytest.fixture
+def checkpointed(app, tmp_path):
+    """Journal des modifications et fichier de checkpoint des scores (comme avec Neo4j)"""
+    changelog.configure(directory=str(tmp_path / "changelog"))
+    trending.configure(app.extensions["repository"], path=str(tmp_path / "trending.json.gz"), checkpoint_seconds=0)
+    yield trending
+    changelog.configure()
+
+
+def test_events_since_checkpoint_are_replayed(client, make_user, make_post, make_comment, checkpointed, caplog):
+    author, fan = make_user(), make_user()
+    liked, popular, commented = (make_post(author["id"]) for _ in range(3))
+    like(client, liked, fan)
+    assert ranking(client) == [(liked["id"], 1)]
+    assert checkpointed.checkpoint()
+    # Scores déchargés (processus arrêté): les likes et commentaires ne sont plus que dans le journal
+    checkpointed.configure(checkpointed._repo, path=checkpointed.path, checkpoint_seconds=0)
+    like(client, popular, author)
+    like(client, popular, fan)
+    make_comment(commented["id"], fan["id"])
+    caplog.set_level(logging.INFO, logger="app.trending")
+    # Le like antérieur au checkpoint n'est pas compté deux fois
+    assert ranking(client) == [(commented["id"], 3), (popular["id"], 2), (liked["id"], 1)]
+    assert "3 events replayed" in caplog.text
+
+
+def test_unlike_removes_the_original_like(client, make_user, make_post, memory, monkeypatch):
+    monkeypatch.setattr(trending, "refresh_seconds", 0)
+    author, old_fan, new_fan = make_user(), make_user(), make_user()
+    post = make_post(author["id"])
+    like(client, post, old_fan)
+    like(client, post, new_fan)
+    # Like d'il y a deux demi-vies: il ne compte plus que pour un quart
+    memory.likes_posts.created_at[(old_fan["id"], post["id"])] -= 2 * trending.half_life
+    trending.rebuild()
+    assert ranking(client) == [(post["id"], 1)]
+    assert client.delete(f"/api/posts/{post['id']}/like", json={"user_id": old_fan["id"]}).status_code == 200
+    # Le retrait soustrait le quart compté, pas un like de maintenant
+    assert [(post_id, round(score, 2)) for post_id, score in trending.top(10)] == [(post["id"], 1.0)]
+
+
+def test_rebuild_counts_likes_during_the_scan_once(client, make_user, make_post, memory, monkeypatch):
+    author, fan = make_user(), make_user()
+    first, second = sorted((make_post(author["id"]) for _ in range(2)), key=lambda post: post["id"])
+    assert ranking(client) == []
+    list_post_activity = memory.list_post_activity
+    scanned = []
+
+    def liking(since, after=None, batch_size=500):
+        rows = list_post_activity(since, after=after, batch_size=batch_size)
+        scanned.append([row["id"] for row in rows])
+        # Likes pendant le recalcul: du post pas encore relu (le lot suivant le lira), puis du post déjà relu
+        if len(scanned) == 1:
+            like(client, second, fan)
+        elif len(scanned) == 2:
+            like(client, first, fan)
+        return rows
+
+    monkeypatch.setattr(memory, "list_post_activity", liking)
+    monkeypatch.setattr(trending, "refresh_seconds", 0)
+    trending.rebuild(batch_size=1)
+    assert scanned == [[first["id"]], [second["id"]], []]
+    assert sorted(ranking(client)) == [(first["id"], 1), (second["id"], 1)]
@@ -0,0 +1,4 @@
+# Point d'entrée WSGI pour un serveur de production externe (ex: gunicorn wsgi:app)
+from app import create_app
+
+app = create_app()